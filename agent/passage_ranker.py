@@ -0,0 +1,141 @@
+"""BM25 ranking of page passages for search evidence.
+
+Fetched pages are longer than the per-page evidence budget, and cutting them
+head-first keeps the intro while the paragraph that answers the question is
+lost. Here every page is split into overlapping word windows
+(SEARCH_PASSAGE_WORDS, overlapping by SEARCH_PASSAGE_OVERLAP_WORDS), all
+windows of the turn form one BM25 corpus, and each window scores as its best
+match against the task query or any sub-query. An excerpt is filled with the
+top windows and rendered in document order, with overlapping windows merged
+and gaps marked by " … ".
+
+Terms are lowercased words cut to a short prefix, a crude stemmer that
+keeps Ukrainian/Russian inflections of one word together.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from core.env import env_int
+
+_WORD_RE = re.compile(r"\w+")
+_SPAN_RE = re.compile(r"\S+")
+_STEM_CHARS = 6
+_GAP = " … "
+_K1 = 1.2
+_B = 0.75
+
+
+def _terms(text: str) -> List[str]:
+    return [word[:_STEM_CHARS] for word in _WORD_RE.findall(text.lower()) if len(word) >= 2]
+
+
+def split_passages(text: str, words: int, overlap: int) -> List[Tuple[int, int]]:
+    """(start, end) char spans of overlapping windows of `words` words."""
+    spans = [match.span() for match in _SPAN_RE.finditer(text)]
+    if not spans:
+        return []
+    words = max(1, words)
+    stride = max(1, words - max(0, overlap))
+    windows = []
+    for index in range(0, len(spans), stride):
+        window = spans[index : index + words]
+        windows.append((window[0][0], window[-1][1]))
+        if index + words >= len(spans):
+            break
+    return windows
+
+
+@dataclass(frozen=True)
+class _Passage:
+    start: int
+    end: int
+    tf: Counter
+    length: int
+
+
+class PassageRanker:
+    def __init__(self, queries: Iterable[str], documents: Iterable[str]):
+        self.words = env_int("SEARCH_PASSAGE_WORDS", default=120)
+        self.overlap = env_int("SEARCH_PASSAGE_OVERLAP_WORDS", default=30)
+        self.queries = []
+        for query in queries:
+            terms = set(_terms(query or ""))
+            if terms and terms not in self.queries:
+                self.queries.append(terms)
+        self._passages: Dict[str, List[_Passage]] = {}
+        self._df: Counter = Counter()
+        total_length = 0
+        for text in documents:
+            if not text or text in self._passages:
+                continue
+            passages = self._split(text)
+            self._passages[text] = passages
+            for passage in passages:
+                self._df.update(passage.tf.keys())
+                total_length += passage.length
+        self._count = sum(len(passages) for passages in self._passages.values())
+        self._avg_length = total_length / self._count if self._count else 1.0
+
+    def _split(self, text: str) -> List[_Passage]:
+        passages = []
+        for start, end in split_passages(text, self.words, self.overlap):
+            terms = _terms(text[start:end])
+            passages.append(_Passage(start, end, Counter(terms), len(terms)))
+        return passages
+
+    def _idf(self, term: str) -> float:
+        df = self._df.get(term, 0)
+        return math.log(1 + (self._count - df + 0.5) / (df + 0.5))
+
+    def score(self, passage: _Passage) -> float:
+        norm = _K1 * (1 - _B + _B * passage.length / max(self._avg_length, 1.0))
+        best = 0.0
+        for terms in self.queries:
+            value = 0.0
+            for term in terms:
+                tf = passage.tf.get(term)
+                if tf:
+                    value += self._idf(term) * tf * (_K1 + 1) / (tf + norm)
+            best = max(best, value)
+        return best
+
+    def excerpt(self, text: str, limit: int) -> str | None:
+        """Best passages of `text` within `limit` chars, or None without a match."""
+        text = (text or "").strip()
+        if not text or limit <= 0:
+            return None
+        if len(text) <= limit:
+            return text
+        passages = self._passages.get(text) or self._split(text)
+        scored = sorted(
+            ((self.score(passage), passage) for passage in passages),
+            key=lambda item: (-item[0], item[1].start),
+        )
+        if not scored or scored[0][0] <= 0:
+            return None
+        chosen: List[Tuple[int, int]] = []
+        for value, passage in scored:
+            if value <= 0:
+                break
+            candidate = chosen + [(passage.start, passage.end)]
+            if len(_render(text, candidate)) <= limit:
+                chosen = candidate
+        if not chosen:
+            best = scored[0][1]
+            return text[best.start : best.end][: max(limit - 3, 0)].rstrip() + "..."
+        return _render(text, chosen)
+
+
+def _render(text: str, spans: Sequence[Tuple[int, int]]) -> str:
+    merged: List[List[int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return _GAP.join(text[start:end] for start, end in merged)
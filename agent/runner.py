@@ -9,6 +9,7 @@ import urllib.parse
 from dataclasses import dataclass, field, replace
 
 from agent.llm import chat_once, make_messages, tool_spec
+from agent.passage_ranker import PassageRanker
 from agent.search_task import (
     EvidencePack,
     NormalizedResult,
@@ -67,6 +68,17 @@ def _search_page_chars() -> int:
     return env_int("SEARCH_PAGE_MAX_CHARS", default=4000)
 
 
+def _search_passage_ranking() -> bool:
+    return env_bool("SEARCH_PASSAGE_RANKING", default=True)
+
+
+def _search_page_source_chars() -> int:
+    """Page text kept for evidence; passage ranking picks from all of it."""
+    if not _search_passage_ranking():
+        return _search_page_chars()
+    return max(_search_page_chars(), env_int("SEARCH_PAGE_SOURCE_CHARS", default=12000))
+
+
 def _search_total_evidence_chars() -> int:
     return env_int("SEARCH_TOTAL_EVIDENCE_CHARS", default=12000)
 
@@ -239,7 +251,11 @@ def _format_search_hits(results: list[NormalizedResult]) -> str:
     return "\n".join(lines).strip()
 
 
-def _format_page_evidence(pages: list[NormalizedResult]) -> str:
+def _format_page_evidence(
+    pages: list[NormalizedResult],
+    queries: list[str] | tuple[str, ...] = (),
+) -> str:
+    ranker = _passage_ranker(queries, pages)
     blocks = []
     for idx, page in enumerate(pages, start=1):
         blocks.append(
@@ -247,7 +263,7 @@ def _format_page_evidence(pages: list[NormalizedResult]) -> str:
                 [
                     f"[PAGE {idx}] {page.title or page.url or 'Сторінка'}",
                     f"URL: {page.url or ''}",
-                    page.full_content or "",
+                    _evidence_excerpt(page.full_content, _search_page_chars(), ranker),
                 ]
             ).strip()
         )
@@ -323,6 +339,28 @@ def _truncate_evidence_text(text: str | None, limit: int) -> str:
     return value[: max(limit - 3, 0)].rstrip() + "..."
 
 
+def _passage_ranker(
+    queries: list[str] | tuple[str, ...],
+    items: list[NormalizedResult],
+) -> PassageRanker | None:
+    if not _search_passage_ranking() or not queries:
+        return None
+    return PassageRanker(queries, [item.full_content or "" for item in items])
+
+
+def _evidence_excerpt(
+    text: str | None,
+    limit: int,
+    ranker: PassageRanker | None,
+) -> str:
+    """Query-relevant passages of `text`, or its head when nothing matches."""
+    if ranker is not None:
+        excerpt = ranker.excerpt(text or "", limit)
+        if excerpt:
+            return excerpt
+    return _truncate_evidence_text(text, limit)
+
+
 def _search_item_key(item: NormalizedResult) -> tuple[str, str, str]:
     return (
         (item.url or "").strip().lower(),
@@ -408,12 +446,14 @@ def _format_dialogue_context(dialogue_context: list[dict]) -> str:
 
 def _format_synthesis_evidence(
     evidence: EvidencePack,
+    queries: list[str] | tuple[str, ...] = (),
 ) -> tuple[str, dict[int, str]]:
     merged_items = reorder_for_llm(
         _merge_results_and_pages(evidence.results, evidence.pages)
     )
     numbered_items = merged_items[:8]
     extracted_items = [item for item in numbered_items if item.full_content]
+    ranker = _passage_ranker(queries, extracted_items)
     total_excerpt_budget = _search_total_evidence_chars()
     per_page_budget = (
         min(
@@ -439,7 +479,7 @@ def _format_synthesis_evidence(
             lines.append(f"Snippet: {snippet}")
         if item.full_content and remaining_excerpt_budget > 0:
             excerpt_limit = min(per_page_budget, remaining_excerpt_budget)
-            excerpt = _truncate_evidence_text(item.full_content, excerpt_limit)
+            excerpt = _evidence_excerpt(item.full_content, excerpt_limit, ranker)
             if excerpt:
                 lines.append(f"Excerpt: {excerpt}")
                 remaining_excerpt_budget -= len(excerpt)
@@ -466,7 +506,10 @@ def _build_synthesis_input(
 def _build_synthesis_user_message(
     synthesis_input: SynthesisInput,
 ) -> tuple[str, dict[int, str]]:
-    evidence_text, citation_map = _format_synthesis_evidence(synthesis_input.evidence)
+    evidence_text, citation_map = _format_synthesis_evidence(
+        synthesis_input.evidence,
+        [synthesis_input.user_intent, *synthesis_input.evidence.sub_query_coverage],
+    )
     parts = [f"User intent:\n{synthesis_input.user_intent}"]
     dialogue_text = _format_dialogue_context(synthesis_input.dialogue_context)
     if dialogue_text:
@@ -589,7 +632,7 @@ async def _collect_search_evidence(
             query,
             results,
             max_pages=_search_fetch_pages(),
-            max_chars=_search_page_chars(),
+            max_chars=_search_page_source_chars(),
             profile=profile,
             need_primary_source=getattr(task, "need_primary_source", False),
         )
@@ -1145,7 +1188,7 @@ def _build_evidence_block(
         parts.append(f"note: {note}")
     if aggregated_results:
         parts.append("results:\n" + _format_search_hits(aggregated_results))
-    page_block = _format_page_evidence(aggregated_pages)
+    page_block = _format_page_evidence(aggregated_pages, [user_text, *planned_queries])
     if page_block:
         parts.append("pages:\n" + page_block)
     parts.append(
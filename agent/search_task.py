@@ -367,27 +367,84 @@ def _text_has_any_alias(text: str, aliases: tuple[str, ...]) -> bool:
     return any(alias in lowered for alias in aliases)
 
 
+_QUERY_TERM_RE = re.compile(r"[\w-]+")
+
+
 def _query_terms(text: str) -> list[str]:
     terms: list[str] = []
-    for term in re.findall(r"[\w-]+", urllib.parse.unquote_plus(text or "").lower()):
+    for term in _QUERY_TERM_RE.findall(urllib.parse.unquote_plus(text or "").lower()):
         cleaned = "".join(ch for ch in term if ch.isalnum() or ch in {"-", "_"})
         if len(cleaned) >= 3:
             terms.append(cleaned)
     return terms
 
 
-def _required_query_terms(text: str) -> list[str]:
-    required: list[str] = []
-    for term in _query_terms(text):
-        if term in LOW_VALUE_QUERY_TERMS:
-            continue
-        if term.isdigit():
-            continue
-        if re.fullmatch(r"\d{4}[-_]\d{2}[-_]\d{2}", term):
-            continue
-        if term not in required:
-            required.append(term)
-    return required[:8]
+def _minimum_required_for(required_count: int) -> int:
+    if not required_count:
+        return 0
+    if required_count == 1:
+        return 1
+    if required_count <= 3:
+        return required_count
+    return max(2, min(4, (required_count + 1) // 2))
+
+
+class QueryMatcher:
+    """Terms of one query, parsed once and matched against many haystacks.
+
+    Haystacks are lowercased text. A term matches when any of its variants
+    (the term itself or its QUERY_TERM_ALIASES spellings) occurs in it.
+    `required` drops low-value, numeric and date terms and keeps at most 8;
+    `minimum_required` is how many of them evidence has to mention.
+    """
+
+    __slots__ = ("query", "terms", "required", "minimum_required", "_variants")
+
+    def __init__(
+        self,
+        query: str,
+        *,
+        stopwords: frozenset[str] | set[str] = frozenset(),
+        low_value: set[str] | None = None,
+        aliases: dict[str, tuple[str, ...]] | None = None,
+    ):
+        low_value = LOW_VALUE_QUERY_TERMS if low_value is None else low_value
+        aliases = QUERY_TERM_ALIASES if aliases is None else aliases
+        self.query = query or ""
+        self.terms = tuple(term for term in _query_terms(query) if term not in stopwords)
+        required: list[str] = []
+        for term in self.terms:
+            if term in low_value or term.isdigit():
+                continue
+            if re.fullmatch(r"\d{4}[-_]\d{2}[-_]\d{2}", term):
+                continue
+            if term not in required:
+                required.append(term)
+        self.required = tuple(required[:8])
+        self.minimum_required = _minimum_required_for(len(self.required))
+        self._variants = {term: aliases.get(term, (term,)) for term in self.terms}
+
+    @classmethod
+    def of(cls, query: "str | QueryMatcher", **kwargs) -> "QueryMatcher":
+        return query if isinstance(query, cls) else cls(query, **kwargs)
+
+    def matches(self, term: str, haystack: str) -> bool:
+        variants = self._variants.get(term) or QUERY_TERM_ALIASES.get(term, (term,))
+        return any(variant in haystack for variant in variants)
+
+    def scan(self, haystack: str) -> tuple[int, int]:
+        """(matched terms, matched required terms) in one pass over the terms."""
+        matched = {term for term in self._variants if self.matches(term, haystack)}
+        return (
+            sum(1 for term in self.terms if term in matched),
+            sum(1 for term in self.required if term in matched),
+        )
+
+    def covers_required(self, haystack: str) -> bool:
+        if not self.required or not self.minimum_required:
+            return True
+        matches = sum(1 for term in self.required if self.matches(term, haystack))
+        return matches >= self.minimum_required
 
 
 def _evidence_haystack(
@@ -408,34 +465,19 @@ def _evidence_haystack(
     return " ".join(chunks).lower()
 
 
-def _term_in_haystack(term: str, haystack: str) -> bool:
-    aliases = QUERY_TERM_ALIASES.get(term, (term,))
-    return any(alias in haystack for alias in aliases)
-
-
-def _minimum_required_matches(text: str) -> int:
-    required = _required_query_terms(text)
-    if not required:
-        return 0
-    if len(required) == 1:
-        return 1
-    if len(required) <= 3:
-        return len(required)
-    return max(2, min(4, (len(required) + 1) // 2))
-
-
 def _has_query_anchor_coverage(
-    query: str,
+    query: str | QueryMatcher,
     results: list[NormalizedResult],
     pages: list[NormalizedResult],
+    *,
+    haystack: str | None = None,
 ) -> bool:
-    required = _required_query_terms(query)
-    minimum = _minimum_required_matches(query)
-    if not required or not minimum:
+    matcher = QueryMatcher.of(query)
+    if not matcher.required or not matcher.minimum_required:
         return True
-    haystack = _evidence_haystack(results, pages)
-    matches = sum(1 for term in required if _term_in_haystack(term, haystack))
-    return matches >= minimum
+    if haystack is None:
+        haystack = _evidence_haystack(results, pages)
+    return matcher.covers_required(haystack)
 
 
 def _has_weather_location_coverage(
@@ -882,7 +924,8 @@ def _plan_preserves_base_query_anchor(base_task: SearchTask, plan: SearchPlan) -
     follow-up like "загугли ще раз" got resolved to "коти у трипільців", a plan
     about "function calling vs prompting" should never replace it.
     """
-    required = _required_query_terms(base_task.query)
+    matcher = QueryMatcher(base_task.query)
+    required = matcher.required
     if len(required) < 2 or not plan.sub_queries:
         return True
     haystack = " ".join(
@@ -891,7 +934,7 @@ def _plan_preserves_base_query_anchor(base_task: SearchTask, plan: SearchPlan) -
         for part in (sub_query.query, sub_query.alternative or "")
         if part
     ).lower()
-    matches = sum(1 for term in required if _term_in_haystack(term, haystack))
+    matches = sum(1 for term in required if matcher.matches(term, haystack))
     minimum = 1 if len(required) == 2 else 2
     return matches >= minimum
 
@@ -1208,13 +1251,18 @@ def _heuristic_evidence_evaluation(
 ) -> SearchEvaluation:
     anchor_mismatch: set[str] = set()
     weather_mismatch: set[str] = set()
+    haystack = _evidence_haystack(evidence.results, evidence.pages)
+    matchers = {
+        sub_query.query: QueryMatcher(sub_query.query) for sub_query in plan.sub_queries
+    }
     coverage = {
         sub_query.query: bool(
             evidence.sub_query_coverage.get(sub_query.query, False)
             and _has_query_anchor_coverage(
-                sub_query.query,
+                matchers[sub_query.query],
                 evidence.results,
                 evidence.pages,
+                haystack=haystack,
             )
             and _has_weather_location_coverage(
                 plan.original_request,
@@ -1229,9 +1277,10 @@ def _heuristic_evidence_evaluation(
         if not evidence.sub_query_coverage.get(sub_query.query, False):
             continue
         if not _has_query_anchor_coverage(
-            sub_query.query,
+            matchers[sub_query.query],
             evidence.results,
             evidence.pages,
+            haystack=haystack,
         ):
             anchor_mismatch.add(sub_query.query)
         if not _has_weather_location_coverage(
@@ -1,46 +1,109 @@
 # agent/tools/fetch_page.py
+"""Fetch a web page and reduce it to plain text.
+
+The body is streamed: Content-Type and Content-Length are checked before
+reading, non-HTML and oversized responses are skipped, and at most
+FETCH_MAX_BYTES are read. The main content is then extracted in a worker
+thread (see `agent.tools.page_text`).
+"""
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
 import re
 import time
-from typing import Optional
-
-import requests
+from typing import List
 
+from agent.tools.http_client import get_http_client
+from agent.tools.page_text import extract_page_text
 from db.search_repository import get_page_cache, put_page_cache
 
+logger = logging.getLogger(__name__)
+
 TTL_MIN = int(os.getenv("FETCH_TTL_MIN", "1440"))
 TIMEOUT_SEC = int(os.getenv("FETCH_TIMEOUT_SEC", "10"))
+MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(1024 * 1024)))
+MAX_CONTENT_LENGTH = int(os.getenv("FETCH_MAX_CONTENT_LENGTH", str(8 * 1024 * 1024)))
+MAX_TEXT_CHARS = 20000
 USER_AGENTS = (
     "AISUSBot/1.0 (+https://example.local)",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0 Safari/537.36",
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0 Safari/537.36",
 )
+_TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
 
 
 def _request_headers() -> dict[str, str]:
     index = int(time.time()) % len(USER_AGENTS)
-    return {"User-Agent": USER_AGENTS[index]}
+    return {
+        "User-Agent": USER_AGENTS[index],
+        "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.1",
+    }
+
+
+def _collapse(text: str, limit: int) -> str:
+    return re.sub(r"\s+", " ", text).strip()[:limit]
+
 
+def _content_length(headers) -> int | None:
+    try:
+        return int(headers.get("content-length", ""))
+    except ValueError:
+        return None
 
-def _clean_text(html: str) -> str:
-    from bs4 import BeautifulSoup
 
-    soup = BeautifulSoup(html, "html.parser")
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-    txt = soup.get_text(" ")
-    txt = re.sub(r"\s+", " ", txt).strip()
-    return txt[:20000]
+async def _download(url: str) -> tuple[str, str] | None:
+    """(body, media type), or None when the response is not worth reading."""
+    client = get_http_client(url)
+    async with client.stream(
+        "GET", url, headers=_request_headers(), timeout=TIMEOUT_SEC
+    ) as resp:
+        resp.raise_for_status()
+        media_type = resp.headers.get("content-type", "").split(";")[0].strip().lower()
+        if media_type and media_type not in _TEXT_TYPES:
+            logger.info("fetch.skipped url=%s reason=content_type type=%s", url, media_type)
+            return None
+        length = _content_length(resp.headers)
+        if length is not None and length > MAX_CONTENT_LENGTH:
+            logger.info("fetch.skipped url=%s reason=content_length bytes=%s", url, length)
+            return None
+        chunks: List[bytes] = []
+        received = 0
+        async for chunk in resp.aiter_bytes():
+            chunks.append(chunk)
+            received += len(chunk)
+            if received >= MAX_BYTES:
+                logger.debug("fetch.truncated url=%s bytes=%s", url, received)
+                break
+        body = b"".join(chunks)[:MAX_BYTES]
+        encoding = resp.charset_encoding or "utf-8"
+    try:
+        return body.decode(encoding, errors="replace"), media_type
+    except LookupError:
+        return body.decode("utf-8", errors="replace"), media_type
 
 
 async def fetch_page(url: str) -> str:
     cached = await get_page_cache(url, TTL_MIN)
     if cached:
         return cached
-    resp = requests.get(url, headers=_request_headers(), timeout=TIMEOUT_SEC)
-    resp.raise_for_status()
-    text = _clean_text(resp.text)
-    await put_page_cache(url, text)
+    downloaded = await _download(url)
+    if downloaded is None:
+        return ""
+    body, media_type = downloaded
+    if media_type == "text/plain":
+        text = _collapse(body, MAX_TEXT_CHARS)
+    else:
+        page = await asyncio.to_thread(extract_page_text, body, MAX_TEXT_CHARS)
+        logger.info(
+            "fetch.extracted url=%s kept_chars=%d dropped_chars=%d kept_ratio=%.2f",
+            url,
+            page.kept_chars,
+            page.dropped_chars,
+            page.kept_ratio,
+        )
+        text = page.text
+    if text:
+        await put_page_cache(url, text)
     return text
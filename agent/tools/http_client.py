@@ -0,0 +1,90 @@
+# agent/tools/http_client.py
+"""Shared async HTTP clients for web search providers.
+
+One keep-alive pool per (event loop, scheme+host), so repeated provider
+calls skip the TCP/TLS handshake and sub-queries gathered by the runner
+really run in parallel instead of blocking the loop on `requests`.
+Responses are gzip/deflate-decoded by httpx; HTTP/2 is negotiated when the
+optional `h2` package is installed. Timeouts stay per call (see
+`web_search.PROVIDER_TIMEOUTS`).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import urllib.parse
+import weakref
+from typing import Any, Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+
+    _HTTP2 = True
+except Exception:
+    _HTTP2 = False
+
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _origin(url: str) -> str:
+    parsed = urllib.parse.urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}".lower()
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_HTTP2,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=_env_int("SEARCH_HTTP_MAX_CONNECTIONS_PER_HOST", 10),
+            max_keepalive_connections=_env_int("SEARCH_HTTP_MAX_KEEPALIVE_PER_HOST", 5),
+            keepalive_expiry=float(_env_int("SEARCH_HTTP_KEEPALIVE_SEC", 30)),
+        ),
+    )
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    """Pooled client for the URL's host, bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    clients = _CLIENTS.get(loop)
+    if clients is None:
+        clients = _CLIENTS[loop] = {}
+    origin = _origin(url)
+    client = clients.get(origin)
+    if client is None or client.is_closed:
+        client = clients[origin] = _new_client()
+    return client
+
+
+async def http_request(
+    method: str, url: str, *, timeout: float, **kwargs: Any
+) -> httpx.Response:
+    return await get_http_client(url).request(method, url, timeout=timeout, **kwargs)
+
+
+async def close_http_clients() -> None:
+    """Close the pools of the running loop (call on shutdown)."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    clients = _CLIENTS.pop(loop, {})
+    for origin, client in clients.items():
+        try:
+            await client.aclose()
+        except Exception as exc:
+            logger.warning("http.client_close_failed origin=%s error=%s", origin, exc)
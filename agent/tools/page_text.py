@@ -0,0 +1,292 @@
+# agent/tools/page_text.py
+"""Main-content extraction for fetched HTML pages.
+
+The document is reduced to a flat list of text blocks (paragraphs,
+headings, list items, cells) in one pass, driven by lxml's C parser when it
+is installed and by the stdlib `HTMLParser` otherwise; no tree is kept.
+Boilerplate is then dropped readability-style:
+
+- blocks inside nav/aside/footer/form (and a page-level header), or inside
+  elements whose class/id looks like a menu, cookie banner, share bar,
+  sidebar, comments, ...;
+- everything outside <article>/<main> when those hold enough text;
+- link-heavy blocks (link density above PAGE_TEXT_MAX_LINK_DENSITY);
+- short blocks that are not surrounded by long, text-dense ones.
+
+Headings are kept as "## ..." lines and every block ends up on its own
+line. If too little survives, the full text is returned instead.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml.etree as lxml_etree
+except Exception:
+    lxml_etree = None
+
+_SKIP_TAGS = frozenset({"title", "script", "style", "noscript", "template", "svg"})
+_BOILERPLATE_TAGS = frozenset({"nav", "aside", "footer", "form", "dialog"})
+_MAIN_TAGS = frozenset({"article", "main"})
+_VOID_TAGS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+)
+_BLOCK_TAGS = frozenset(
+    {
+        "address", "article", "aside", "blockquote", "body", "dd", "details", "div",
+        "dl", "dt", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4",
+        "h5", "h6", "header", "li", "main", "nav", "ol", "p", "pre", "section",
+        "summary", "table", "td", "th", "tr", "ul",
+    }
+)
+_HEADING_RE = re.compile(r"^h([1-6])$")
+_BOILERPLATE_HINT_RE = re.compile(
+    r"advert|banner|breadcrumb|comment|consent|cookie|footer|masthead|menu|"
+    r"navbar|newsletter|popup|promo|related|share|sidebar|social|sponsor|"
+    r"subscribe|toolbar|widget|(?:^|[\s_-])(?:ads?|nav)(?:$|[\s_-])",
+    re.IGNORECASE,
+)
+# Theme wrappers like "content-sidebar-wrap" hold the article itself.
+_CONTENT_HINT_RE = re.compile(r"article|content|entry|main|post|story", re.IGNORECASE)
+_FEED_CHUNK = 64 * 1024
+_SHORT_BLOCK_WORDS = 8
+_LONG_BLOCK_WORDS = 20
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _collapse(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+@dataclass
+class _Block:
+    text: str
+    link_chars: int
+    heading: int
+    in_main: bool
+    boilerplate: bool
+
+    @property
+    def words(self) -> int:
+        return self.text.count(" ") + 1
+
+    @property
+    def link_density(self) -> float:
+        return self.link_chars / max(len(self.text), 1)
+
+
+@dataclass(frozen=True)
+class PageText:
+    text: str
+    kept_chars: int
+    dropped_chars: int
+
+    @property
+    def kept_ratio(self) -> float:
+        total = self.kept_chars + self.dropped_chars
+        return self.kept_chars / total if total else 0.0
+
+
+class _BlockBuilder:
+    """Parser target: start/end/data events in, text blocks out."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.blocks: List[_Block] = []
+        self.chars = 0
+        self._stack: List[tuple[str, bool, bool]] = []  # (tag, boilerplate, main)
+        self._skip = 0
+        self._links = 0
+        self._boilerplate = 0
+        self._main = 0
+        self._parts: List[str] = []
+        self._link_chars = 0
+
+    @property
+    def full(self) -> bool:
+        return self.chars >= self.max_chars
+
+    def _flush(self):
+        if not self._parts:
+            return
+        text = _collapse(" ".join(self._parts))
+        link_chars = self._link_chars
+        self._parts = []
+        self._link_chars = 0
+        if not text:
+            return
+        heading = 0
+        for tag, _, _ in reversed(self._stack):
+            match = _HEADING_RE.match(tag)
+            if match:
+                heading = int(match.group(1))
+                break
+        self.blocks.append(
+            _Block(text, min(link_chars, len(text)), heading, self._main > 0, self._boilerplate > 0)
+        )
+        self.chars += len(text)
+
+    def start(self, tag: str, attrs: Dict[str, str]):
+        tag = str(tag).lower()
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+            return
+        if tag in _VOID_TAGS:
+            return
+        if tag == "a":
+            self._links += 1
+        hints = f"{attrs.get('class') or ''} {attrs.get('id') or ''}"
+        boilerplate = (
+            tag in _BOILERPLATE_TAGS
+            or "hidden" in attrs
+            or attrs.get("aria-hidden") == "true"
+            or (
+                tag not in ("html", "body")
+                and bool(_BOILERPLATE_HINT_RE.search(hints))
+                and not _CONTENT_HINT_RE.search(hints)
+            )
+        )
+        if tag == "header" and not self._main:
+            boilerplate = True
+        main = tag in _MAIN_TAGS or attrs.get("role") == "main"
+        if tag in _BLOCK_TAGS or boilerplate or main:
+            self._flush()
+        self._stack.append((tag, boilerplate, main))
+        self._boilerplate += boilerplate
+        self._main += main
+
+    def end(self, tag: str):
+        tag = str(tag).lower()
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+            return
+        open_tags = [open_tag for open_tag, _, _ in self._stack]
+        if tag not in open_tags:
+            return  # stray end tag
+        # Elements left open inside `tag` are closed implicitly with it.
+        index = len(open_tags) - 1 - open_tags[::-1].index(tag)
+        closing = self._stack[index:]
+        if tag in _BLOCK_TAGS or any(boilerplate or main for _, boilerplate, main in closing):
+            self._flush()
+        del self._stack[index:]
+        for open_tag, boilerplate, main in closing:
+            self._boilerplate -= boilerplate
+            self._main -= main
+            if open_tag == "a":
+                self._links = max(0, self._links - 1)
+
+    def data(self, text: str):
+        if self._skip or self.full:
+            return
+        self._parts.append(text)
+        if self._links:
+            self._link_chars += len(text.strip())
+
+    def close(self) -> List[_Block]:
+        self._flush()
+        return self.blocks
+
+
+class _StdlibDriver(HTMLParser):
+    def __init__(self, target: _BlockBuilder):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {key: value or "" for key, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, {key: value or "" for key, value in attrs})
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def _parse_blocks(html: str, max_chars: int) -> List[_Block]:
+    # Both parsers are fed in chunks and dropped once the builder is full,
+    # so long pages are not parsed past the text that will be kept.
+    if lxml_etree is not None:
+        try:
+            builder = _BlockBuilder(max_chars)
+            parser = lxml_etree.HTMLParser(target=builder, remove_comments=True)
+            for start in range(0, len(html), _FEED_CHUNK):
+                parser.feed(html[start : start + _FEED_CHUNK])
+                if builder.full:
+                    return builder.close()
+            return parser.close()
+        except Exception as exc:  # empty or unparsable documents
+            logger.debug("page_text.lxml_failed error=%s", exc)
+    builder = _BlockBuilder(max_chars)
+    driver = _StdlibDriver(builder)
+    for start in range(0, len(html), _FEED_CHUNK):
+        driver.feed(html[start : start + _FEED_CHUNK])
+        if builder.full:
+            break
+    else:
+        driver.close()
+    return builder.close()
+
+
+def _select_main_blocks(blocks: List[_Block]) -> List[_Block]:
+    candidates = [block for block in blocks if not block.boilerplate]
+    main_blocks = [block for block in candidates if block.in_main]
+    if sum(len(block.text) for block in main_blocks) >= _env_int("PAGE_TEXT_MIN_MAIN_CHARS", 200):
+        candidates = main_blocks
+    max_link_density = _env_float("PAGE_TEXT_MAX_LINK_DENSITY", 0.5)
+    candidates = [block for block in candidates if block.link_density <= max_link_density]
+
+    def is_long(index: int) -> bool:
+        return 0 <= index < len(candidates) and candidates[index].words >= _LONG_BLOCK_WORDS
+
+    kept: List[_Block] = []
+    for index, block in enumerate(candidates):
+        if block.heading or block.words >= _SHORT_BLOCK_WORDS:
+            kept.append(block)
+        elif is_long(index - 1) and is_long(index + 1):
+            kept.append(block)  # short line inside a run of article text
+    # A heading only stays if some text follows it before the next heading.
+    return [
+        block
+        for index, block in enumerate(kept)
+        if not block.heading or (index + 1 < len(kept) and not kept[index + 1].heading)
+    ]
+
+
+def _render(blocks: List[_Block], limit: int) -> str:
+    lines = [f"## {block.text}" if block.heading else block.text for block in blocks]
+    return "\n".join(lines)[:limit].strip()
+
+
+def extract_page_text(html: str, limit: int) -> PageText:
+    """Main text of `html`, at most `limit` chars, with kept/dropped sizes."""
+    blocks = _parse_blocks(html, max_chars=limit * 4)
+    total = sum(len(block.text) for block in blocks)
+    kept = _select_main_blocks(blocks)
+    kept_chars = sum(len(block.text) for block in kept)
+    if kept_chars < min(total, _env_int("PAGE_TEXT_MIN_CHARS", 200)):
+        kept, kept_chars = blocks, total
+    return PageText(_render(kept, limit), kept_chars, total - kept_chars)
@@ -0,0 +1,298 @@
+# agent/tools/provider_scoreboard.py
+"""Live latency and success scoreboard for web search providers.
+
+Every live provider call (cache hits excluded) updates the stats of its
+provider × profile pair: exponentially decayed success rate (no exception),
+acceptable-answer rate (enough results to stop searching) and mean result
+count, each new call weighted by SEARCH_SCOREBOARD_ALPHA, plus the last
+SEARCH_SCOREBOARD_WINDOW latencies for p50/p95.
+
+`reorder` sorts providers by expected time to an acceptable answer,
+(p50 + p95) / 2 divided by the acceptable rate; trying providers in that
+order minimises the expected wait when they are called one after another.
+Providers with fewer than SEARCH_SCOREBOARD_MIN_CALLS calls keep their
+configured slot. SEARCH_ADAPTIVE_ORDER=0 turns reordering off.
+
+Stats only change when a provider is called, so a demoted provider would
+never be measured again. Stats older than SEARCH_SCOREBOARD_MAX_AGE_MIN
+are therefore ignored: the provider returns to its configured slot, and
+its next call starts a fresh measurement.
+
+Stats are written to SEARCH_PROVIDER_STATS_PATH (by default next to the
+token usage log) at most every SEARCH_SCOREBOARD_SAVE_SEC and on shutdown,
+so they survive restarts and the admin UI can show them. Periodic writes
+run in a worker thread, off the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from core.token_usage import token_usage_log_path
+
+logger = logging.getLogger(__name__)
+
+_MIN_ACCEPT_RATE = 0.05
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _max_age_sec() -> float:
+    return max(1, _env_int("SEARCH_SCOREBOARD_MAX_AGE_MIN", 60)) * 60.0
+
+
+def provider_stats_path() -> Path:
+    configured = (os.getenv("SEARCH_PROVIDER_STATS_PATH") or "").strip()
+    if configured:
+        return Path(configured)
+    return token_usage_log_path().parent / "search_provider_stats.json"
+
+
+@dataclass
+class ProviderStats:
+    calls: int = 0
+    success_rate: float = 0.0
+    accept_rate: float = 0.0
+    mean_results: float = 0.0
+    latencies_ms: List[int] = field(default_factory=list)
+    updated_at: float = 0.0
+
+    def record(
+        self,
+        *,
+        ok: bool,
+        results: int,
+        acceptable: bool,
+        latency_ms: int,
+        alpha: float,
+        window: int,
+        now: float,
+        max_age_sec: float,
+    ):
+        if self.is_stale(now, max_age_sec):
+            self.calls = 0
+            self.latencies_ms = []
+        weight = 1.0 if self.calls == 0 else alpha
+        self.success_rate += weight * (float(ok) - self.success_rate)
+        self.accept_rate += weight * (float(acceptable) - self.accept_rate)
+        self.mean_results += weight * (results - self.mean_results)
+        self.latencies_ms.append(max(0, int(latency_ms)))
+        del self.latencies_ms[: -max(1, window)]
+        self.calls += 1
+        self.updated_at = now
+
+    def is_stale(self, now: float, max_age_sec: float) -> bool:
+        return self.calls > 0 and now - self.updated_at > max_age_sec
+
+    def percentile(self, percentile: float) -> int | None:
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        rank = max(1, -(-len(ordered) * percentile // 100))  # nearest rank
+        return ordered[int(rank) - 1]
+
+    def expected_ms(self) -> float | None:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        if p50 is None or p95 is None:
+            return None
+        return (p50 + p95) / 2 / max(self.accept_rate, _MIN_ACCEPT_RATE)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProviderStats":
+        return cls(
+            calls=int(data.get("calls") or 0),
+            success_rate=float(data.get("success_rate") or 0.0),
+            accept_rate=float(data.get("accept_rate") or 0.0),
+            mean_results=float(data.get("mean_results") or 0.0),
+            latencies_ms=[int(value) for value in data.get("latencies_ms") or []],
+            updated_at=float(data.get("updated_at") or 0.0),
+        )
+
+
+class ProviderScoreboard:
+    def __init__(self, path: Path | None = None):
+        self.path = path or provider_stats_path()
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._save_task: asyncio.Task | None = None
+        self._write_lock = threading.Lock()
+        self.load()
+
+    def stats(self, provider: str, profile: str) -> ProviderStats | None:
+        return self._stats.get((provider, profile))
+
+    def record(
+        self,
+        provider: str,
+        profile: str,
+        *,
+        ok: bool,
+        results: int,
+        acceptable: bool,
+        latency_ms: int,
+    ):
+        stats = self._stats.setdefault((provider, profile), ProviderStats())
+        stats.record(
+            ok=ok,
+            results=results,
+            acceptable=acceptable,
+            latency_ms=latency_ms,
+            alpha=min(1.0, max(0.01, _env_float("SEARCH_SCOREBOARD_ALPHA", 0.2))),
+            window=_env_int("SEARCH_SCOREBOARD_WINDOW", 50),
+            now=time.time(),
+            max_age_sec=_max_age_sec(),
+        )
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= _env_int("SEARCH_SCOREBOARD_SAVE_SEC", 30):
+            self._save_in_background()
+
+    def reorder(self, providers: List[str], profile: str, *, pinned: int = 0) -> List[str]:
+        """`providers` with the measured ones sorted by expected time.
+
+        The first `pinned` entries (an explicit provider hint) stay put, as do
+        providers without enough recent calls.
+        """
+        min_calls = max(1, _env_int("SEARCH_SCOREBOARD_MIN_CALLS", 5))
+        max_age_sec = _max_age_sec()
+        now = time.time()
+        slots: List[int] = []
+        measured: List[Tuple[float, int, str]] = []
+        for index, provider in enumerate(providers):
+            if index < pinned:
+                continue
+            stats = self._stats.get((provider, profile))
+            if not stats or stats.calls < min_calls or stats.is_stale(now, max_age_sec):
+                continue
+            expected = stats.expected_ms()
+            if expected is None:
+                continue
+            slots.append(index)
+            measured.append((expected, index, provider))
+        ordered = list(providers)
+        for slot, (_expected, _index, provider) in zip(slots, sorted(measured)):
+            ordered[slot] = provider
+        return ordered
+
+    def rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for (provider, profile), stats in self._stats.items():
+            expected = stats.expected_ms()
+            rows.append(
+                {
+                    "provider": provider,
+                    "profile": profile,
+                    "calls": stats.calls,
+                    "success_rate": round(stats.success_rate, 3),
+                    "accept_rate": round(stats.accept_rate, 3),
+                    "mean_results": round(stats.mean_results, 2),
+                    "p50_ms": stats.percentile(50),
+                    "p95_ms": stats.percentile(95),
+                    "expected_ms": round(expected) if expected is not None else None,
+                    "updated_at": stats.updated_at,
+                }
+            )
+        rows.sort(key=lambda row: (row["profile"], row["expected_ms"] is None, row["expected_ms"] or 0))
+        return rows
+
+    def load(self):
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except Exception as exc:
+            logger.warning("search.scoreboard_load_failed path=%s error=%s", self.path, exc)
+            return
+        for row in payload.get("providers") or []:
+            key = (str(row.get("provider") or ""), str(row.get("profile") or ""))
+            if all(key):
+                self._stats[key] = ProviderStats.from_dict(row)
+
+    def _snapshot(self) -> Dict[str, Any] | None:
+        """Payload to write, or None when nothing changed since the last one."""
+        self._saved_at = time.monotonic()
+        if not self._dirty:
+            return None
+        self._dirty = False
+        return {
+            "saved_at": time.time(),
+            "providers": [
+                {"provider": provider, "profile": profile, **asdict(stats)}
+                for (provider, profile), stats in self._stats.items()
+            ],
+        }
+
+    def _write(self, payload: Dict[str, Any]):
+        try:
+            with self._write_lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(".tmp")
+                tmp_path.write_text(
+                    json.dumps(payload, ensure_ascii=False), encoding="utf-8"
+                )
+                tmp_path.replace(self.path)
+        except Exception as exc:
+            self._dirty = True
+            logger.warning("search.scoreboard_save_failed path=%s error=%s", self.path, exc)
+
+    def _save_in_background(self):
+        """Snapshot on the loop, write in a worker thread; sync without a loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        if self._save_task is not None and not self._save_task.done():
+            return
+        payload = self._snapshot()
+        if payload is not None:
+            self._save_task = loop.create_task(asyncio.to_thread(self._write, payload))
+
+    def save(self):
+        payload = self._snapshot()
+        if payload is not None:
+            self._write(payload)
+
+
+def adaptive_order_enabled() -> bool:
+    return _env_int("SEARCH_ADAPTIVE_ORDER", 1) > 0
+
+
+_SCOREBOARD: ProviderScoreboard | None = None
+
+
+def get_provider_scoreboard() -> ProviderScoreboard:
+    global _SCOREBOARD
+    if _SCOREBOARD is None:
+        _SCOREBOARD = ProviderScoreboard()
+    return _SCOREBOARD
+
+
+def save_provider_scoreboard():
+    """Flush pending stats (call on shutdown)."""
+    if _SCOREBOARD is not None:
+        _SCOREBOARD.save()
+
+
+def read_provider_stats(path: Path | None = None) -> List[Dict[str, Any]]:
+    """Saved stats as table rows, for processes without a live scoreboard."""
+    return ProviderScoreboard(path or provider_stats_path()).rows()
@@ -0,0 +1,135 @@
+# agent/tools/query_similarity.py
+"""Near-duplicate search queries for cache reuse.
+
+The query composer rewrites the same question in many ways ("погода київ
+завтра", "прогноз погоди Київ на завтра"), and the exact cache key only
+matches identical word sets. A query's signature is its set of stemmed
+content words: lowercased, function words and stopwords dropped, common
+Ukrainian/Russian/English endings cut so inflected forms coincide.
+
+Two signatures are similar by Jaccard overlap, but only when their numeric
+tokens (dates, years, versions) are identical: "iphone 15" never matches
+"iphone 16", however long the rest of the query is.
+
+`SimilarQueryIndex` remembers recent cache keys per scope (provider,
+profile, recency and domain filters) and returns the closest one above a
+threshold; nothing is shared across scopes. Overlap alone lets a query
+with one extra term ("курс долара нбу євро") match the shorter one, so the
+caller still has to check the extra terms against the reused results.
+"""
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Tuple
+
+_WORD_RE = re.compile(r"\w+")
+_MIN_STEM_CHARS = 3
+_CYRILLIC_RE = re.compile(r"[а-яіїєґё]")
+
+# Longest first, so "ами" wins over "и".
+_CYRILLIC_ENDINGS = tuple(
+    sorted(
+        {
+            "ами", "ями", "ого", "ому", "ему", "ими", "іми", "ові", "еві",
+            "ів", "їв", "ій", "ий", "их", "ої", "ою", "ею", "ам", "ям", "ах",
+            "ях", "ом", "ем", "ім", "им", "ая", "яя", "ое", "ее", "ые", "ой",
+            "ей", "ую", "юю", "ть", "ти", "ся",
+            "а", "я", "о", "е", "і", "и", "ї", "у", "ю", "ь", "ы", "й",
+        },
+        key=len,
+        reverse=True,
+    )
+)
+_LATIN_ENDINGS = ("ing", "ies", "ed", "es", "s")
+
+_FUNCTION_WORDS = frozenset(
+    {
+        "a", "an", "are", "at", "by", "for", "from", "how", "in", "is", "of",
+        "on", "or", "the", "to", "what", "when", "where", "which", "who", "with",
+        "в", "від", "до", "з", "за", "із", "й", "на", "не", "по", "та", "у", "чи",
+        "як", "яка", "які", "який", "яке", "де", "коли", "це", "що", "хто",
+        "и", "как", "какой", "какие", "где", "когда", "это", "что", "кто",
+    }
+)
+
+
+def stem(word: str) -> str:
+    """`word` without a common inflectional ending."""
+    endings = _CYRILLIC_ENDINGS if _CYRILLIC_RE.search(word) else _LATIN_ENDINGS
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM_CHARS:
+            return word[: -len(ending)]
+    return word
+
+
+def query_signature(query: str, stopwords: Iterable[str] = ()) -> FrozenSet[str]:
+    """Stemmed content words of `query`."""
+    skip = _FUNCTION_WORDS | frozenset(stopwords)
+    terms = set()
+    for word in _WORD_RE.findall((query or "").lower()):
+        if word in skip:
+            continue
+        if word.isdigit():
+            terms.add(word)
+        elif len(word) >= 2:
+            terms.add(stem(word))
+    return frozenset(terms)
+
+
+def _numbers(signature: FrozenSet[str]) -> FrozenSet[str]:
+    return frozenset(term for term in signature if any(ch.isdigit() for ch in term))
+
+
+def signature_similarity(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    """Jaccard overlap of two signatures; 0 when their numbers differ."""
+    if not left or not right or _numbers(left) != _numbers(right):
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class SimilarQueryIndex:
+    """Bounded LRU of cache keys and their signatures, grouped by scope."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max(0, int(max_items))
+        self._order: OrderedDict[Tuple[str, str], None] = OrderedDict()
+        self._scopes: Dict[str, Dict[str, FrozenSet[str]]] = {}
+
+    def add(self, scope: str, key: str, signature: FrozenSet[str]):
+        if self.max_items <= 0 or not signature:
+            return
+        self._scopes.setdefault(scope, {})[key] = signature
+        self._order[(scope, key)] = None
+        self._order.move_to_end((scope, key))
+        while len(self._order) > self.max_items:
+            old_scope, old_key = self._order.popitem(last=False)[0]
+            entries = self._scopes.get(old_scope, {})
+            entries.pop(old_key, None)
+            if not entries:
+                self._scopes.pop(old_scope, None)
+
+    def discard(self, scope: str, key: str):
+        self._order.pop((scope, key), None)
+        entries = self._scopes.get(scope, {})
+        entries.pop(key, None)
+        if not entries:
+            self._scopes.pop(scope, None)
+
+    def best_match(
+        self, scope: str, signature: FrozenSet[str], threshold: float
+    ) -> Tuple[str, FrozenSet[str], float] | None:
+        """(key, signature, similarity) of the closest indexed query at or above `threshold`."""
+        best: Tuple[str, FrozenSet[str], float] | None = None
+        for key, candidate in self._scopes.get(scope, {}).items():
+            score = signature_similarity(signature, candidate)
+            if score >= threshold and (best is None or score > best[2]):
+                best = (key, candidate, score)
+        return best
+
+    def clear(self):
+        self._order.clear()
+        self._scopes.clear()
+
+    def __len__(self) -> int:
+        return len(self._order)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import logging
 import os
@@ -8,18 +9,20 @@ import time
 import urllib.parse
 from typing import Dict, Iterable, List, Optional
 
-import requests
-
-from agent.search_task import NormalizedResult
+from agent.search_task import NormalizedResult, QueryMatcher
+from agent.tools.http_client import http_request
+from agent.tools.provider_scoreboard import adaptive_order_enabled, get_provider_scoreboard
+from agent.tools.query_similarity import SimilarQueryIndex, query_signature
 from core.env import (
     GEMINI_DEFAULT_BASE_URL,
     OPENAI_DEFAULT_BASE_URL,
     gemini_thinking_budget,
 )
-from db.search_repository import get_search_cache, put_search_cache
+from db.search_repository import get_search_cache_entry, put_search_cache
 
 MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "5"))
 TTL_MIN = int(os.getenv("SEARCH_CACHE_TTL_MIN", os.getenv("SEARCH_TTL_MIN", "60")))
+NEGATIVE_TTL_MIN = int(os.getenv("SEARCH_CACHE_NEGATIVE_TTL_MIN", "5"))
 
 HEADERS = {"User-Agent": "AISUSBot/1.0 (+https://example.local)"}
 logger = logging.getLogger(__name__)
@@ -78,6 +81,13 @@ PROFILE_FALLBACK_CANDIDATES = {
     "site_search": ("brave_search", "openai_search", "bing_html"),
 }
 
+# Profiles without an entry use TTL_MIN.
+PROFILE_CACHE_TTL_MIN = {
+    "news": 15,
+    "docs": 3 * 24 * 60,
+    "research_paper": 7 * 24 * 60,
+}
+
 PROVIDER_TIMEOUTS = {
     "brave_search": 8.0,
     "serper": 5.0,
@@ -195,15 +205,28 @@ def _provider_order(
         for provider in providers:
             if provider and provider not in ordered:
                 ordered.append(provider)
+    else:
+        primary = normalized_hint or PROFILE_PRIMARY_PROVIDER[normalized_profile]
+        ordered = [primary]
+        for provider in PROFILE_FALLBACK_CANDIDATES.get(normalized_profile, ()):
+            normalized_provider = _normalize_provider_name(provider)
+            if normalized_provider and normalized_provider not in ordered:
+                ordered.append(normalized_provider)
+    if not adaptive_order_enabled():
         return ordered
 
-    primary = normalized_hint or PROFILE_PRIMARY_PROVIDER[normalized_profile]
-    providers = [primary]
-    for provider in PROFILE_FALLBACK_CANDIDATES.get(normalized_profile, ()):
-        normalized_provider = _normalize_provider_name(provider)
-        if normalized_provider and normalized_provider not in providers:
-            providers.append(normalized_provider)
-    return providers
+    # The hint is an explicit choice; only the providers after it move.
+    adapted = get_provider_scoreboard().reorder(
+        ordered, normalized_profile, pinned=1 if normalized_hint else 0
+    )
+    if adapted != ordered:
+        logger.info(
+            "search.provider_order_adapted profile=%s configured=%s adapted=%s",
+            normalized_profile,
+            ",".join(ordered),
+            ",".join(adapted),
+        )
+    return adapted
 
 
 def _provider_is_available(provider: str) -> bool:
@@ -243,6 +266,35 @@ def normalize_cache_query(query: str) -> str:
     return re.sub(r"\s+", " ", raw).strip()
 
 
+def _cache_ttl_min(profile: str) -> int:
+    default = PROFILE_CACHE_TTL_MIN.get(profile, TTL_MIN)
+    raw = _env_first(f"SEARCH_PROFILE_{profile.upper()}_CACHE_TTL_MIN", default=str(default))
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        return default
+
+
+def _cache_stale_min(ttl_min: int) -> int:
+    """How long past its TTL an entry is still served while it is refreshed."""
+    try:
+        factor = float(_env_first("SEARCH_CACHE_STALE_FACTOR", default="1"))
+    except ValueError:
+        factor = 1.0
+    return max(0, int(ttl_min * factor))
+
+
+def search_cache_retention_min() -> int:
+    """Age after which no profile can use a search_cache row."""
+    return max(
+        NEGATIVE_TTL_MIN,
+        *(
+            _cache_ttl_min(profile) + _cache_stale_min(_cache_ttl_min(profile))
+            for profile in PROFILE_PRIMARY_PROVIDER
+        ),
+    )
+
+
 def _search_cache_query(
     query: str,
     mode: str,
@@ -268,6 +320,67 @@ def _search_cache_query(
     )
 
 
+def _search_cache_scope(cache_provider: str, cache_query: str) -> str:
+    """`cache_query` without its query words: what a reused entry must share."""
+    head, _, filters = cache_query.partition("|recency=")
+    version, _, rest = head.partition("|")
+    profile = rest.partition("|")[0]
+    return f"{cache_provider}|{version}|{profile}|recency={filters}"
+
+
+def _similar_cache_threshold() -> float | None:
+    if _env_first("SEARCH_SIMILAR_CACHE", default="1").lower() in {"0", "false", "no"}:
+        return None
+    try:
+        return float(_env_first("SEARCH_SIMILAR_CACHE_THRESHOLD", default="0.75"))
+    except ValueError:
+        return 0.75
+
+
+# Cache keys with results, for reuse by paraphrased queries in the same scope.
+_SIMILAR_QUERIES = SimilarQueryIndex(int(os.getenv("SEARCH_SIMILAR_CACHE_INDEX_SIZE", "2048")))
+
+
+async def _similar_cache_entry(
+    query: str,
+    cache_provider: str,
+    scope: str,
+    signature: frozenset[str],
+    ttl_min: int,
+):
+    """(entry, cache key, similarity) of a fresh cached paraphrase, or None.
+
+    The reused results must mention every term the new query adds to the
+    matched one and cover its required terms: "курс долара нбу євро" does
+    not get results cached for "курс долара нбу" unless they cover the euro.
+    """
+    threshold = _similar_cache_threshold()
+    if threshold is None:
+        return None
+    match = _SIMILAR_QUERIES.best_match(scope, signature, threshold)
+    if match is None:
+        return None
+    cache_query, matched_signature, similarity = match
+    entry = await get_search_cache_entry(cache_provider, cache_query, ttl_min)
+    if entry is None or entry.negative:
+        _SIMILAR_QUERIES.discard(scope, cache_query)
+        return None
+    haystack = " ".join(
+        _item_search_haystack(NormalizedResult.from_dict(item)) for item in entry.results
+    )
+    missing = sorted(term for term in signature - matched_signature if term not in haystack)
+    if missing or not _query_matcher(query).covers_required(haystack):
+        logger.info(
+            "search.similar_cache_rejected query=%s matched=%s similarity=%.2f missing=%s",
+            query[:200],
+            cache_query[:200],
+            similarity,
+            ",".join(missing) or "required",
+        )
+        return None
+    return entry, cache_query, similarity
+
+
 def _domain_matches(candidate: str, patterns: tuple[str, ...]) -> bool:
     lowered = (candidate or "").lower()
     return any(
@@ -327,27 +440,20 @@ def _title_from_url(url: str) -> str:
     return domain
 
 
-def _query_terms(query: str) -> list[str]:
-    terms = []
-    for term in re.findall(r"[\w-]+", urllib.parse.unquote_plus(query or "").lower()):
-        cleaned = "".join(ch for ch in term if ch.isalnum() or ch in {"-", "_"})
-        if len(cleaned) < 3:
-            continue
-        if cleaned in {
-            "the",
-            "and",
-            "для",
-            "про",
-            "що",
-            "новини",
-            "latest",
-            "fact",
-            "check",
-            "today",
-        }:
-            continue
-        terms.append(cleaned)
-    return terms
+_QUERY_STOPWORDS = frozenset(
+    {
+        "the",
+        "and",
+        "для",
+        "про",
+        "що",
+        "новини",
+        "latest",
+        "fact",
+        "check",
+        "today",
+    }
+)
 
 
 LOW_VALUE_QUERY_TERMS = {
@@ -393,18 +499,14 @@ QUERY_TERM_ALIASES = {
 }
 
 
-def _required_query_terms(query: str) -> list[str]:
-    required: list[str] = []
-    for term in _query_terms(query):
-        if term in LOW_VALUE_QUERY_TERMS:
-            continue
-        if term.isdigit():
-            continue
-        if re.fullmatch(r"\d{4}[-_]\d{2}[-_]\d{2}", term):
-            continue
-        if term not in required:
-            required.append(term)
-    return required[:8]
+def _query_matcher(query: str | QueryMatcher) -> QueryMatcher:
+    """Matcher with this module's stopwords; matchers pass through as-is."""
+    return QueryMatcher.of(
+        query,
+        stopwords=_QUERY_STOPWORDS,
+        low_value=LOW_VALUE_QUERY_TERMS,
+        aliases=QUERY_TERM_ALIASES,
+    )
 
 
 def _item_search_haystack(item: NormalizedResult) -> str:
@@ -419,11 +521,6 @@ def _item_search_haystack(item: NormalizedResult) -> str:
     ).lower()
 
 
-def _term_in_haystack(term: str, haystack: str) -> bool:
-    aliases = QUERY_TERM_ALIASES.get(term, (term,))
-    return any(alias in haystack for alias in aliases)
-
-
 def _snippet_length_score(snippet: str) -> float:
     length = len((snippet or "").strip())
     if length >= 220:
@@ -461,7 +558,7 @@ def _recency_bonus(raw: Dict) -> float:
 
 
 def _compute_relevance(
-    query: str,
+    query: str | QueryMatcher,
     raw: Dict,
     preferred_domains_allow: tuple[str, ...] = (),
 ) -> float:
@@ -479,7 +576,7 @@ def _compute_relevance(
     if not domain or domain in BLOCKED_RESULT_DOMAINS:
         return 0.0
 
-    terms = _query_terms(query)
+    terms = _query_matcher(query).terms
     haystack = " ".join([title, snippet, domain]).lower()
     overlap = 0.0
     if terms:
@@ -499,31 +596,8 @@ def _compute_relevance(
     )
 
 
-def _match_count(query: str, item: NormalizedResult) -> int:
-    haystack = _item_search_haystack(item)
-    return sum(1 for term in _query_terms(query) if _term_in_haystack(term, haystack))
-
-
-def _required_match_count(query: str, item: NormalizedResult) -> int:
-    haystack = _item_search_haystack(item)
-    return sum(
-        1 for term in _required_query_terms(query) if _term_in_haystack(term, haystack)
-    )
-
-
-def _minimum_required_matches(query: str) -> int:
-    required = _required_query_terms(query)
-    if not required:
-        return 0
-    if len(required) == 1:
-        return 1
-    if len(required) <= 3:
-        return len(required)
-    return max(2, min(4, (len(required) + 1) // 2))
-
-
 def _normalize_result(
-    query: str,
+    query: str | QueryMatcher,
     raw: Dict,
     provider: str,
     preferred_domains_allow: tuple[str, ...] = (),
@@ -560,68 +634,68 @@ def _normalize_result(
 
 
 def _normalize_bing_result(
-    raw: Dict, query: str, preferred_domains_allow: tuple[str, ...] = ()
+    raw: Dict, query: str | QueryMatcher, preferred_domains_allow: tuple[str, ...] = ()
 ) -> NormalizedResult | None:
     return _normalize_result(query, raw, "bing", preferred_domains_allow)
 
 
 def _normalize_serper_result(
-    raw: Dict, query: str, preferred_domains_allow: tuple[str, ...] = ()
+    raw: Dict, query: str | QueryMatcher, preferred_domains_allow: tuple[str, ...] = ()
 ) -> NormalizedResult | None:
     return _normalize_result(query, raw, "serper", preferred_domains_allow)
 
 
 def _normalize_tavily_result(
-    raw: Dict, query: str, preferred_domains_allow: tuple[str, ...] = ()
+    raw: Dict, query: str | QueryMatcher, preferred_domains_allow: tuple[str, ...] = ()
 ) -> NormalizedResult | None:
     return _normalize_result(query, raw, "tavily", preferred_domains_allow)
 
 
 def _normalize_gemini_result(
-    raw: Dict, query: str, preferred_domains_allow: tuple[str, ...] = ()
+    raw: Dict, query: str | QueryMatcher, preferred_domains_allow: tuple[str, ...] = ()
 ) -> NormalizedResult | None:
     return _normalize_result(query, raw, "gemini_search", preferred_domains_allow)
 
 
 def _normalize_perplexity_result(
-    raw: Dict, query: str, preferred_domains_allow: tuple[str, ...] = ()
+    raw: Dict, query: str | QueryMatcher, preferred_domains_allow: tuple[str, ...] = ()
 ) -> NormalizedResult | None:
     return _normalize_result(query, raw, "perplexity_search", preferred_domains_allow)
 
 
 def _normalize_openai_result(
-    raw: Dict, query: str, preferred_domains_allow: tuple[str, ...] = ()
+    raw: Dict, query: str | QueryMatcher, preferred_domains_allow: tuple[str, ...] = ()
 ) -> NormalizedResult | None:
     return _normalize_result(query, raw, "openai_search", preferred_domains_allow)
 
 
 def _normalize_exa_result(
-    raw: Dict, query: str, preferred_domains_allow: tuple[str, ...] = ()
+    raw: Dict, query: str | QueryMatcher, preferred_domains_allow: tuple[str, ...] = ()
 ) -> NormalizedResult | None:
     return _normalize_result(query, raw, "exa_search", preferred_domains_allow)
 
 
 def _normalize_brave_result(
-    raw: Dict, query: str, preferred_domains_allow: tuple[str, ...] = ()
+    raw: Dict, query: str | QueryMatcher, preferred_domains_allow: tuple[str, ...] = ()
 ) -> NormalizedResult | None:
     return _normalize_result(query, raw, "brave_search", preferred_domains_allow)
 
 
 def _normalize_bing_html_result(
-    raw: Dict, query: str, preferred_domains_allow: tuple[str, ...] = ()
+    raw: Dict, query: str | QueryMatcher, preferred_domains_allow: tuple[str, ...] = ()
 ) -> NormalizedResult | None:
     return _normalize_result(query, raw, "bing_html", preferred_domains_allow)
 
 
 def _normalize_ddg_result(
-    raw: Dict, query: str, preferred_domains_allow: tuple[str, ...] = ()
+    raw: Dict, query: str | QueryMatcher, preferred_domains_allow: tuple[str, ...] = ()
 ) -> NormalizedResult | None:
     return _normalize_result(query, raw, "ddg", preferred_domains_allow)
 
 
 def _normalize_provider_item(
     raw: Dict,
-    query: str,
+    query: str | QueryMatcher,
     preferred_domains_allow: tuple[str, ...] = (),
 ) -> NormalizedResult | None:
     provider = str(raw.get("provider") or "").strip().lower()
@@ -664,15 +738,16 @@ def _apply_domain_filters(
 
 
 def _filter_and_rank_results(
-    query: str,
+    query: str | QueryMatcher,
     items: List[NormalizedResult],
     limit: int,
     preferred_domains_allow: tuple[str, ...] = (),
     preferred_domains_deny: tuple[str, ...] = (),
 ) -> List[NormalizedResult]:
+    matcher = _query_matcher(query)
     prepared = []
     seen = set()
-    minimum_required_matches = _minimum_required_matches(query)
+    minimum_required_matches = matcher.minimum_required
     filtered_items = _apply_domain_filters(
         items,
         preferred_domains_allow,
@@ -683,14 +758,8 @@ def _filter_and_rank_results(
         if unique_key in seen:
             continue
         seen.add(unique_key)
-        prepared.append(
-            (
-                item,
-                item.relevance_score,
-                _match_count(query, item),
-                _required_match_count(query, item),
-            )
-        )
+        matches, required_matches = matcher.scan(_item_search_haystack(item))
+        prepared.append((item, item.relevance_score, matches, required_matches))
 
     if not prepared:
         return []
@@ -709,7 +778,7 @@ def _filter_and_rank_results(
     )
     ranked = [item for item, _score, _matches, _required_matches in sorted_items]
 
-    minimum_matches = 2 if len(_query_terms(query)) >= 3 else 1
+    minimum_matches = 2 if len(matcher.terms) >= 3 else 1
     strong = []
     for item, _score, matches, required_matches in sorted_items:
         domain = item.domain
@@ -730,33 +799,15 @@ def _filter_and_rank_results(
 
     if strong:
         return strong[:limit]
-    if len(_query_terms(query)) >= 3:
+    if len(matcher.terms) >= 3:
         return []
     return ranked[:limit]
 
 
-def _search_bing_html(
-    query: str,
-    limit: int,
-    preferred_domains_allow: tuple[str, ...] = (),
-    preferred_domains_deny: tuple[str, ...] = (),
-) -> List[NormalizedResult]:
+def _parse_bing_html(html: str, limit: int) -> List[Dict]:
     from bs4 import BeautifulSoup
 
-    params = {"q": query}
-    if _query_prefers_latin_market(query):
-        params.update({"cc": "us", "setlang": "en", "mkt": "en-US"})
-    else:
-        params.update({"cc": "ua", "setlang": "uk", "mkt": "uk-UA"})
-
-    resp = requests.get(
-        "https://www.bing.com/search",
-        headers=HEADERS,
-        params=params,
-        timeout=_provider_timeout("bing_html"),
-    )
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
+    soup = BeautifulSoup(html, "html.parser")
     items = []
     for node in soup.select("li.b_algo"):
         a = node.select_one("h2 a")
@@ -773,34 +824,44 @@ def _search_bing_html(
         )
         if len(items) >= limit:
             break
-    return _filter_provider_items(
-        query,
-        items,
-        limit,
-        preferred_domains_allow,
-        preferred_domains_deny,
-    )
+    return items
 
 
-def _search_ddg_html(
+async def _search_bing_html(
     query: str,
     limit: int,
     preferred_domains_allow: tuple[str, ...] = (),
     preferred_domains_deny: tuple[str, ...] = (),
 ) -> List[NormalizedResult]:
-    from bs4 import BeautifulSoup
-
     params = {"q": query}
-    params["kl"] = "us-en" if _query_prefers_latin_market(query) else "ua-uk"
+    if _query_prefers_latin_market(query):
+        params.update({"cc": "us", "setlang": "en", "mkt": "en-US"})
+    else:
+        params.update({"cc": "ua", "setlang": "uk", "mkt": "uk-UA"})
 
-    resp = requests.get(
-        "https://html.duckduckgo.com/html/",
+    resp = await http_request(
+        "GET",
+        "https://www.bing.com/search",
         headers=HEADERS,
         params=params,
-        timeout=_provider_timeout("ddg"),
+        timeout=_provider_timeout("bing_html"),
     )
     resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
+    # HTML parsing is CPU-bound; keep it off the event loop.
+    items = await asyncio.to_thread(_parse_bing_html, resp.text, limit)
+    return _filter_provider_items(
+        query,
+        items,
+        limit,
+        preferred_domains_allow,
+        preferred_domains_deny,
+    )
+
+
+def _parse_ddg_html(html: str, limit: int) -> List[Dict]:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
     items = []
     for a in soup.select("a.result__a")[:limit]:
         title = a.get_text(" ", strip=True)
@@ -813,6 +874,27 @@ def _search_ddg_html(
         items.append(
             {"title": title, "url": href, "snippet": snippet, "provider": "ddg"}
         )
+    return items
+
+
+async def _search_ddg_html(
+    query: str,
+    limit: int,
+    preferred_domains_allow: tuple[str, ...] = (),
+    preferred_domains_deny: tuple[str, ...] = (),
+) -> List[NormalizedResult]:
+    params = {"q": query}
+    params["kl"] = "us-en" if _query_prefers_latin_market(query) else "ua-uk"
+
+    resp = await http_request(
+        "GET",
+        "https://html.duckduckgo.com/html/",
+        headers=HEADERS,
+        params=params,
+        timeout=_provider_timeout("ddg"),
+    )
+    resp.raise_for_status()
+    items = await asyncio.to_thread(_parse_ddg_html, resp.text, limit)
     return _filter_provider_items(
         query,
         items,
@@ -829,14 +911,15 @@ def _filter_provider_items(
     preferred_domains_allow: tuple[str, ...],
     preferred_domains_deny: tuple[str, ...],
 ) -> List[NormalizedResult]:
+    matcher = _query_matcher(query)
     normalized = []
     for raw in items:
-        item = _normalize_provider_item(raw, query, preferred_domains_allow)
+        item = _normalize_provider_item(raw, matcher, preferred_domains_allow)
         if item is None:
             continue
         normalized.append(item)
     return _filter_and_rank_results(
-        query,
+        matcher,
         normalized,
         limit,
         preferred_domains_allow,
@@ -895,7 +978,7 @@ def _gemini_grounding_items(data: Dict) -> List[Dict]:
     return items
 
 
-def _search_gemini_grounded(
+async def _search_gemini_grounded(
     query: str,
     limit: int,
     preferred_domains_allow: tuple[str, ...] = (),
@@ -937,7 +1020,8 @@ def _search_gemini_grounded(
             "thinkingBudget": thinking_budget
         }
 
-    resp = requests.post(
+    resp = await http_request(
+        "POST",
         _gemini_search_endpoint(model),
         headers={
             "x-goog-api-key": api_key,
@@ -984,7 +1068,7 @@ def _openai_output_text(data: Dict) -> str:
     return "\n".join(blocks).strip()
 
 
-def _search_openai_grounded(
+async def _search_openai_grounded(
     query: str,
     limit: int,
     preferred_domains_allow: tuple[str, ...] = (),
@@ -1008,7 +1092,8 @@ def _search_openai_grounded(
         "include": ["web_search_call.action.sources"],
         "input": query,
     }
-    resp = requests.post(
+    resp = await http_request(
+        "POST",
         f"{base_url}/responses",
         headers={
             "Authorization": f"Bearer {_provider_api_key('openai')}",
@@ -1049,7 +1134,7 @@ def _search_openai_grounded(
     )
 
 
-def _search_perplexity(
+async def _search_perplexity(
     query: str,
     limit: int,
     recency_days: Optional[int],
@@ -1080,7 +1165,8 @@ def _search_perplexity(
     if languages:
         body["search_language_filter"] = list(languages[:10])
 
-    resp = requests.post(
+    resp = await http_request(
+        "POST",
         "https://api.perplexity.ai/search",
         headers={
             "Authorization": f"Bearer {_provider_api_key('perplexity')}",
@@ -1117,7 +1203,7 @@ def _search_perplexity(
     )
 
 
-def _search_brave(
+async def _search_brave(
     query: str,
     limit: int,
     recency_days: Optional[int],
@@ -1141,7 +1227,8 @@ def _search_brave(
         params["search_lang"] = languages[0]
         params["ui_lang"] = f"{languages[0]}-{country or 'US'}"
 
-    resp = requests.get(
+    resp = await http_request(
+        "GET",
         "https://api.search.brave.com/res/v1/web/search",
         headers={
             "X-Subscription-Token": _provider_api_key("brave"),
@@ -1188,7 +1275,7 @@ def _exa_profile_category(profile: str) -> str | None:
     return None
 
 
-def _search_exa(
+async def _search_exa(
     query: str,
     limit: int,
     recency_days: Optional[int],
@@ -1214,7 +1301,8 @@ def _search_exa(
     if recency_days:
         body["startPublishedDate"] = _start_date_iso(recency_days)
 
-    resp = requests.post(
+    resp = await http_request(
+        "POST",
         "https://api.exa.ai/search",
         headers={
             "x-api-key": _provider_api_key("exa"),
@@ -1264,7 +1352,7 @@ def _tavily_topic(profile: str, mode: str) -> str:
     return "general"
 
 
-def _search_tavily(
+async def _search_tavily(
     query: str,
     limit: int,
     recency_days: Optional[int],
@@ -1287,7 +1375,8 @@ def _search_tavily(
         body["exclude_domains"] = list(preferred_domains_deny[:20])
     if recency_days:
         body["days"] = recency_days
-    resp = requests.post(
+    resp = await http_request(
+        "POST",
         "https://api.tavily.com/search",
         headers={
             "Authorization": f"Bearer {_provider_api_key('tavily')}",
@@ -1319,7 +1408,7 @@ def _search_tavily(
     )
 
 
-def _search_with_provider(
+async def _search_with_provider(
     provider: str,
     query: str,
     limit: int,
@@ -1343,7 +1432,8 @@ def _search_with_provider(
             params["freshness"] = (
                 "Day" if recency_days <= 1 else "Week" if recency_days <= 7 else "Month"
             )
-        resp = requests.get(
+        resp = await http_request(
+            "GET",
             url,
             headers={
                 "Ocp-Apim-Subscription-Key": _provider_api_key("bing"),
@@ -1379,7 +1469,8 @@ def _search_with_provider(
             body["tbs"] = (
                 f"qdr:{'d' if recency_days <= 1 else 'w' if recency_days <= 7 else 'm'}"
             )
-        resp = requests.post(
+        resp = await http_request(
+            "POST",
             url,
             headers={
                 "X-API-KEY": _provider_api_key("serper"),
@@ -1410,7 +1501,7 @@ def _search_with_provider(
         )
 
     if provider == "tavily" and _provider_api_key("tavily"):
-        return _search_tavily(
+        return await _search_tavily(
             query,
             limit,
             recency_days,
@@ -1421,7 +1512,7 @@ def _search_with_provider(
         )
 
     if provider == "gemini_search" and _provider_api_key("gemini"):
-        return _search_gemini_grounded(
+        return await _search_gemini_grounded(
             query,
             limit,
             preferred_domains_allow,
@@ -1429,7 +1520,7 @@ def _search_with_provider(
         )
 
     if provider == "perplexity_search" and _provider_api_key("perplexity"):
-        return _search_perplexity(
+        return await _search_perplexity(
             query,
             limit,
             recency_days,
@@ -1440,7 +1531,7 @@ def _search_with_provider(
         )
 
     if provider == "openai_search" and _provider_is_available("openai_search"):
-        return _search_openai_grounded(
+        return await _search_openai_grounded(
             query,
             limit,
             preferred_domains_allow,
@@ -1449,7 +1540,7 @@ def _search_with_provider(
         )
 
     if provider == "exa_search" and _provider_api_key("exa"):
-        return _search_exa(
+        return await _search_exa(
             query,
             limit,
             recency_days,
@@ -1460,7 +1551,7 @@ def _search_with_provider(
         )
 
     if provider == "brave_search" and _provider_api_key("brave"):
-        return _search_brave(
+        return await _search_brave(
             query,
             limit,
             recency_days,
@@ -1471,14 +1562,14 @@ def _search_with_provider(
         )
 
     if provider == "bing_html":
-        return _search_bing_html(
+        return await _search_bing_html(
             query,
             limit,
             preferred_domains_allow,
             preferred_domains_deny,
         )
     if provider == "ddg":
-        return _search_ddg_html(
+        return await _search_ddg_html(
             query,
             limit,
             preferred_domains_allow,
@@ -1487,7 +1578,7 @@ def _search_with_provider(
     return []
 
 
-def _extract_with_tavily(
+async def _extract_with_tavily(
     query: str,
     urls: list[str],
     max_chars: int,
@@ -1500,7 +1591,8 @@ def _extract_with_tavily(
         "chunks_per_source": 3,
         "extract_depth": "advanced",
     }
-    resp = requests.post(
+    resp = await http_request(
+        "POST",
         "https://api.tavily.com/extract",
         headers={
             "Authorization": f"Bearer {_provider_api_key('tavily')}",
@@ -1529,6 +1621,97 @@ def _extract_with_tavily(
     return pages
 
 
+def _extract_deadline_sec() -> float:
+    try:
+        return max(0.5, float(_env_first("SEARCH_EXTRACT_DEADLINE_SEC", default="8")))
+    except ValueError:
+        return 8.0
+
+
+def _fetch_setting(name: str, default: int, *, minimum: int = 1) -> int:
+    try:
+        return max(minimum, int(_env_first(name, default=str(default))))
+    except ValueError:
+        return default
+
+
+async def _fetch_pages_concurrently(
+    urls: list[str],
+    *,
+    needed: int,
+    deadline: float,
+) -> dict[str, str]:
+    """Fetch ranked `urls` in parallel until the best `needed` are settled.
+
+    `urls` is in rank order. Fetching stops once `needed` pages are in
+    with every higher-ranked URL resolved (fetched or failed), so a fast
+    spare never displaces a slower, better-ranked page, or once `deadline`
+    passes. SEARCH_FETCH_CONCURRENCY caps requests in flight for this call
+    and SEARCH_FETCH_PER_HOST caps them per domain. Stragglers are
+    cancelled.
+    """
+    from agent.tools.fetch_page import fetch_page
+
+    if not urls or needed <= 0:
+        return {}
+    loop = asyncio.get_running_loop()
+    all_slots = asyncio.Semaphore(_fetch_setting("SEARCH_FETCH_CONCURRENCY", 4))
+    per_host = _fetch_setting("SEARCH_FETCH_PER_HOST", 2)
+    host_slots: dict[str, asyncio.Semaphore] = {}
+
+    async def fetch(url: str) -> str:
+        # Host slot first: waiting on a busy host must not hold a global slot.
+        host_slot = host_slots.setdefault(
+            _normalized_domain(url), asyncio.Semaphore(per_host)
+        )
+        async with host_slot, all_slots:
+            return await fetch_page(url)
+
+    tasks = {asyncio.ensure_future(fetch(url)): url for url in urls}
+    pages: dict[str, str] = {}
+
+    def settled() -> bool:
+        pending = set(tasks.values())
+        found = 0
+        for url in urls:
+            if url in pending:
+                return False
+            if url in pages:
+                found += 1
+                if found >= needed:
+                    return True
+        return True
+
+    try:
+        while tasks and not settled():
+            timeout = deadline - loop.time()
+            done = set()
+            if timeout > 0:
+                done, _pending = await asyncio.wait(
+                    tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+            if not done:
+                logger.info(
+                    "search.extract_deadline pages=%s pending=%s",
+                    len(pages),
+                    len(tasks),
+                )
+                break
+            for task in done:
+                url = tasks.pop(task)
+                try:
+                    page_text = task.result()
+                except Exception as exc:
+                    logger.warning("search.fetch_failed url=%s error=%s", url, exc)
+                    continue
+                if page_text:
+                    pages[url] = page_text
+    finally:
+        for task in tasks:
+            task.cancel()
+    return pages
+
+
 async def extract_search_pages(
     query: str,
     results: list[NormalizedResult],
@@ -1538,8 +1721,8 @@ async def extract_search_pages(
     profile: str = "general",
     need_primary_source: bool = False,
 ) -> list[NormalizedResult]:
-    from agent.tools.fetch_page import fetch_page
-
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + _extract_deadline_sec()
     urls: list[str] = []
     preferred_urls: list[str] = []
     result_by_url = {result.url: result for result in results if result.url}
@@ -1570,7 +1753,11 @@ async def extract_search_pages(
     page_map: dict[str, NormalizedResult] = {}
     if candidate_urls and _provider_api_key("tavily"):
         try:
-            for page in _extract_with_tavily(query, candidate_urls, max_chars):
+            tavily_pages = await asyncio.wait_for(
+                _extract_with_tavily(query, candidate_urls, max_chars),
+                timeout=max(0.0, deadline - loop.time()),
+            )
+            for page in tavily_pages:
                 url = _normalized_url(str(page.get("url") or ""))
                 if not url:
                     continue
@@ -1588,20 +1775,31 @@ async def extract_search_pages(
                 page_map[url] = match.with_full_content(
                     str(page.get("text") or "")[:max_chars]
                 )
+        except asyncio.TimeoutError:
+            logger.warning("search.extract_failed provider=tavily error=deadline")
         except Exception as exc:
             logger.warning("search.extract_failed provider=tavily error=%s", exc)
 
-    have_urls = set(page_map)
-    for url in candidate_urls:
-        if url in have_urls:
-            continue
-        try:
-            page_text = await fetch_page(url)
-        except Exception as exc:
-            logger.warning("search.fetch_failed url=%s error=%s", url, exc)
-            continue
-        if not page_text:
+    # A couple of spare URLs race alongside, so one dead site does not cost
+    # a page; they are cancelled once the better-ranked URLs have settled.
+    needed = max_pages - len(page_map)
+    fetch_urls: list[str] = []
+    if needed > 0:
+        spare = _fetch_setting("SEARCH_FETCH_SPARE_PAGES", 2, minimum=0)
+        fetch_urls = [url for url in deduped_urls if url not in page_map][
+            : needed + spare
+        ]
+    fetched = await _fetch_pages_concurrently(
+        fetch_urls,
+        needed=needed,
+        deadline=deadline,
+    )
+    for url in fetch_urls:
+        page_text = fetched.get(url)
+        if not page_text or url in page_map:
             continue
+        if len(page_map) >= max_pages:
+            break
         match = result_by_url.get(url)
         if match is None:
             match = NormalizedResult.from_dict(
@@ -1614,8 +1812,6 @@ async def extract_search_pages(
                 }
             )
         page_map[url] = match.with_full_content(page_text[:max_chars])
-        if len(page_map) >= max_pages:
-            break
 
     pages = list(page_map.values())[:max_pages]
     if profile in {"docs", "research_paper"} and not pages:
@@ -1623,6 +1819,280 @@ async def extract_search_pages(
     return pages
 
 
+async def _live_provider_search(
+    provider: str,
+    query: str,
+    limit: int,
+    recency_days: Optional[int],
+    *,
+    mode: str,
+    profile: str,
+    preferred_domains: tuple[str, ...],
+    preferred_domains_deny: tuple[str, ...],
+    country: str | None,
+    languages: tuple[str, ...],
+    provider_hint: str | None,
+) -> List[NormalizedResult] | None:
+    """One provider call, logged and scored; None when it failed."""
+    started_at = time.perf_counter()
+    try:
+        items = await _search_with_provider(
+            provider,
+            query,
+            limit,
+            recency_days,
+            preferred_domains,
+            preferred_domains_deny,
+            profile,
+            mode,
+            country,
+            languages,
+        )
+    except asyncio.CancelledError:
+        # A race loser: its latency is at least the time it ran, and it gave
+        # no answer. Leaving it out would bias its p50/p95 low.
+        get_provider_scoreboard().record(
+            provider,
+            profile,
+            ok=True,
+            results=0,
+            acceptable=False,
+            latency_ms=int((time.perf_counter() - started_at) * 1000),
+        )
+        raise
+    except Exception as exc:
+        elapsed_ms = int((time.perf_counter() - started_at) * 1000)
+        get_provider_scoreboard().record(
+            provider,
+            profile,
+            ok=False,
+            results=0,
+            acceptable=False,
+            latency_ms=elapsed_ms,
+        )
+        logger.warning(
+            "search.provider_failed provider=%s query=%s error=%s profile=%s hint=%s",
+            provider,
+            query[:200],
+            exc,
+            profile,
+            _normalize_provider_name(provider_hint),
+        )
+        _search_log.info(
+            "search_api_call provider=%s profile=%s mode=%s query=%r results=%d latency_ms=%d error=%s",
+            provider,
+            profile,
+            mode,
+            query[:200],
+            0,
+            elapsed_ms,
+            exc.__class__.__name__,
+        )
+        return None
+    elapsed_ms = int((time.perf_counter() - started_at) * 1000)
+    get_provider_scoreboard().record(
+        provider,
+        profile,
+        ok=True,
+        results=len(items),
+        acceptable=len(items) >= min(2, limit),
+        latency_ms=elapsed_ms,
+    )
+    logger.info(
+        "search.provider_results provider=%s query=%s items=%s profile=%s hint=%s",
+        provider,
+        query[:200],
+        len(items),
+        profile,
+        _normalize_provider_name(provider_hint),
+    )
+    _search_log.info(
+        "search_api_call provider=%s profile=%s mode=%s query=%r results=%d latency_ms=%d error=%s",
+        provider,
+        profile,
+        mode,
+        query[:200],
+        len(items),
+        elapsed_ms,
+        "",
+    )
+    return items
+
+
+_CACHE_REFRESHES: dict[str, asyncio.Task] = {}
+
+
+def _refresh_cache_in_background(cache_provider: str, cache_query: str, search) -> bool:
+    """Re-run `search` and store its results; one refresh per key at a time.
+
+    A failed or empty refresh leaves the stale entry in place.
+    """
+    key = f"{cache_provider}|{cache_query}"
+    if key in _CACHE_REFRESHES:
+        return False
+
+    async def refresh():
+        try:
+            items = await search()
+            if items:
+                await put_search_cache(
+                    cache_provider, cache_query, [item.to_dict() for item in items]
+                )
+        except Exception as exc:
+            logger.warning("search.cache_refresh_failed key=%s error=%s", key[:200], exc)
+        finally:
+            _CACHE_REFRESHES.pop(key, None)
+
+    _CACHE_REFRESHES[key] = asyncio.create_task(refresh())
+    return True
+
+
+async def _attempt_provider(
+    provider: str,
+    query: str,
+    limit: int,
+    recency_days: Optional[int],
+    *,
+    mode: str,
+    profile: str,
+    preferred_domains: tuple[str, ...],
+    preferred_domains_deny: tuple[str, ...],
+    country: str | None,
+    languages: tuple[str, ...],
+    provider_hint: str | None,
+    read_cache: bool = True,
+    call_live: bool = True,
+) -> List[NormalizedResult] | None:
+    """Cached-or-live results of one provider; None when the call failed.
+
+    `call_live=False` only looks at the cache (None on a miss);
+    `read_cache=False` goes straight to the provider.
+
+    Cache entries live for the profile TTL (`_cache_ttl_min`). For another
+    `_cache_stale_min` they are still returned while a background call
+    refreshes them. Empty and failed responses are cached as negative
+    entries for NEGATIVE_TTL_MIN, so retries skip a provider that has
+    nothing for the query. Without an exact entry, fresh results of a
+    paraphrase with a similar signature (SEARCH_SIMILAR_CACHE_THRESHOLD)
+    in the same scope are reused.
+    """
+    cache_provider = _provider_cache_key(provider)
+    cache_query = _search_cache_query(
+        query,
+        mode,
+        profile,
+        recency_days,
+        preferred_domains,
+        preferred_domains_deny,
+        country,
+        languages,
+    )
+
+    def live_search():
+        return _live_provider_search(
+            provider,
+            query,
+            limit,
+            recency_days,
+            mode=mode,
+            profile=profile,
+            preferred_domains=preferred_domains,
+            preferred_domains_deny=preferred_domains_deny,
+            country=country,
+            languages=languages,
+            provider_hint=provider_hint,
+        )
+
+    ttl_min = _cache_ttl_min(profile)
+    cached = None
+    if read_cache:
+        cached = await get_search_cache_entry(
+            cache_provider,
+            cache_query,
+            ttl_min,
+            stale_min=_cache_stale_min(ttl_min),
+            negative_ttl_min=NEGATIVE_TTL_MIN,
+        )
+    scope = _search_cache_scope(cache_provider, cache_query)
+    signature = query_signature(query, _QUERY_STOPWORDS)
+    source, matched_query, similarity = "exact", cache_query, 1.0
+    if cached is not None:
+        if not cached.negative:
+            _SIMILAR_QUERIES.add(scope, cache_query, signature)
+    elif read_cache:
+        similar = await _similar_cache_entry(
+            query, cache_provider, scope, signature, ttl_min
+        )
+        if similar is not None:
+            cached, matched_query, similarity = similar
+            source = "similar"
+    if cached is not None:
+        items = [NormalizedResult.from_dict(item) for item in cached.results[:limit]]
+        refreshing = cached.stale and _refresh_cache_in_background(
+            cache_provider, cache_query, live_search
+        )
+        state = "negative" if cached.negative else "stale" if cached.stale else "fresh"
+        logger.info(
+            "search.provider_cache_hit provider=%s query=%s items=%s profile=%s hint=%s "
+            "state=%s refreshing=%s source=%s similarity=%.2f matched=%s",
+            provider,
+            query[:200],
+            len(items),
+            profile,
+            _normalize_provider_name(provider_hint),
+            state,
+            refreshing,
+            source,
+            similarity,
+            matched_query[:200],
+        )
+        _search_log.info(
+            "search_cache_hit provider=%s profile=%s mode=%s query=%r results=%d ttl_min=%d "
+            "state=%s source=%s similarity=%.2f",
+            provider,
+            profile,
+            mode,
+            query[:200],
+            len(items),
+            NEGATIVE_TTL_MIN if cached.negative else ttl_min,
+            state,
+            source,
+            similarity,
+        )
+        return items
+    if not call_live:
+        return None
+
+    items = await live_search()
+    await put_search_cache(
+        cache_provider,
+        cache_query,
+        [item.to_dict() for item in items or []],
+    )
+    if items:
+        _SIMILAR_QUERIES.add(scope, cache_query, signature)
+    return items
+
+
+def _race_enabled() -> bool:
+    return _env_first("SEARCH_PROVIDER_RACE", default="0").lower() in {"1", "true", "yes"}
+
+
+def _race_stagger_sec() -> float:
+    try:
+        return max(0.0, float(_env_first("SEARCH_PROVIDER_RACE_STAGGER_MS", default="300")) / 1000)
+    except ValueError:
+        return 0.3
+
+
+async def _staggered(delay: float, attempt, provider: str, **kwargs):
+    # The attempt starts only after the delay: a task cancelled while it
+    # sleeps leaves no un-awaited coroutine behind.
+    if delay:
+        await asyncio.sleep(delay)
+    return await attempt(provider, **kwargs)
+
+
 async def search_web(
     query: str,
     max_results: Optional[int] = None,
@@ -1636,6 +2106,14 @@ async def search_web(
     languages: tuple[str, ...] = (),
     provider_hint: str | None = None,
 ) -> List[NormalizedResult]:
+    """Results of the first provider that returns enough of them.
+
+    Providers are tried in `_provider_order`. With SEARCH_PROVIDER_RACE=1
+    two of them are in flight at once (the second staggered by
+    SEARCH_PROVIDER_RACE_STAGGER_MS) and the first acceptable answer wins;
+    the other call is cancelled. SEARCH_PROVIDER_ATTEMPT_LIMIT bounds the
+    providers tried once any of them has returned something.
+    """
     limit = min(max_results or MAX_RESULTS, 10)
     normalized_profile = _search_profile(mode, profile)
     best_items: List[NormalizedResult] = []
@@ -1645,7 +2123,9 @@ async def search_web(
     max_attempted_providers = int(
         os.getenv("SEARCH_PROVIDER_ATTEMPT_LIMIT", "2") or "2"
     )
+    hint = _normalize_provider_name(provider_hint)
 
+    providers: list[str] = []
     for provider in _provider_order(
         mode,
         normalized_profile,
@@ -1658,126 +2138,111 @@ async def search_web(
                 query[:200],
             )
             continue
+        providers.append(provider)
 
-        attempted_providers += 1
-        cache_provider = _provider_cache_key(provider)
-        cache_query = _search_cache_query(
+    def attempt(provider: str, **kwargs):
+        return _attempt_provider(
+            provider,
             query,
+            limit,
+            recency_days,
+            mode=mode,
+            profile=normalized_profile,
+            preferred_domains=preferred_domains,
+            preferred_domains_deny=preferred_domains_deny,
+            country=country,
+            languages=languages,
+            provider_hint=provider_hint,
+            **kwargs,
+        )
+
+    def selected(provider: str, items: List[NormalizedResult]) -> List[NormalizedResult]:
+        logger.info(
+            "search.provider_selected provider=%s query=%s items=%s profile=%s mode=%s hint=%s",
+            provider,
+            query[:200],
+            len(items),
+            normalized_profile,
             mode,
+            hint,
+        )
+        return items[:limit]
+
+    def attempt_limit_reached() -> List[NormalizedResult]:
+        logger.warning(
+            "search.provider_attempt_limit_reached query=%s attempts=%s best_provider=%s items=%s profile=%s mode=%s hint=%s",
+            query[:200],
+            attempted_providers,
+            best_provider,
+            len(best_items),
             normalized_profile,
-            recency_days,
-            preferred_domains,
-            preferred_domains_deny,
-            country,
-            languages,
+            mode,
+            hint,
         )
-        cached = await get_search_cache(cache_provider, cache_query, TTL_MIN)
-        if cached:
-            items = [NormalizedResult.from_dict(item) for item in cached[:limit]]
-            logger.info(
-                "search.provider_cache_hit provider=%s query=%s items=%s profile=%s hint=%s",
-                provider,
-                query[:200],
-                len(items),
-                normalized_profile,
-                _normalize_provider_name(provider_hint),
-            )
-            _search_log.info(
-                "search_cache_hit provider=%s profile=%s mode=%s query=%r results=%d ttl_min=%d",
-                provider,
-                normalized_profile,
-                mode,
-                query[:200],
-                len(items),
-                TTL_MIN,
-            )
-        else:
-            started_at = time.perf_counter()
-            try:
-                items = _search_with_provider(
-                    provider,
-                    query,
-                    limit,
-                    recency_days,
-                    preferred_domains,
-                    preferred_domains_deny,
-                    normalized_profile,
-                    mode,
-                    country,
-                    languages,
-                )
-            except Exception as exc:
-                elapsed_ms = int((time.perf_counter() - started_at) * 1000)
-                logger.warning(
-                    "search.provider_failed provider=%s query=%s error=%s profile=%s hint=%s",
-                    provider,
-                    query[:200],
-                    exc,
-                    normalized_profile,
-                    _normalize_provider_name(provider_hint),
-                )
-                _search_log.info(
-                    "search_api_call provider=%s profile=%s mode=%s query=%r results=%d latency_ms=%d error=%s",
-                    provider,
-                    normalized_profile,
-                    mode,
-                    query[:200],
-                    0,
-                    elapsed_ms,
-                    exc.__class__.__name__,
-                )
-                continue
-            elapsed_ms = int((time.perf_counter() - started_at) * 1000)
-            await put_search_cache(
-                cache_provider,
-                cache_query,
-                [item.to_dict() for item in items],
-            )
-            logger.info(
-                "search.provider_results provider=%s query=%s items=%s profile=%s hint=%s",
-                provider,
-                query[:200],
-                len(items),
-                normalized_profile,
-                _normalize_provider_name(provider_hint),
-            )
-            _search_log.info(
-                "search_api_call provider=%s profile=%s mode=%s query=%r results=%d latency_ms=%d error=%s",
-                provider,
-                normalized_profile,
-                mode,
-                query[:200],
-                len(items),
-                elapsed_ms,
-                "",
-            )
+        return best_items[:limit]
 
-        if len(items) > len(best_items):
-            best_items = items
-            best_provider = provider
-        if len(items) >= minimum_acceptable:
-            logger.info(
-                "search.provider_selected provider=%s query=%s items=%s profile=%s mode=%s hint=%s",
-                provider,
-                query[:200],
-                len(items),
-                normalized_profile,
-                mode,
-                _normalize_provider_name(provider_hint),
-            )
-            return items[:limit]
-        if attempted_providers >= max_attempted_providers and best_items:
-            logger.warning(
-                "search.provider_attempt_limit_reached query=%s attempts=%s best_provider=%s items=%s profile=%s mode=%s hint=%s",
-                query[:200],
-                attempted_providers,
-                best_provider,
-                len(best_items),
-                normalized_profile,
-                mode,
-                _normalize_provider_name(provider_hint),
+    race = _race_enabled()
+    stagger = _race_stagger_sec()
+    running: dict[asyncio.Task, str] = {}
+    try:
+        while providers or running:
+            while providers and len(running) < (2 if race else 1):
+                if attempted_providers >= max_attempted_providers and best_items:
+                    break
+                provider = providers.pop(0)
+                attempted_providers += 1
+                read_cache = True
+                if race and not running:
+                    # A cached primary answers before the fallback's paid
+                    # call is started, whatever the stagger.
+                    cached = await attempt(provider, call_live=False)
+                    if cached is not None:
+                        if len(cached) > len(best_items):
+                            best_items = cached
+                            best_provider = provider
+                        if len(cached) >= minimum_acceptable:
+                            return selected(provider, cached)
+                        continue
+                    read_cache = False
+                delay = stagger if running else 0.0
+                task = asyncio.ensure_future(
+                    _staggered(delay, attempt, provider, read_cache=read_cache)
+                )
+                running[task] = provider
+            if not running:
+                if attempted_providers >= max_attempted_providers and best_items:
+                    return attempt_limit_reached()
+                break
+
+            done, _pending = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED
             )
-            return best_items[:limit]
+            for task in done:
+                provider = running.pop(task)
+                items = task.result()
+                if items is None:
+                    continue
+                if len(items) > len(best_items):
+                    best_items = items
+                    best_provider = provider
+                if len(items) >= minimum_acceptable:
+                    if running:
+                        logger.info(
+                            "search.provider_race_won provider=%s cancelled=%s query=%s",
+                            provider,
+                            ",".join(running.values()),
+                            query[:200],
+                        )
+                    return selected(provider, items)
+            if (
+                not running
+                and attempted_providers >= max_attempted_providers
+                and best_items
+            ):
+                return attempt_limit_reached()
+    finally:
+        for task in running:
+            task.cancel()
 
     if best_provider:
         logger.warning(
@@ -1787,6 +2252,6 @@ async def search_web(
             len(best_items),
             normalized_profile,
             mode,
-            _normalize_provider_name(provider_hint),
+            hint,
         )
     return best_items[:limit]
@@ -269,7 +269,9 @@ def _load_prompt_defaults() -> dict[str, str]:
         VISION_IMAGE_DESCRIPTION_PROMPT,
         IMPORTANCE_EVAL_SYSTEM_PROMPT,
         FACT_EXTRACTION_SYSTEM_PROMPT,
+        MEMORY_CONSOLIDATION_SYSTEM_PROMPT,
         REFLECTION_SYSTEM_PROMPT,
+        REFLECTION_BATCH_SYSTEM_PROMPT,
     )
     return {
         "planner": PLANNER_SYSTEM_PROMPT,
@@ -283,7 +285,9 @@ def _load_prompt_defaults() -> dict[str, str]:
         "vision_desc": VISION_IMAGE_DESCRIPTION_PROMPT,
         "importance_eval": IMPORTANCE_EVAL_SYSTEM_PROMPT,
         "fact_extraction": FACT_EXTRACTION_SYSTEM_PROMPT,
+        "memory_consolidation": MEMORY_CONSOLIDATION_SYSTEM_PROMPT,
         "reflection": REFLECTION_SYSTEM_PROMPT,
+        "reflection_batch": REFLECTION_BATCH_SYSTEM_PROMPT,
     }
 
 _PROMPT_DEFAULTS: dict[str, str] = {}
@@ -376,6 +380,14 @@ PROMPT_DEFS: list[PromptDef] = [
         "PROMPT_FACT_EXTRACTION",
         "",
     ),
+    PromptDef(
+        "memory_consolidation", "Консолідація одним запитом",
+        "Стискає блок діалогу і витягує факти для CORE за один JSON-запит (MEMORY_CONSOLIDATION_MODE=fused).",
+        "Консолідація Working → Long-term + CORE",
+        "memory_summary",
+        "PROMPT_MEMORY_CONSOLIDATION",
+        "",
+    ),
     PromptDef(
         "reflection", "Рефлексія (синтез beliefs)",
         "Аналізує групу схожих спогадів і формує одне стабільне переконання (core belief) про користувача.",
@@ -384,6 +396,14 @@ PROMPT_DEFS: list[PromptDef] = [
         "PROMPT_REFLECTION",
         "",
     ),
+    PromptDef(
+        "reflection_batch", "Рефлексія пакетом",
+        "Формує переконання (core beliefs) для всіх груп спогадів чату одним запитом (MEMORY_REFLECTION_MODE=batch).",
+        "Рефлексія (раз на 3 дні)",
+        "memory_summary",
+        "PROMPT_REFLECTION_BATCH",
+        "",
+    ),
     PromptDef(
         "transport", "Telegram формат",
         "Інструкція з форматування відповідей для Telegram. Додається до кожної фінальної відповіді.",
@@ -787,6 +807,29 @@ def token_dashboard_data(token_month: str = "", token_day: str = "") -> dict[str
     }
 
 
+def search_provider_stats_data() -> dict[str, object]:
+    from agent.tools.provider_scoreboard import provider_stats_path, read_provider_stats
+
+    try:
+        rows = read_provider_stats()
+        error = ""
+    except Exception as exc:
+        rows = []
+        error = str(exc)
+    return {"rows": rows, "path": str(provider_stats_path()), "error": error}
+
+
+def _fmt_rate(value: object) -> str:
+    try:
+        return f"{float(value or 0) * 100:.0f}%"
+    except Exception:
+        return "-"
+
+
+def _fmt_ms(value: object) -> str:
+    return "-" if value is None else f"{_fmt_int(value)} ms"
+
+
 def read_current_config() -> dict[str, str]:
     return env_map_from_lines(read_env_lines(ENV_PATH))
 
@@ -1020,6 +1063,44 @@ def render_dashboard(
       </div>
     </section>"""
 
+    search_stats = search_provider_stats_data()
+    search_rows = ""
+    for row in search_stats.get("rows") or []:
+        search_rows += f"""<tr>
+          <td>{html.escape(str(row.get("provider") or ""))}</td>
+          <td>{html.escape(str(row.get("profile") or ""))}</td>
+          <td>{_fmt_int(row.get("calls"))}</td>
+          <td>{_fmt_rate(row.get("success_rate"))}</td>
+          <td>{_fmt_rate(row.get("accept_rate"))}</td>
+          <td>{html.escape(str(row.get("mean_results") or 0))}</td>
+          <td>{_fmt_ms(row.get("p50_ms"))}</td>
+          <td>{_fmt_ms(row.get("p95_ms"))}</td>
+          <td>{_fmt_ms(row.get("expected_ms"))}</td>
+        </tr>"""
+    if not search_rows:
+        search_rows = '<tr><td colspan="9" class="muted-cell">No live search provider calls recorded yet.</td></tr>'
+    search_error = str(search_stats.get("error") or "")
+    search_error_html = (
+        f'<p class="token-warning">Provider stats could not be read: {html.escape(search_error)}</p>'
+        if search_error else ""
+    )
+    search_panel_html = f"""<section class="panel token-panel">
+      <div class="token-head">
+        <div>
+          <h2>Search providers</h2>
+          <p class="panel-desc">Live latency and success per provider and profile. Providers are tried in order of expected time to an acceptable answer.</p>
+        </div>
+        <div class="token-log">Stats file: <code>{html.escape(str(search_stats.get("path") or ""))}</code></div>
+      </div>
+      {search_error_html}
+      <div class="token-table-wrap">
+        <table class="usage-table">
+          <thead><tr><th>Provider</th><th>Profile</th><th>Calls</th><th>Success</th><th>Acceptable</th><th>Avg results</th><th>p50</th><th>p95</th><th>Expected</th></tr></thead>
+          <tbody>{search_rows}</tbody>
+        </table>
+      </div>
+    </section>"""
+
     # Which providers have keys?
     providers_with_keys: set[str] = set()
     for p in PROVIDERS:
@@ -1335,6 +1416,7 @@ option.no-key{{ color:#bbb; }}
   </section>
   {flash_html}
   {token_panel_html}
+  {search_panel_html}
   <form method="post" action="/save">
     <div class="toolbar">
       <div class="toolbar-left">
@@ -12,8 +12,9 @@ from adapters.base import MessageGeometry, UnifiedMessage
 from agent.planner import PlannerInput, plan_message
 from agent.runner import run_search, run_simple
 from app.chat_geometry import render_turn_context_messages, resolve_message_geometry
-from core.env import chat_join_password
+from core.env import chat_join_password, env_int
 from core.telegram_formatting import render_telegram_html
+from core.ttl_cache import TtlCache
 from db.memory_repository import fetch_recent
 from db.settings_repository import get_settings, upsert_settings
 from media.album_registry import (
@@ -43,7 +44,11 @@ SEARCH_HINT_PATTERNS = (
 SEARCH_PERFORMED_MARKER = "⚠️УВАГА! ВІДБУВСЯ ПОШУК!⚠️"
 REASONING_MARKER = "🧠 [reasoning ON]"
 MESSAGE_DEDUPE_TTL_SECONDS = 10 * 60
-_RECENT_MESSAGE_KEYS: dict[tuple[str, int, int], float] = {}
+_RECENT_MESSAGE_KEYS: TtlCache[tuple[str, int, int], float] = TtlCache(
+    "message_logic.recent_message_keys",
+    ttl_sec=MESSAGE_DEDUPE_TTL_SECONDS,
+    max_items=env_int("MESSAGE_DEDUPE_MAX_KEYS", default=50000),
+)
 _FAKE_SEARCH_BLOCK_RE = re.compile(r"^\s*\[SEARCH\][\s\S]{0,2000}?\[/SEARCH\]", re.I)
 
 
@@ -111,16 +116,10 @@ def _raw_text(msg: UnifiedMessage) -> str:
 
 
 def _claim_message_once(msg: UnifiedMessage) -> bool:
-    now = time.monotonic()
-    cutoff = now - MESSAGE_DEDUPE_TTL_SECONDS
-    stale = [key for key, ts in _RECENT_MESSAGE_KEYS.items() if ts < cutoff]
-    for key in stale:
-        _RECENT_MESSAGE_KEYS.pop(key, None)
-
     key = (msg.platform, int(msg.chat_id), int(msg.message_id))
     if key in _RECENT_MESSAGE_KEYS:
         return False
-    _RECENT_MESSAGE_KEYS[key] = now
+    _RECENT_MESSAGE_KEYS.set(key, time.monotonic())
     return True
 
 
@@ -677,6 +677,46 @@ FACT_EXTRACTION_USER_TEMPLATE = _block(
 )
 
 
+MEMORY_CONSOLIDATION_SYSTEM_PROMPT = _block(
+    """
+    You are the internal memory agent for a Telegram bot. In one pass you
+    (1) compress the dialogue block into an organic long-term memory and
+    (2) extract stable CORE facts from the same block.
+
+    Memory: preserve facts, decisions, user motivation, tension or mood,
+    participants, concrete numbers, names and important nuance. Do not invent
+    emotions. Include 0-2 short quotes only if they are useful anchors.
+
+    CORE facts: only stable facts that help recognize the chat and concrete
+    interlocutors later. Key namespaces:
+    - chat.* for the chat itself: recurring topics, norms, mood.
+    - participant.<stable_id>.* for a concrete person, where stable_id is
+      user_<id> from sender_user_id / reply_target_author_user_id, otherwise
+      the username without @; with neither, do not create a participant fact.
+    Sources and confidence: explicit (stated or corrected by the person) = 320,
+    llm_extracted (clearly follows from the block) = 230, inferred = 200.
+    Explicit corrections update the same key with the new value.
+
+    Return only JSON:
+    {"memory": "organic memory", "quotes": ["0-2 short quotes"],
+     "terms": ["keyword"], "importance": 0.0-1.0,
+     "profile_facts": [{"key": "participant.user_123.profession", "value": "...", "source": "explicit", "confidence": 320}]}
+    """
+)
+
+
+MEMORY_CONSOLIDATION_USER_TEMPLATE = _block(
+    """
+    Current CORE:
+    {core_context}
+
+    Dialogue block in role: text format:
+
+    {block}
+    """
+)
+
+
 REFLECTION_SYSTEM_PROMPT = _block(
     """
     Ти внутрішній агент рефлексії Telegram-бота. Тобі дають групу схожих
@@ -700,6 +740,31 @@ REFLECTION_USER_TEMPLATE = _block(
     """
 )
 
+REFLECTION_BATCH_SYSTEM_PROMPT = _block(
+    """
+    Ти внутрішній агент рефлексії Telegram-бота. Тобі дають кілька
+    пронумерованих груп схожих спогадів з довгострокової пам'яті. Для кожної
+    групи синтезуй одне стабільне переконання (core belief) про користувача.
+
+    Кожне переконання має бути:
+    - коротким (1–2 речення)
+    - узагальненим (не прив'язаним до конкретної дати/події)
+    - корисним для персоналізації відповідей бота
+
+    Якщо група не дає стабільного переконання — пропусти її.
+
+    Поверни тільки JSON:
+    {"beliefs": [{"group": 1, "belief_key": "short_key", "belief_value": "текст переконання"}]}
+    """
+)
+
+REFLECTION_BATCH_USER_TEMPLATE = _block(
+    """
+    Групи спогадів:
+    {groups_text}
+    """
+)
+
 # ---------------------------------------------------------------------------
 # Env var overrides — admin UI /prompts page writes to these env vars.
 # If an env var is set (non-empty), it replaces the code default above.
@@ -715,7 +780,9 @@ _PROMPT_OVERRIDES = {
     "PROMPT_MEMORY_SUMMARY_TPL": "MEMORY_SUMMARY_USER_TEMPLATE",
     "PROMPT_IMPORTANCE_EVAL": "IMPORTANCE_EVAL_SYSTEM_PROMPT",
     "PROMPT_FACT_EXTRACTION": "FACT_EXTRACTION_SYSTEM_PROMPT",
+    "PROMPT_MEMORY_CONSOLIDATION": "MEMORY_CONSOLIDATION_SYSTEM_PROMPT",
     "PROMPT_REFLECTION": "REFLECTION_SYSTEM_PROMPT",
+    "PROMPT_REFLECTION_BATCH": "REFLECTION_BATCH_SYSTEM_PROMPT",
     "PROMPT_TRANSPORT": "TELEGRAM_TRANSPORT_SYSTEM_PROMPT",
     "PROMPT_VISION_DESC": "VISION_IMAGE_DESCRIPTION_PROMPT",
 }
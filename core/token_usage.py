@@ -19,6 +19,7 @@ except Exception:  # pragma: no cover - Python always has zoneinfo here.
 
 _LOCK = threading.Lock()
 DEFAULT_TIMEZONE = "Europe/Kiev"
+_TAIL_CHUNK = 64 * 1024
 
 
 def _default_log_path() -> Path:
@@ -198,17 +199,41 @@ def record_llm_usage(
         return
 
 
+def _tail_lines(path: Path, count: int) -> list[str]:
+    """Last `count` lines of `path`, read backwards from the end in chunks.
+
+    The log only grows, so reading it whole gets slower with every call.
+    """
+    with path.open("rb") as fh:
+        fh.seek(0, os.SEEK_END)
+        position = fh.tell()
+        chunks: list[bytes] = []
+        newlines = 0
+        # One newline more than needed: the first line may be cut mid-way.
+        while position > 0 and newlines <= count:
+            step = min(_TAIL_CHUNK, position)
+            position -= step
+            fh.seek(position)
+            chunk = fh.read(step)
+            chunks.append(chunk)
+            newlines += chunk.count(b"\n")
+    data = b"".join(reversed(chunks))
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    if position > 0:
+        lines = lines[1:]
+    return lines[-count:]
+
+
 def read_usage_events(limit: int | None = None) -> list[dict[str, Any]]:
     path = token_usage_log_path()
     if not path.exists():
         return []
+    if limit is None:
+        limit = _admin_event_limit()
     try:
-        lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+        selected = _tail_lines(path, max(1, int(limit)))
     except Exception:
         return []
-    if limit is None:
-        limit = _admin_event_limit()
-    selected = lines[-max(1, int(limit)):]
     events: list[dict[str, Any]] = []
     for line in selected:
         try:
@@ -299,6 +324,37 @@ def summarize_usage_events(events: Iterable[dict[str, Any]]) -> dict[str, Any]:
     return summary
 
 
+def latency_percentile(
+    events: Iterable[dict[str, Any]],
+    *,
+    capability: str,
+    model: str | None = None,
+    percentile: float = 95.0,
+    window: int = 200,
+) -> tuple[int | None, int]:
+    """Nearest-rank latency percentile over the last `window` successful calls.
+
+    Returns (latency_ms or None, sample count).
+    """
+    samples: list[int] = []
+    for event in events:
+        if str(event.get("capability") or "") != capability:
+            continue
+        if model and str(event.get("model") or "") != model:
+            continue
+        if str(event.get("status") or "success") != "success":
+            continue
+        latency = event.get("latency_ms")
+        if latency in (None, ""):
+            continue
+        samples.append(_safe_int(latency))
+    samples = sorted(samples[-max(1, int(window)):])
+    if not samples:
+        return None, 0
+    rank = max(1, -(-len(samples) * percentile // 100))
+    return samples[int(rank) - 1], len(samples)
+
+
 def summarize_usage_calendar(
     events: Iterable[dict[str, Any]],
     *,
@@ -0,0 +1,137 @@
+"""Bounded TTL/LRU cache for long-lived in-process state.
+
+Every entry of one cache shares the same TTL, so an OrderedDict kept in
+write order is also kept in expiry order: expiring means popping from the
+front until the first live entry, O(1) amortised per operation instead of a
+scan. `max_items` evicts the least recently written (or, with
+`touch_on_get`, used) entries. Eviction callbacks run outside the cache
+lock as `on_evict(key, value, reason)` with reason "expired" or
+"capacity"; explicit `pop`/`clear` do not call them.
+
+Caches created with a name are listed by `ttl_cache_stats()`.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, List, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+EvictCallback = Callable[[Any, Any, str], None]
+
+_MISSING = object()
+_REGISTRY: Dict[str, "TtlCache"] = {}
+
+
+class TtlCache(Generic[K, V]):
+    def __init__(
+        self,
+        name: str | None = None,
+        *,
+        ttl_sec: float | None = None,
+        max_items: int | None = None,
+        on_evict: EvictCallback | None = None,
+        touch_on_get: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.ttl_sec = ttl_sec if ttl_sec and ttl_sec > 0 else None
+        self.max_items = max(1, int(max_items)) if max_items else None
+        self.on_evict = on_evict
+        self.touch_on_get = touch_on_get
+        self._clock = clock
+        self._items: OrderedDict[K, Tuple[V, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        if name:
+            _REGISTRY[name] = self
+
+    def _expiry(self, now: float) -> float:
+        return now + self.ttl_sec if self.ttl_sec is not None else float("inf")
+
+    def _expire_locked(self, now: float, evicted: List[Tuple[K, V, str]]):
+        while self._items:
+            key, (value, expires_at) = next(iter(self._items.items()))
+            if expires_at > now:
+                return
+            self._items.popitem(last=False)
+            self.stats["expired"] += 1
+            evicted.append((key, value, "expired"))
+
+    def _notify(self, evicted: List[Tuple[K, V, str]]):
+        if self.on_evict is None:
+            return
+        for key, value, reason in evicted:
+            self.on_evict(key, value, reason)
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        evicted: List[Tuple[K, V, str]] = []
+        with self._lock:
+            now = self._clock()
+            self._expire_locked(now, evicted)
+            entry = self._items.get(key, _MISSING)
+            if entry is _MISSING:
+                self.stats["misses"] += 1
+                value = default
+            else:
+                self.stats["hits"] += 1
+                value = entry[0]
+                if self.touch_on_get:
+                    self._items[key] = (value, self._expiry(now))
+                    self._items.move_to_end(key)
+        self._notify(evicted)
+        return value
+
+    def set(self, key: K, value: V):
+        evicted: List[Tuple[K, V, str]] = []
+        with self._lock:
+            now = self._clock()
+            self._expire_locked(now, evicted)
+            self._items[key] = (value, self._expiry(now))
+            self._items.move_to_end(key)
+            if self.max_items is not None:
+                while len(self._items) > self.max_items:
+                    old_key, (old_value, _) = self._items.popitem(last=False)
+                    self.stats["evicted"] += 1
+                    evicted.append((old_key, old_value, "capacity"))
+        self._notify(evicted)
+
+    def setdefault(self, key: K, value: V) -> V:
+        existing = self.get(key, _MISSING)
+        if existing is not _MISSING:
+            return existing
+        self.set(key, value)
+        return value
+
+    def pop(self, key: K, default: Any = None) -> V | Any:
+        with self._lock:
+            entry = self._items.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def purge(self) -> int:
+        """Drop expired entries now; returns how many were dropped."""
+        evicted: List[Tuple[K, V, str]] = []
+        with self._lock:
+            self._expire_locked(self._clock(), evicted)
+        self._notify(evicted)
+        return len(evicted)
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key, _MISSING) is not _MISSING  # type: ignore[arg-type]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, "items": len(self._items)}
+
+
+def ttl_cache_stats() -> Dict[str, Dict[str, int]]:
+    return {name: cache.snapshot() for name, cache in _REGISTRY.items()}
@@ -0,0 +1,81 @@
+# db/cache_codec.py
+"""Versioned compact encoding for cached search/page payloads.
+
+Layout: one format byte followed by the body.
+  0x01  raw UTF-8
+  0x02  zlib-compressed UTF-8
+  0x03  zstd-compressed UTF-8 (only when `zstandard` is installed)
+"""
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from typing import Any
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
+FORMAT_RAW = 0x01
+FORMAT_ZLIB = 0x02
+FORMAT_ZSTD = 0x03
+
+# Tiny payloads (empty result lists, short pages) do not shrink under zlib.
+_MIN_COMPRESS_BYTES = 256
+
+
+def _codec_name() -> str:
+    name = (os.getenv("SEARCH_CACHE_CODEC") or "zlib").strip().lower()
+    if name == "zstd" and zstandard is None:
+        return "zlib"
+    return name if name in {"zlib", "zstd", "raw"} else "zlib"
+
+
+def encode_text(text: str) -> bytes:
+    raw = (text or "").encode("utf-8")
+    codec = _codec_name()
+    if codec == "raw" or len(raw) < _MIN_COMPRESS_BYTES:
+        return bytes([FORMAT_RAW]) + raw
+    if codec == "zstd":
+        body = zstandard.ZstdCompressor(level=6).compress(raw)
+        fmt = FORMAT_ZSTD
+    else:
+        body = zlib.compress(raw, 6)
+        fmt = FORMAT_ZLIB
+    if len(body) >= len(raw):
+        return bytes([FORMAT_RAW]) + raw
+    return bytes([fmt]) + body
+
+
+def decode_text(blob: bytes | bytearray | memoryview | None) -> str | None:
+    """Return the decoded text, or None for empty/unknown/unreadable blobs."""
+    if not blob:
+        return None
+    data = bytes(blob)
+    fmt, body = data[0], data[1:]
+    try:
+        if fmt == FORMAT_RAW:
+            return body.decode("utf-8")
+        if fmt == FORMAT_ZLIB:
+            return zlib.decompress(body).decode("utf-8")
+        if fmt == FORMAT_ZSTD and zstandard is not None:
+            return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+    except Exception:
+        return None
+    return None
+
+
+def encode_json(value: Any) -> bytes:
+    return encode_text(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+
+
+def decode_json(blob: bytes | bytearray | memoryview | None) -> Any | None:
+    text = decode_text(blob)
+    if text is None:
+        return None
+    try:
+        return json.loads(text)
+    except Exception:
+        return None
@@ -93,10 +93,24 @@ async def get_conn_cursor(dict_cursor: bool = False):
             yield conn, cur
 
 
-async def execute(sql: str, args=None):
+async def execute(sql: str, args=None) -> int:
     args = args or ()
     async with get_conn_cursor() as (_, cur):
         await cur.execute(sql, args)
+        return int(cur.rowcount or 0)
+
+
+async def execute_in_batches(sql: str, args=None, batch_size: int = 1000) -> int:
+    """Repeat a `... LIMIT %s` DML statement until it touches fewer rows than
+    `batch_size`. Keeps each statement's locks and undo log small."""
+    args = tuple(args or ())
+    size = max(1, int(batch_size))
+    total = 0
+    while True:
+        affected = await execute(sql, (*args, size))
+        total += max(0, affected)
+        if affected < size:
+            return total
 
 
 async def fetchone(sql: str, args=None, dict_cursor: bool = True):
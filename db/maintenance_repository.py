@@ -0,0 +1,71 @@
+# db/maintenance_repository.py
+from __future__ import annotations
+
+from typing import Optional, Set
+
+from .connection import execute, execute_in_batches, fetchall, fetchone
+
+
+async def start_run(job: str, run_key: str) -> int:
+    """Register a run; re-starting an existing run keeps its progress.
+
+    Returns how many times the run has been started, this start included.
+    """
+    await execute(
+        """
+        INSERT INTO maintenance_runs (job, run_key) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE finished_at = NULL, attempts = attempts + 1
+        """,
+        (job, run_key),
+    )
+    row = await fetchone(
+        "SELECT attempts FROM maintenance_runs WHERE job=%s AND run_key=%s",
+        (job, run_key),
+    )
+    return int(row["attempts"]) if row else 1
+
+
+async def finish_run(job: str, run_key: str):
+    await execute(
+        "UPDATE maintenance_runs SET finished_at=NOW() WHERE job=%s AND run_key=%s",
+        (job, run_key),
+    )
+
+
+async def fetch_unfinished_run(job: str) -> Optional[dict]:
+    return await fetchone(
+        """
+        SELECT run_key, started_at FROM maintenance_runs
+        WHERE job=%s AND finished_at IS NULL
+        ORDER BY started_at DESC LIMIT 1
+        """,
+        (job,),
+    )
+
+
+async def fetch_done_chats(job: str, run_key: str) -> Set[int]:
+    rows = await fetchall(
+        "SELECT chat_id FROM maintenance_progress WHERE job=%s AND run_key=%s",
+        (job, run_key),
+    )
+    return {int(row["chat_id"]) for row in rows or []}
+
+
+async def mark_chat_done(job: str, run_key: str, chat_id: int):
+    await execute(
+        "INSERT IGNORE INTO maintenance_progress (job, run_key, chat_id) "
+        "VALUES (%s, %s, %s)",
+        (job, run_key, chat_id),
+    )
+
+
+async def prune_runs(job: str, keep_run_key: str) -> int:
+    """Drop progress of older runs of `job`; returns deleted progress rows."""
+    await execute(
+        "DELETE FROM maintenance_runs WHERE job=%s AND run_key<>%s",
+        (job, keep_run_key),
+    )
+    return await execute_in_batches(
+        "DELETE FROM maintenance_progress WHERE job=%s AND run_key<>%s LIMIT %s",
+        (job, keep_run_key),
+    )
@@ -1,6 +1,15 @@
 from __future__ import annotations
+import hashlib
+import os
 from typing import Any, Dict, Iterable, List, Optional, Tuple
-from .connection import execute, fetchall, fetchone
+from .connection import execute, execute_in_batches, fetchall, fetchone
+
+
+def _delete_chunk() -> int:
+    try:
+        return max(1, int(os.getenv("MEMORY_DELETE_CHUNK", "1000")))
+    except Exception:
+        return 1000
 
 # RECENT
 
@@ -39,28 +48,109 @@ async def recent_total_tokens(chat_id: int) -> int:
     return int(row["t"]) if row else 0
 
 async def delete_recent_upto_pos(chat_id: int, upto_pos: int):
-    await execute("DELETE FROM memory_recent WHERE chat_id=%s AND pos<=%s", (chat_id, upto_pos))
+    await execute_in_batches(
+        "DELETE FROM memory_recent WHERE chat_id=%s AND pos<=%s ORDER BY pos LIMIT %s",
+        (chat_id, upto_pos),
+        _delete_chunk(),
+    )
 
 
 async def delete_recent_chat(chat_id: int):
-    await execute("DELETE FROM memory_recent WHERE chat_id=%s", (chat_id,))
+    await execute_in_batches(
+        "DELETE FROM memory_recent WHERE chat_id=%s ORDER BY pos LIMIT %s",
+        (chat_id,),
+        _delete_chunk(),
+    )
 
 
 async def delete_recent_all():
-    await execute("DELETE FROM memory_recent")
+    await execute_in_batches("DELETE FROM memory_recent LIMIT %s", (), _delete_chunk())
 
 # LONG
 
-async def insert_long_summary(chat_id: int, summary: str, importance: float, tokens: int):
+async def insert_long_summary(
+    chat_id: int,
+    summary: str,
+    importance: float,
+    tokens: int,
+    simhash: int | None = None,
+):
     sql = """
-    INSERT INTO memory_long (chat_id, summary, importance, usage_count, last_used, tokens)
-    VALUES (%s, %s, %s, 0, NOW(), %s)
+    INSERT INTO memory_long (chat_id, summary, importance, usage_count, last_used, tokens, simhash)
+    VALUES (%s, %s, %s, 0, NOW(), %s, %s)
+    """
+    await execute(sql, (chat_id, summary, float(importance), tokens, simhash))
+
+
+async def fetch_long_missing_simhashes(chat_id: int, limit: int) -> list[dict]:
+    """id + summary of up to `limit` long entries without a SimHash yet."""
+    return await fetchall(
+        """
+        SELECT id, summary FROM memory_long
+        WHERE chat_id=%s AND simhash IS NULL
+        ORDER BY id DESC
+        LIMIT %s
+        """,
+        (chat_id, limit),
+    ) or []
+
+
+async def find_long_near_duplicate(
+    chat_id: int, fingerprint: int, max_distance: int
+) -> Optional[dict]:
+    """Closest long entry (id, distance) within `max_distance` SimHash bits.
+
+    The Hamming distance is computed by MySQL, so only the match leaves the
+    server instead of every fingerprint of the chat.
     """
-    await execute(sql, (chat_id, summary, float(importance), tokens))
+    return await fetchone(
+        """
+        SELECT id, BIT_COUNT(simhash ^ %s) AS distance
+        FROM memory_long
+        WHERE chat_id=%s AND simhash IS NOT NULL
+          AND BIT_COUNT(simhash ^ %s) <= %s
+        ORDER BY distance, id DESC
+        LIMIT 1
+        """,
+        (fingerprint, chat_id, fingerprint, max_distance),
+    )
+
+
+async def update_long_simhashes(chat_id: int, rows: list[tuple[int, int]]):
+    """Backfill SimHash fingerprints as (id, simhash) pairs."""
+    chunk = _delete_chunk()
+    for start in range(0, len(rows), chunk):
+        part = rows[start:start + chunk]
+        cases = " ".join(["WHEN %s THEN %s"] * len(part))
+        placeholders = ",".join(["%s"] * len(part))
+        args: list[Any] = []
+        for entry_id, value in part:
+            args.extend((entry_id, value))
+        args.append(chat_id)
+        args.extend(entry_id for entry_id, _ in part)
+        await execute(
+            f"UPDATE memory_long SET simhash = CASE id {cases} ELSE simhash END "
+            f"WHERE chat_id=%s AND id IN ({placeholders})",
+            args,
+        )
+
+
+async def merge_long_duplicate(chat_id: int, entry_id: int, importance: float):
+    """Fold a near-duplicate summary into an existing entry."""
+    await execute(
+        """
+        UPDATE memory_long
+        SET importance = GREATEST(importance, %s),
+            usage_count = usage_count + 1,
+            last_used = NOW()
+        WHERE chat_id=%s AND id=%s
+        """,
+        (float(importance), chat_id, entry_id),
+    )
 
 async def fetch_long_all(chat_id: int) -> list[dict]:
     return await fetchall("""
-    SELECT id, summary, importance, usage_count, last_used, tokens
+    SELECT id, summary, importance, usage_count, last_used, tokens, minhash
     FROM memory_long
     WHERE chat_id=%s
     ORDER BY importance DESC, COALESCE(last_used,'1970-01-01') DESC
@@ -82,16 +172,39 @@ async def long_total_tokens(chat_id: int) -> int:
     return int(row["t"]) if row else 0
 
 
-async def fetch_long_oldest(chat_id: int, token_limit: int = 500) -> list[dict]:
-    """Fetch oldest long-term entries up to ~token_limit tokens total."""
-    rows = await fetchall(
+def long_summary_hash(summary: str) -> str:
+    """SHA1 hex of a summary; matches MySQL SHA1(summary) on utf8mb4 text."""
+    return hashlib.sha1((summary or "").encode("utf-8")).hexdigest()
+
+
+async def fetch_long_oldest(
+    chat_id: int, token_limit: int = 500, skip_kept_days: int | None = None
+) -> list[dict]:
+    """Fetch oldest long-term entries up to ~token_limit tokens total.
+
+    With `skip_kept_days`, entries the importance agent scored 7+ within
+    that many days, for their current text, are left out.
+    """
+    skip_sql = ""
+    args: list[Any] = [chat_id]
+    if skip_kept_days is not None:
+        skip_sql = """
+        AND NOT (
+          importance_score >= 7
+          AND importance_hash = SHA1(summary)
+          AND importance_evaluated_at > NOW() - INTERVAL %s DAY
+        )
         """
-        SELECT id, summary, importance, tokens, is_core_memory, created_at
+        args.append(int(skip_kept_days))
+    rows = await fetchall(
+        f"""
+        SELECT id, summary, importance, tokens, is_core_memory, created_at,
+               importance_score, importance_hash, importance_evaluated_at
         FROM memory_long
-        WHERE chat_id=%s
+        WHERE chat_id=%s {skip_sql}
         ORDER BY created_at ASC
         """,
-        (chat_id,),
+        args,
     )
     result = []
     acc = 0
@@ -104,26 +217,91 @@ async def fetch_long_oldest(chat_id: int, token_limit: int = 500) -> list[dict]:
     return result
 
 
-async def delete_long_by_ids(ids: list[int]):
-    if not ids:
-        return
-    placeholders = ",".join(["%s"] * len(ids))
-    await execute(
-        f"DELETE FROM memory_long WHERE id IN ({placeholders})", ids
+async def delete_long_by_ids(ids: list[int], chat_id: int | None = None):
+    """Delete long entries by id; pass chat_id to keep the delete partition-local."""
+    ids = list(ids)
+    chunk = _delete_chunk()
+    for start in range(0, len(ids), chunk):
+        part = ids[start:start + chunk]
+        placeholders = ",".join(["%s"] * len(part))
+        if chat_id is None:
+            await execute(
+                f"DELETE FROM memory_long WHERE id IN ({placeholders})", part
+            )
+        else:
+            await execute(
+                f"DELETE FROM memory_long WHERE chat_id=%s AND id IN ({placeholders})",
+                [chat_id, *part],
+            )
+
+
+async def delete_long_chat(chat_id: int):
+    await execute_in_batches(
+        "DELETE FROM memory_long WHERE chat_id=%s ORDER BY id LIMIT %s",
+        (chat_id,),
+        _delete_chunk(),
     )
 
 
 async def delete_long_all():
-    await execute("DELETE FROM memory_long")
+    await execute_in_batches("DELETE FROM memory_long LIMIT %s", (), _delete_chunk())
 
 
 async def update_long_entry(entry_id: int, summary: str, importance: float, tokens: int):
+    # Fingerprints and cached importance describe the old summary text.
     await execute(
-        "UPDATE memory_long SET summary=%s, importance=%s, tokens=%s WHERE id=%s",
+        "UPDATE memory_long SET summary=%s, importance=%s, tokens=%s, "
+        "minhash=NULL, simhash=NULL, importance_score=NULL, importance_hash=NULL, "
+        "importance_evaluated_at=NULL WHERE id=%s",
         (summary, float(importance), tokens, entry_id),
     )
 
 
+async def update_long_minhashes(chat_id: int, rows: list[tuple[int, bytes]]):
+    """Store reflection MinHash signatures as (id, blob) pairs, one UPDATE per chunk."""
+    chunk = _delete_chunk()
+    for start in range(0, len(rows), chunk):
+        part = rows[start:start + chunk]
+        cases = " ".join(["WHEN %s THEN %s"] * len(part))
+        placeholders = ",".join(["%s"] * len(part))
+        args: list[Any] = []
+        for entry_id, blob in part:
+            args.extend((entry_id, blob))
+        args.append(chat_id)
+        args.extend(entry_id for entry_id, _ in part)
+        await execute(
+            f"UPDATE memory_long SET minhash = CASE id {cases} ELSE minhash END "
+            f"WHERE chat_id=%s AND id IN ({placeholders})",
+            args,
+        )
+
+
+async def update_long_importance_scores(
+    chat_id: int, rows: list[tuple[int, int, str]]
+):
+    """Cache importance-agent verdicts as (id, score 1-10, summary hash)."""
+    chunk = _delete_chunk()
+    for start in range(0, len(rows), chunk):
+        part = rows[start:start + chunk]
+        cases = " ".join(["WHEN %s THEN %s"] * len(part))
+        placeholders = ",".join(["%s"] * len(part))
+        args: list[Any] = []
+        for entry_id, score, _ in part:
+            args.extend((entry_id, int(score)))
+        for entry_id, _, content_hash in part:
+            args.extend((entry_id, content_hash))
+        args.append(chat_id)
+        args.extend(entry_id for entry_id, _, _ in part)
+        await execute(
+            f"UPDATE memory_long SET "
+            f"importance_score = CASE id {cases} ELSE importance_score END, "
+            f"importance_hash = CASE id {cases} ELSE importance_hash END, "
+            f"importance_evaluated_at = NOW() "
+            f"WHERE chat_id=%s AND id IN ({placeholders})",
+            args,
+        )
+
+
 # CORE
 
 async def fetch_core_all(chat_id: int) -> list[dict]:
@@ -160,12 +338,47 @@ async def upsert_core_fact(
     )
 
 
+async def upsert_core_facts(chat_id: int, facts: list[dict]):
+    """Multi-row variant of upsert_core_fact.
+
+    Each fact is {"key", "value", "source", "confidence", "tokens"}; rows are
+    written in chunks of MEMORY_DELETE_CHUNK with one statement per chunk.
+    """
+    chunk = _delete_chunk()
+    for start in range(0, len(facts), chunk):
+        part = facts[start:start + chunk]
+        values = ",".join(["(%s, %s, %s, %s, %s, %s)"] * len(part))
+        args: list[Any] = []
+        for fact in part:
+            args.extend((
+                chat_id,
+                fact["key"],
+                fact["value"],
+                fact["source"],
+                float(fact["confidence"]),
+                int(fact["tokens"]),
+            ))
+        await execute(
+            f"""
+            INSERT INTO memory_core (chat_id, fact_key, fact_value, source, confidence, tokens)
+            VALUES {values}
+            ON DUPLICATE KEY UPDATE
+              fact_value = VALUES(fact_value),
+              source = VALUES(source),
+              confidence = VALUES(confidence),
+              tokens = VALUES(tokens),
+              updated_at = CURRENT_TIMESTAMP
+            """,
+            args,
+        )
+
+
 async def delete_core_facts(chat_id: int):
     await execute("DELETE FROM memory_core WHERE chat_id=%s", (chat_id,))
 
 
 async def delete_core_all():
-    await execute("DELETE FROM memory_core")
+    await execute_in_batches("DELETE FROM memory_core LIMIT %s", (), _delete_chunk())
 
 
 async def fetch_core_fact(chat_id: int, fact_key: str) -> Optional[dict]:
@@ -0,0 +1,21 @@
+-- db/migrations/004_search_cache_upsert.sql
+-- One row per cache key: drop duplicates left by the old append-only writes,
+-- then replace the plain lookup indexes with unique keys for upserts.
+SET NAMES utf8mb4;
+
+DELETE s1 FROM search_cache s1
+  JOIN search_cache s2
+    ON s1.provider = s2.provider
+   AND s1.query_hash = s2.query_hash
+   AND s1.id < s2.id;
+
+ALTER TABLE search_cache DROP INDEX IF EXISTS idx_search_qh;
+ALTER TABLE search_cache ADD UNIQUE KEY IF NOT EXISTS uq_search_qh (provider, query_hash);
+
+DELETE p1 FROM page_cache p1
+  JOIN page_cache p2
+    ON p1.url_hash = p2.url_hash
+   AND p1.id < p2.id;
+
+ALTER TABLE page_cache DROP INDEX IF EXISTS idx_page_uh;
+ALTER TABLE page_cache ADD UNIQUE KEY IF NOT EXISTS uq_page_uh (url_hash);
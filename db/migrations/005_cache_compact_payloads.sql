@@ -0,0 +1,11 @@
+-- db/migrations/005_cache_compact_payloads.sql
+-- Compact cache payloads: format byte + zlib/zstd body in a BLOB column.
+-- Legacy text columns become nullable; existing rows are re-encoded in the
+-- background by db.search_repository.compact_legacy_cache_rows().
+SET NAMES utf8mb4;
+
+ALTER TABLE search_cache ADD COLUMN IF NOT EXISTS results_blob LONGBLOB NULL;
+ALTER TABLE search_cache MODIFY results_json LONGTEXT NULL;
+
+ALTER TABLE page_cache ADD COLUMN IF NOT EXISTS text_blob LONGBLOB NULL;
+ALTER TABLE page_cache MODIFY text LONGTEXT NULL;
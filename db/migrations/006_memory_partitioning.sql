@@ -0,0 +1,24 @@
+-- db/migrations/006_memory_partitioning.sql
+-- Hash-partition memory_recent/memory_long by chat_id so per-chat wipes and
+-- pruning stay partition-local. Partitioned InnoDB tables cannot carry
+-- foreign keys, and every unique key must include the partitioning column:
+-- the chats FKs are dropped (memory rows are removed explicitly by
+-- MemoryManager.clear_all) and primary keys become (chat_id, <auto id>).
+-- KEY partitioning is used instead of HASH() because Telegram group ids
+-- are negative.
+SET NAMES utf8mb4;
+
+ALTER TABLE memory_recent DROP FOREIGN KEY IF EXISTS fk_recent_chats;
+ALTER TABLE memory_recent
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (chat_id, pos),
+  ADD KEY idx_recent_pos (pos),
+  DROP INDEX idx_recent_chat;
+ALTER TABLE memory_recent PARTITION BY KEY (chat_id) PARTITIONS 16;
+
+ALTER TABLE memory_long DROP FOREIGN KEY IF EXISTS fk_long_chats;
+ALTER TABLE memory_long
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (chat_id, id),
+  ADD KEY idx_long_id (id);
+ALTER TABLE memory_long PARTITION BY KEY (chat_id) PARTITIONS 16;
@@ -0,0 +1,21 @@
+-- db/migrations/007_maintenance_progress.sql
+-- Progress of long-running maintenance jobs (nightly consolidation), so a
+-- restart resumes the current run instead of starting from the first chat.
+-- run_key identifies one run of a job (the UTC date for nightly jobs).
+SET NAMES utf8mb4;
+
+CREATE TABLE IF NOT EXISTS maintenance_runs (
+  job VARCHAR(64) NOT NULL,
+  run_key VARCHAR(32) NOT NULL,
+  started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  finished_at TIMESTAMP NULL DEFAULT NULL,
+  PRIMARY KEY (job, run_key)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS maintenance_progress (
+  job VARCHAR(64) NOT NULL,
+  run_key VARCHAR(32) NOT NULL,
+  chat_id BIGINT NOT NULL,
+  done_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (job, run_key, chat_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,7 @@
+-- db/migrations/008_memory_long_minhash.sql
+-- Cached MinHash signature of a long-term summary's keyword set, used by
+-- reflection's LSH grouping. NULL means "not computed yet / stale";
+-- update_long_entry resets it whenever the summary text changes.
+SET NAMES utf8mb4;
+
+ALTER TABLE memory_long ADD COLUMN IF NOT EXISTS minhash VARBINARY(513) NULL;
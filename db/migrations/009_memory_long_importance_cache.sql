@@ -0,0 +1,11 @@
+-- db/migrations/009_memory_long_importance_cache.sql
+-- Cache of the importance agent's verdict (1-10) per long-term entry.
+-- importance_hash is SHA1 of the summary the score was given for, so a
+-- rewritten summary is re-evaluated; importance_evaluated_at lets scores
+-- expire (MEMORY_IMPORTANCE_TTL_DAYS) because entry age feeds the verdict.
+SET NAMES utf8mb4;
+
+ALTER TABLE memory_long
+  ADD COLUMN IF NOT EXISTS importance_score TINYINT NULL,
+  ADD COLUMN IF NOT EXISTS importance_hash CHAR(40) NULL,
+  ADD COLUMN IF NOT EXISTS importance_evaluated_at TIMESTAMP NULL;
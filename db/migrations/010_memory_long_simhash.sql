@@ -0,0 +1,7 @@
+-- db/migrations/010_memory_long_simhash.sql
+-- 64-bit SimHash of a long-term summary, used to merge near-duplicate
+-- summaries on insert. NULL for rows written before this migration or
+-- rewritten since; the dedupe check backfills them on demand.
+SET NAMES utf8mb4;
+
+ALTER TABLE memory_long ADD COLUMN IF NOT EXISTS simhash BIGINT UNSIGNED NULL;
@@ -0,0 +1,8 @@
+-- db/migrations/011_maintenance_run_attempts.sql
+-- Number of times a maintenance run was started (first start plus resumes).
+-- A run with failed chats stays unfinished so they are retried; attempts
+-- caps those retries (MEMORY_CONSOLIDATION_MAX_ATTEMPTS).
+SET NAMES utf8mb4;
+
+ALTER TABLE maintenance_runs
+  ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 1;
@@ -0,0 +1,7 @@
+-- db/migrations/012_memory_long_simhash_terms.sql
+-- SimHash now runs over stemmed content words instead of word bigrams, so
+-- fingerprints written under 010 are not comparable with new ones. Clear
+-- them; the dedupe check backfills them on demand.
+SET NAMES utf8mb4;
+
+UPDATE memory_long SET simhash = NULL WHERE simhash IS NOT NULL;
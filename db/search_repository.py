@@ -4,9 +4,14 @@ from __future__ import annotations
 import datetime as dt
 import hashlib
 import json
-from typing import Dict, List, Optional
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 
-from .connection import execute, fetchone
+from .cache_codec import decode_json, decode_text, encode_json, encode_text
+from .connection import execute, execute_in_batches, fetchall, fetchone
 
 
 def _h(s: str) -> str:
@@ -25,67 +30,352 @@ def _ensure_utc(value: dt.datetime | None) -> dt.datetime | None:
     return value.astimezone(dt.timezone.utc)
 
 
-def _is_expired(created_at: dt.datetime | None, ttl_min: int) -> bool:
+def _age_min(created_at: dt.datetime | None) -> float:
     normalized = _ensure_utc(created_at)
     if normalized is None:
-        return False
-    return (_utcnow() - normalized).total_seconds() > ttl_min * 60
+        return 0.0
+    return (_utcnow() - normalized).total_seconds() / 60
 
 
-async def get_search_cache(
-    provider: str, query: str, ttl_min: int
-) -> Optional[List[Dict]]:
+def _is_expired(created_at: dt.datetime | None, ttl_min: int) -> bool:
+    return _age_min(created_at) > ttl_min
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class _LruTier:
+    """Bounded in-process LRU in front of the MySQL cache tables.
+
+    Entries keep the DB timestamp, so TTL checks stay identical for both
+    tiers. Hit/miss counters feed `cache_stats()`.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max(0, int(max_items))
+        self._items: OrderedDict[str, tuple[Any, dt.datetime]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, ttl_min: int) -> Any | None:
+        entry = self.get_entry(key, ttl_min)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str, ttl_min: int) -> tuple[Any, dt.datetime] | None:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            if _is_expired(entry[1], ttl_min):
+                self._items.pop(key, None)
+                return None
+            self._items.move_to_end(key)
+            return entry
+
+    def put(self, key: str, value: Any, created_at: dt.datetime | None = None):
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = (value, _ensure_utc(created_at) or _utcnow())
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+_SEARCH_LRU = _LruTier(_env_int("SEARCH_CACHE_LRU_SIZE", 512))
+_PAGE_LRU = _LruTier(_env_int("PAGE_CACHE_LRU_SIZE", 128))
+
+_STATS: Dict[str, Dict[str, int]] = {
+    "search": {
+        "memory_hits": 0,
+        "db_hits": 0,
+        "misses": 0,
+        "stale_hits": 0,
+        "negative_hits": 0,
+    },
+    "page": {"memory_hits": 0, "db_hits": 0, "misses": 0},
+}
+
+
+def _count(kind: str, outcome: str):
+    _STATS[kind][outcome] += 1
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """Per-tier hit ratios for the search and page caches.
+
+    `memory_hit_ratio` is measured over all lookups, `db_hit_ratio` over the
+    lookups that fell through the in-process tier. Stale and negative search
+    hits are also counted as memory or DB hits.
+    """
+    stats: Dict[str, Dict[str, float]] = {}
+    for kind, counters in _STATS.items():
+        memory_hits = counters["memory_hits"]
+        db_hits = counters["db_hits"]
+        misses = counters["misses"]
+        lookups = memory_hits + db_hits + misses
+        db_lookups = db_hits + misses
+        stats[kind] = {
+            "lookups": lookups,
+            "memory_hits": memory_hits,
+            "db_hits": db_hits,
+            "misses": misses,
+            "stale_hits": counters.get("stale_hits", 0),
+            "negative_hits": counters.get("negative_hits", 0),
+            "memory_hit_ratio": round(memory_hits / lookups, 4) if lookups else 0.0,
+            "db_hit_ratio": round(db_hits / db_lookups, 4) if db_lookups else 0.0,
+            "memory_items": len(_SEARCH_LRU if kind == "search" else _PAGE_LRU),
+        }
+    return stats
+
+
+def reset_cache_tiers():
+    """Drop in-process entries and counters."""
+    _SEARCH_LRU.clear()
+    _PAGE_LRU.clear()
+    for counters in _STATS.values():
+        for name in counters:
+            counters[name] = 0
+
+
+def _row_results(row: dict) -> Optional[List[Dict]]:
+    if row.get("results_blob") is not None:
+        return decode_json(row["results_blob"])
+    try:
+        return json.loads(row.get("results_json") or "")
+    except Exception:
+        return None
+
+
+def _row_text(row: dict) -> Optional[str]:
+    if row.get("text_blob") is not None:
+        return decode_text(row["text_blob"])
+    return row.get("text")
+
+
+@dataclass(frozen=True)
+class SearchCacheEntry:
+    results: List[Dict]
+    created_at: dt.datetime
+    stale: bool = False
+
+    @property
+    def negative(self) -> bool:
+        """An empty or failed provider response."""
+        return not self.results
+
+
+def _search_entry(
+    results: List[Dict],
+    created_at: dt.datetime | None,
+    ttl_min: int,
+    stale_min: int,
+    negative_ttl_min: int,
+) -> SearchCacheEntry | None:
+    age = _age_min(created_at)
+    created_at = _ensure_utc(created_at) or _utcnow()
+    if not results:
+        return SearchCacheEntry([], created_at) if age <= negative_ttl_min else None
+    if age <= ttl_min:
+        return SearchCacheEntry(list(results), created_at)
+    if age <= ttl_min + stale_min:
+        return SearchCacheEntry(list(results), created_at, stale=True)
+    return None
+
+
+async def get_search_cache_entry(
+    provider: str,
+    query: str,
+    ttl_min: int,
+    *,
+    stale_min: int = 0,
+    negative_ttl_min: int | None = None,
+) -> SearchCacheEntry | None:
+    """Cached results of `query` with their freshness, or None.
+
+    Results up to `ttl_min` old are fresh; for `stale_min` after that they
+    come back with `stale=True`, for the caller to serve while refreshing.
+    Empty lists are negative entries: they live `negative_ttl_min`
+    (default `ttl_min`) and are never stale.
+    """
     qh = _h(query.strip().lower())
+    memory_key = f"{provider}|{qh}"
+    stale_min = max(0, stale_min)
+    negative_ttl_min = ttl_min if negative_ttl_min is None else negative_ttl_min
+    max_age_min = max(ttl_min + stale_min, negative_ttl_min)
+
+    cached = _SEARCH_LRU.get_entry(memory_key, max_age_min)
+    if cached is not None:
+        entry = _search_entry(*cached, ttl_min, stale_min, negative_ttl_min)
+        if entry is not None:
+            _count_search_hit("memory_hits", entry)
+            return entry
+
     row = await fetchone(
         """
-      SELECT results_json, created_at FROM search_cache
+      SELECT results_blob, results_json, created_at FROM search_cache
       WHERE provider=%s AND query_hash=%s
-      ORDER BY id DESC LIMIT 1
     """,
         (provider, qh),
     )
-    if not row:
-        return None
-    if _is_expired(row["created_at"], ttl_min):
-        return None
-    try:
-        return json.loads(row["results_json"])
-    except Exception:
+    results = _row_results(row) if row else None
+    entry = (
+        _search_entry(results, row["created_at"], ttl_min, stale_min, negative_ttl_min)
+        if results is not None
+        else None
+    )
+    if entry is None:
+        _count("search", "misses")
         return None
+    _count_search_hit("db_hits", entry)
+    _SEARCH_LRU.put(memory_key, results, row["created_at"])
+    return entry
+
+
+def _count_search_hit(tier: str, entry: SearchCacheEntry):
+    _count("search", tier)
+    if entry.stale:
+        _count("search", "stale_hits")
+    if entry.negative:
+        _count("search", "negative_hits")
+
+
+async def get_search_cache(
+    provider: str, query: str, ttl_min: int
+) -> Optional[List[Dict]]:
+    entry = await get_search_cache_entry(provider, query, ttl_min)
+    return entry.results if entry is not None else None
 
 
 async def put_search_cache(provider: str, query: str, results: List[Dict]):
     qh = _h(query.strip().lower())
     await execute(
         """
-      INSERT INTO search_cache (provider, query_hash, query_text, results_json)
+      INSERT INTO search_cache (provider, query_hash, query_text, results_blob)
       VALUES (%s,%s,%s,%s)
+      ON DUPLICATE KEY UPDATE
+        query_text = VALUES(query_text),
+        results_blob = VALUES(results_blob),
+        results_json = NULL,
+        created_at = CURRENT_TIMESTAMP
     """,
-        (provider, qh, query, json.dumps(results, ensure_ascii=False)),
+        (provider, qh, query, encode_json(results)),
     )
+    _SEARCH_LRU.put(f"{provider}|{qh}", list(results))
 
 
 async def get_page_cache(url: str, ttl_min: int) -> Optional[str]:
     uh = _h(url)
+    cached = _PAGE_LRU.get(uh, ttl_min)
+    if cached is not None:
+        _count("page", "memory_hits")
+        return cached
+
     row = await fetchone(
         """
-      SELECT text, fetched_at FROM page_cache WHERE url_hash=%s
-      ORDER BY id DESC LIMIT 1
+      SELECT text_blob, text, fetched_at FROM page_cache WHERE url_hash=%s
     """,
         (uh,),
     )
-    if not row:
+    if not row or _is_expired(row["fetched_at"], ttl_min):
+        _count("page", "misses")
         return None
-    if _is_expired(row["fetched_at"], ttl_min):
+    text = _row_text(row)
+    if text is None:
+        _count("page", "misses")
         return None
-    return row["text"]
+    _count("page", "db_hits")
+    _PAGE_LRU.put(uh, text, row["fetched_at"])
+    return text
 
 
 async def put_page_cache(url: str, text: str):
     uh = _h(url)
     await execute(
         """
-      INSERT INTO page_cache (url_hash, url, text) VALUES (%s,%s,%s)
+      INSERT INTO page_cache (url_hash, url, text_blob) VALUES (%s,%s,%s)
+      ON DUPLICATE KEY UPDATE
+        url = VALUES(url),
+        text_blob = VALUES(text_blob),
+        text = NULL,
+        fetched_at = CURRENT_TIMESTAMP
     """,
-        (uh, url, text),
+        (uh, url, encode_text(text)),
+    )
+    _PAGE_LRU.put(uh, text)
+
+
+async def purge_expired_search_cache(
+    ttl_min: int, batch_size: int | None = None
+) -> int:
+    """Delete expired search_cache rows in `LIMIT`-sized batches."""
+    size = batch_size or _env_int("SEARCH_CACHE_PURGE_BATCH", 1000)
+    return await execute_in_batches(
+        "DELETE FROM search_cache "
+        "WHERE created_at < NOW() - INTERVAL %s MINUTE LIMIT %s",
+        (int(ttl_min),),
+        size,
+    )
+
+
+async def purge_expired_page_cache(
+    ttl_min: int, batch_size: int | None = None
+) -> int:
+    """Delete expired page_cache rows in `LIMIT`-sized batches."""
+    size = batch_size or _env_int("SEARCH_CACHE_PURGE_BATCH", 1000)
+    return await execute_in_batches(
+        "DELETE FROM page_cache "
+        "WHERE fetched_at < NOW() - INTERVAL %s MINUTE LIMIT %s",
+        (int(ttl_min),),
+        size,
+    )
+
+
+async def compact_legacy_cache_rows(batch_size: int | None = None) -> dict[str, int]:
+    """Re-encode one batch of pre-005 rows that still carry plain-text payloads.
+
+    Called from the periodic cache job, so old rows migrate gradually
+    without a long table rewrite.
+    """
+    size = batch_size or _env_int("SEARCH_CACHE_COMPACT_BATCH", 200)
+    converted = {"search": 0, "page": 0}
+
+    rows = await fetchall(
+        "SELECT id, results_json FROM search_cache "
+        "WHERE results_blob IS NULL AND results_json IS NOT NULL LIMIT %s",
+        (int(size),),
+    )
+    for row in rows or []:
+        try:
+            results = json.loads(row["results_json"])
+        except Exception:
+            await execute("DELETE FROM search_cache WHERE id=%s", (row["id"],))
+            continue
+        await execute(
+            "UPDATE search_cache SET results_blob=%s, results_json=NULL WHERE id=%s",
+            (encode_json(results), row["id"]),
+        )
+        converted["search"] += 1
+
+    rows = await fetchall(
+        "SELECT id, text FROM page_cache "
+        "WHERE text_blob IS NULL AND text IS NOT NULL LIMIT %s",
+        (int(size),),
     )
+    for row in rows or []:
+        await execute(
+            "UPDATE page_cache SET text_blob=%s, text=NULL WHERE id=%s",
+            (encode_text(row["text"]), row["id"]),
+        )
+        converted["page"] += 1
+    return converted
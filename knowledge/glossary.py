@@ -1,13 +1,17 @@
 # knowledge/glossary.py
 from __future__ import annotations
 import os, re, time
-from typing import List, Optional, Tuple, Dict
+from typing import List, Optional, Tuple
+from core.ttl_cache import TtlCache
 from db.knowledge_repository import upsert_term, get_term, fetch_gc_candidates
 
 GLOSSARY_ENABLE_SUGGESTIONS = bool(int(os.getenv("GLOSSARY_ENABLE_SUGGESTIONS", "0")))
 GLOSSARY_MIN_USAGE_TO_ASK = int(os.getenv("GLOSSARY_MIN_USAGE_TO_ASK", "5"))
 
-_LAST_SUGGEST_AT: Dict[int, float] = {}
+_SUGGEST_COOLDOWN_SEC = 120
+_LAST_SUGGEST_AT: TtlCache[int, float] = TtlCache(
+    "glossary.last_suggest", ttl_sec=_SUGGEST_COOLDOWN_SEC, max_items=10000
+)
 
 _STOPWORDS = set("""
 і та але або що це тут там той ця це ті тієї через дуже трохи для при над під між як коли де який яка які було були бути буде уже вже ще той-то ось ну ага ого не так таке така такий such the and or of to in on a an is are was were be been have has had with without from by about for into over under out up down just really very they them he she it we you me i my your his her their our у в на до із з зі і та але або що це тут там той ця ті тієї для при над під між як коли де який яка які
@@ -51,8 +55,7 @@ async def process_user_text(chat_id: int, text: str) -> Optional[str]:
     if not GLOSSARY_ENABLE_SUGGESTIONS:
         return None
 
-    now = time.time()
-    if now - _LAST_SUGGEST_AT.get(chat_id, 0) < 120:
+    if chat_id in _LAST_SUGGEST_AT:
         return None
 
     for t in terms:
@@ -60,7 +63,7 @@ async def process_user_text(chat_id: int, text: str) -> Optional[str]:
         if not row:
             continue
         if (row.get("usage_count") or 0) >= GLOSSARY_MIN_USAGE_TO_ASK and (row.get("status") or "new") == "new":
-            _LAST_SUGGEST_AT[chat_id] = now
+            _LAST_SUGGEST_AT.set(chat_id, time.time())
             return (f"Бачу, термін «{t}» часто вживається. "
                     f"Дати коротке визначення і зберегти в глосарії? Напиши: «{t} — <визначення>».")
     return None
@@ -7,6 +7,7 @@ from dataclasses import dataclass, field
 from typing import Any
 
 from adapters.base import UnifiedMessage
+from core.ttl_cache import TtlCache
 
 ALBUM_REGISTRY_TTL_SECONDS = int(os.getenv("ALBUM_REGISTRY_TTL_SECONDS", "3600"))
 ALBUM_REGISTRY_MAX_GROUPS = int(os.getenv("ALBUM_REGISTRY_MAX_GROUPS", "500"))
@@ -27,67 +28,44 @@ class AlbumItemRef:
     created_at: float = field(default_factory=time.time)
 
 
+def _forget_album(album_key: tuple[str, int, str], items: list[AlbumItemRef], _reason: str) -> None:
+    platform, chat_id, _group_id = album_key
+    for item in items:
+        _MESSAGE_INDEX.pop((platform, chat_id, item.message_id))
+    _PROCESSING.pop(album_key)
+    _HANDLED.pop(album_key)
+
+
+# _LOCK guards compound check-and-set steps; expiry and size caps live in
+# the caches themselves, so no call pays for a purge pass.
 _LOCK = threading.Lock()
-_ALBUMS: dict[tuple[str, int, str], list[AlbumItemRef]] = {}
-_MESSAGE_INDEX: dict[tuple[str, int, int], tuple[str, int, str]] = {}
-_PROCESSING: dict[tuple[str, int, str], tuple[int, float]] = {}
-_HANDLED: dict[tuple[str, int, str], float] = {}
+_ALBUMS: TtlCache[tuple[str, int, str], list[AlbumItemRef]] = TtlCache(
+    "album_registry.albums",
+    ttl_sec=ALBUM_REGISTRY_TTL_SECONDS,
+    max_items=ALBUM_REGISTRY_MAX_GROUPS,
+    on_evict=_forget_album,
+)
+_MESSAGE_INDEX: TtlCache[tuple[str, int, int], tuple[str, int, str]] = TtlCache(
+    "album_registry.message_index",
+    ttl_sec=ALBUM_REGISTRY_TTL_SECONDS,
+    max_items=ALBUM_REGISTRY_MAX_GROUPS * 20,
+)
+_PROCESSING: TtlCache[tuple[str, int, str], int] = TtlCache(
+    "album_registry.processing",
+    ttl_sec=ALBUM_PROCESSING_TTL_SECONDS,
+    max_items=ALBUM_REGISTRY_MAX_GROUPS,
+)
+_HANDLED: TtlCache[tuple[str, int, str], float] = TtlCache(
+    "album_registry.handled",
+    ttl_sec=ALBUM_PROCESSING_TTL_SECONDS,
+    max_items=ALBUM_REGISTRY_MAX_GROUPS,
+)
 
 
 def _now() -> float:
     return time.time()
 
 
-def _purge_locked(now: float | None = None) -> None:
-    current = now if now is not None else _now()
-    stale_album_keys = []
-    for key, items in list(_ALBUMS.items()):
-        fresh_items = [
-            item for item in items if current - float(item.created_at or current) <= ALBUM_REGISTRY_TTL_SECONDS
-        ]
-        if fresh_items:
-            _ALBUMS[key] = fresh_items[-20:]
-            continue
-        stale_album_keys.append(key)
-
-    for key in stale_album_keys:
-        _ALBUMS.pop(key, None)
-
-    stale_message_keys = []
-    for message_key, album_key in list(_MESSAGE_INDEX.items()):
-        if album_key not in _ALBUMS:
-            stale_message_keys.append(message_key)
-    for key in stale_message_keys:
-        _MESSAGE_INDEX.pop(key, None)
-
-    stale_processing_keys = []
-    for album_key, (_message_id, started_at) in list(_PROCESSING.items()):
-        if album_key not in _ALBUMS or current - started_at > ALBUM_PROCESSING_TTL_SECONDS:
-            stale_processing_keys.append(album_key)
-    for key in stale_processing_keys:
-        _PROCESSING.pop(key, None)
-
-    stale_handled_keys = []
-    for album_key, handled_at in list(_HANDLED.items()):
-        if album_key not in _ALBUMS or current - handled_at > ALBUM_PROCESSING_TTL_SECONDS:
-            stale_handled_keys.append(album_key)
-    for key in stale_handled_keys:
-        _HANDLED.pop(key, None)
-
-    if len(_ALBUMS) <= ALBUM_REGISTRY_MAX_GROUPS:
-        return
-
-    sorted_groups = sorted(
-        _ALBUMS.items(),
-        key=lambda pair: max((item.created_at for item in pair[1]), default=0.0),
-    )
-    for album_key, _items in sorted_groups[: max(0, len(_ALBUMS) - ALBUM_REGISTRY_MAX_GROUPS)]:
-        _ALBUMS.pop(album_key, None)
-        for message_key, indexed_album_key in list(_MESSAGE_INDEX.items()):
-            if indexed_album_key == album_key:
-                _MESSAGE_INDEX.pop(message_key, None)
-
-
 def _infer_media_kind(msg: UnifiedMessage) -> str | None:
     if msg.has_video or msg.has_video_note:
         return "video"
@@ -126,8 +104,7 @@ def observe_album_message(msg: UnifiedMessage) -> None:
     )
 
     with _LOCK:
-        _purge_locked()
-        bucket = _ALBUMS.setdefault(album_key, [])
+        bucket = list(_ALBUMS.get(album_key) or [])
         replaced = False
         for index, existing in enumerate(bucket):
             if existing.message_id == item.message_id:
@@ -137,13 +114,12 @@ def observe_album_message(msg: UnifiedMessage) -> None:
         if not replaced:
             bucket.append(item)
             bucket.sort(key=lambda value: value.message_id)
-        _MESSAGE_INDEX[message_key] = album_key
+        _ALBUMS.set(album_key, bucket[-20:])
+        _MESSAGE_INDEX.set(message_key, album_key)
 
 
 def _album_items_for(platform: str, chat_id: int, group_id: str) -> list[AlbumItemRef]:
-    with _LOCK:
-        _purge_locked()
-        return list(_ALBUMS.get((platform, int(chat_id), group_id), []))
+    return list(_ALBUMS.get((platform, int(chat_id), group_id)) or [])
 
 
 def claim_album_processing(msg: UnifiedMessage) -> bool:
@@ -153,14 +129,13 @@ def claim_album_processing(msg: UnifiedMessage) -> bool:
 
     album_key = (msg.platform, int(msg.chat_id), group_id)
     with _LOCK:
-        _purge_locked()
         if album_key in _HANDLED:
             return False
         existing = _PROCESSING.get(album_key)
         if existing is None:
-            _PROCESSING[album_key] = (int(msg.message_id), _now())
+            _PROCESSING.set(album_key, int(msg.message_id))
             return True
-        return existing[0] == int(msg.message_id)
+        return existing == int(msg.message_id)
 
 
 def finish_album_processing(msg: UnifiedMessage, *, handled: bool) -> None:
@@ -170,12 +145,10 @@ def finish_album_processing(msg: UnifiedMessage, *, handled: bool) -> None:
 
     album_key = (msg.platform, int(msg.chat_id), group_id)
     with _LOCK:
-        _purge_locked()
-        existing = _PROCESSING.get(album_key)
-        if existing and existing[0] == int(msg.message_id):
-            _PROCESSING.pop(album_key, None)
+        if _PROCESSING.get(album_key) == int(msg.message_id):
+            _PROCESSING.pop(album_key)
         if handled:
-            _HANDLED[album_key] = _now()
+            _HANDLED.set(album_key, _now())
 
 
 def get_ptb_album_messages(message: Any) -> list[Any]:
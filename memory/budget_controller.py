@@ -0,0 +1,175 @@
+"""Latency-driven scaling of the per-turn memory context budget.
+
+Input tokens dominate `chat_final` latency, so the context budgets follow
+its rolling p95 from the token usage log: above MEMORY_LATENCY_SLO_MS the
+scale shrinks in proportion to the overshoot (at most 20% per step); while
+p95 stays under MEMORY_ADAPTIVE_GROW_BELOW of the target it grows back by
+10%. The scale is clamped to [MEMORY_ADAPTIVE_MIN_SCALE,
+MEMORY_ADAPTIVE_MAX_SCALE] and re-evaluated at most every
+MEMORY_ADAPTIVE_REFRESH_SEC. Busy chats get MEMORY_BUSY_CHAT_FACTOR on top.
+
+Samples come from the configured model; right after a model switch there
+are too few of them, so the p95 of all models for the capability is used
+until the new model has its own.
+
+MEMORY_LATENCY_SLO_MS=0 (the default) keeps budgets static.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from core.env import capability_model
+from core.token_usage import latency_percentile, read_usage_events
+
+logger = logging.getLogger(__name__)
+
+_SHRINK_STEP_MIN = 0.8
+_GROW_STEP = 1.1
+_MIN_SAMPLES = 20
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class LatencyBudgetController:
+    def __init__(self, capability: str = "chat_final"):
+        self.capability = capability
+        self.scale = 1.0
+        self.last_p95_ms: int | None = None
+        self._checked_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        self._starved = False
+
+    def _bounds(self) -> tuple[float, float]:
+        low = max(0.05, _env_float("MEMORY_ADAPTIVE_MIN_SCALE", 0.5))
+        high = max(low, _env_float("MEMORY_ADAPTIVE_MAX_SCALE", 1.0))
+        return low, high
+
+    def update(self, p95_ms: int | None, samples: int, slo_ms: int) -> float:
+        """Move the scale one step towards the SLO; log when it changes."""
+        self.last_p95_ms = p95_ms
+        if p95_ms is None or samples < _MIN_SAMPLES:
+            if not self._starved:
+                logger.warning(
+                    "memory.budget_scale_frozen capability=%s samples=%d "
+                    "min_samples=%d scale=%.3f",
+                    self.capability,
+                    samples,
+                    _MIN_SAMPLES,
+                    self.scale,
+                )
+            self._starved = True
+            return self.scale
+        self._starved = False
+        low, high = self._bounds()
+        previous = self.scale
+        if p95_ms > slo_ms:
+            step = max(_SHRINK_STEP_MIN, slo_ms / p95_ms)
+        elif p95_ms < slo_ms * _env_float("MEMORY_ADAPTIVE_GROW_BELOW", 0.7):
+            step = _GROW_STEP
+        else:
+            step = 1.0
+        self.scale = round(min(high, max(low, previous * step)), 3)
+        if self.scale != previous:
+            logger.info(
+                "memory.budget_scale_changed capability=%s p95_ms=%d slo_ms=%d "
+                "samples=%d scale=%.3f->%.3f",
+                self.capability,
+                p95_ms,
+                slo_ms,
+                samples,
+                previous,
+                self.scale,
+            )
+        return self.scale
+
+    def _measure(self) -> tuple[int | None, int]:
+        window = max(1, _env_int("MEMORY_ADAPTIVE_WINDOW", 200))
+        # Other capabilities share the log; read well past the window.
+        events = read_usage_events(limit=window * 20)
+        model = capability_model(self.capability)
+        p95_ms, samples = latency_percentile(
+            events, capability=self.capability, model=model, window=window
+        )
+        if samples >= _MIN_SAMPLES:
+            return p95_ms, samples
+        any_p95_ms, any_samples = latency_percentile(
+            events, capability=self.capability, window=window
+        )
+        if any_samples <= samples:
+            return p95_ms, samples
+        logger.info(
+            "memory.budget_samples_fallback capability=%s model=%s samples=%d "
+            "all_models_samples=%d",
+            self.capability,
+            model,
+            samples,
+            any_samples,
+        )
+        return any_p95_ms, any_samples
+
+    async def current_scale(self) -> float:
+        slo_ms = _env_int("MEMORY_LATENCY_SLO_MS", 0)
+        if slo_ms <= 0:
+            return 1.0
+        refresh_sec = max(1, _env_int("MEMORY_ADAPTIVE_REFRESH_SEC", 60))
+        if time.monotonic() - self._checked_at < refresh_sec:
+            return self.scale
+        async with self._refresh_lock:
+            if time.monotonic() - self._checked_at >= refresh_sec:
+                p95_ms, samples = await asyncio.to_thread(self._measure)
+                self._checked_at = time.monotonic()
+                self.update(p95_ms, samples, slo_ms)
+        return self.scale
+
+    async def scale_for_chat(self, recent_rows: Iterable[dict]) -> float:
+        """Global scale, tightened further when the chat is busy right now."""
+        scale = await self.current_scale()
+        if is_busy_chat(recent_rows):
+            scale *= max(0.05, _env_float("MEMORY_BUSY_CHAT_FACTOR", 0.75))
+        return scale
+
+
+def is_busy_chat(recent_rows: Iterable[dict], now: datetime | None = None) -> bool:
+    """MEMORY_BUSY_CHAT_TURNS+ user turns within MEMORY_BUSY_CHAT_WINDOW_MIN."""
+    threshold = _env_int("MEMORY_BUSY_CHAT_TURNS", 12)
+    if threshold <= 0:
+        return False
+    now = now or datetime.now(timezone.utc)
+    since = now - timedelta(minutes=max(1, _env_int("MEMORY_BUSY_CHAT_WINDOW_MIN", 5)))
+    turns = 0
+    for row in recent_rows:
+        created = row.get("created_at")
+        if row.get("role") != "user" or not hasattr(created, "tzinfo"):
+            continue
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        if created >= since:
+            turns += 1
+    return turns >= threshold
+
+
+_CONTROLLER: LatencyBudgetController | None = None
+
+
+def get_budget_controller() -> LatencyBudgetController:
+    global _CONTROLLER
+    if _CONTROLLER is None:
+        _CONTROLLER = LatencyBudgetController()
+    return _CONTROLLER
@@ -0,0 +1,147 @@
+"""Compaction of service blocks in the recent window before packing.
+
+[SEARCH] and [MEDIA] blocks stay in memory_recent verbatim until
+consolidation, so without this stage every turn replays them in full:
+
+- an older [SEARCH] for the same request as a newer one is collapsed to a
+  stub (request + `status: superseded`);
+- a [SEARCH] already answered by the following assistant reply loses its
+  `answer_summary`, which the reply restates;
+- an answered [MEDIA] block is capped at MEMORY_COMPACT_ANSWERED_CHARS per
+  bulky field once a newer user turn exists;
+- any service block more than MEMORY_COMPACT_KEEP_TURNS user turns back has
+  its bulky fields capped at MEMORY_COMPACT_FIELD_CHARS and its result
+  snippets dropped.
+
+Only the prompt copy is rewritten; stored rows are untouched.
+"""
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+_FIELD_RE = re.compile(r"^([a-z0-9_]+):(?: (.*))?$")
+_BULKY_FIELD_RE = re.compile(r"(answer_summary|post_text|audio_transcript|media_analysis)$")
+_SERVICE_TAGS = ("[SEARCH]", "[MEDIA]")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+@dataclass
+class _Block:
+    tag: str
+    separator: str
+    fields: List[Tuple[str | None, List[str]]]
+
+    @classmethod
+    def parse(cls, content: str) -> "_Block":
+        tag = content[: content.index("]") + 1]
+        rest = content[len(tag):]
+        separator = rest[:1] if rest[:1] in (" ", "\n") else ""
+        fields: List[Tuple[str | None, List[str]]] = []
+        for line in rest[len(separator):].split("\n"):
+            match = _FIELD_RE.match(line)
+            if match:
+                fields.append((match.group(1), [match.group(2) or ""]))
+            elif fields:
+                fields[-1][1].append(line)
+            else:
+                fields.append((None, [line]))
+        return cls(tag, separator, fields)
+
+    def value(self, key: str) -> str:
+        for name, lines in self.fields:
+            if name == key:
+                return "\n".join(lines).strip()
+        return ""
+
+    def render(self) -> str:
+        lines = []
+        for name, values in self.fields:
+            if name is None:
+                lines.extend(values)
+                continue
+            first = f"{name}: {values[0]}" if values[0] else f"{name}:"
+            lines.append(first)
+            lines.extend(values[1:])
+        return f"{self.tag}{self.separator}" + "\n".join(lines)
+
+    def drop(self, key: str):
+        self.fields = [(name, lines) for name, lines in self.fields if name != key]
+
+    def cap_bulky(self, limit: int, drop_snippets: bool = False):
+        capped = []
+        for name, lines in self.fields:
+            if name and _BULKY_FIELD_RE.search(name):
+                text = "\n".join(lines).strip()
+                if len(text) > limit:
+                    text = text[:limit].rstrip() + "…"
+                lines = text.split("\n")
+            elif name == "top_results" and drop_snippets:
+                lines = [line for line in lines if not line.startswith("  ")]
+            capped.append((name, lines))
+        self.fields = capped
+
+
+def _search_key(block: _Block) -> str:
+    key = block.value("request") or block.value("queries")
+    return re.sub(r"\s+", " ", key).strip().lower()
+
+
+def compact_service_blocks(
+    messages: List[Dict[str, str]],
+) -> Tuple[List[Dict[str, str]], int]:
+    """Return the compacted messages and how many blocks were rewritten."""
+    if _env_int("MEMORY_CONTEXT_COMPACTION", 1) <= 0:
+        return messages, 0
+    keep_turns = max(0, _env_int("MEMORY_COMPACT_KEEP_TURNS", 4))
+    field_chars = max(0, _env_int("MEMORY_COMPACT_FIELD_CHARS", 240))
+    answered_chars = max(field_chars, _env_int("MEMORY_COMPACT_ANSWERED_CHARS", 800))
+
+    result = list(messages)
+    newer_user_turns = 0
+    answered = False  # an assistant reply follows before the next user turn
+    seen_searches: set[str] = set()
+    rewritten = 0
+    for index in range(len(result) - 1, -1, -1):
+        message = result[index]
+        role = message.get("role")
+        content = message.get("content") or ""
+        if role == "user":
+            newer_user_turns += 1
+            answered = False
+            continue
+        if role == "assistant":
+            answered = True
+            continue
+        if role != "system" or not content.startswith(_SERVICE_TAGS):
+            continue
+
+        block = _Block.parse(content)
+        if block.tag == "[SEARCH]":
+            key = _search_key(block)
+            if key and key in seen_searches:
+                block.fields = [
+                    (name, lines) for name, lines in block.fields if name == "request"
+                ] + [("status", ["superseded"])]
+            else:
+                seen_searches.add(key)
+                if answered:
+                    block.drop("answer_summary")
+        elif answered and newer_user_turns >= 1:
+            block.cap_bulky(answered_chars)
+        if newer_user_turns >= keep_turns:
+            block.cap_bulky(field_chars, drop_snippets=True)
+
+        compacted = block.render()
+        if compacted != content:
+            result[index] = {**message, "content": compacted}
+            rewritten += 1
+    return result, rewritten
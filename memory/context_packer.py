@@ -0,0 +1,170 @@
+"""Single-budget packer for the memory context (CORE, LONG, recent).
+
+Every candidate carries a token cost and a value in [0, 1]. Packing runs
+in two phases under one total budget:
+
+1. per-layer minimums: each layer takes its own best items until it holds
+   its minimum. The unmet minimums of the other layers stay reserved, so
+   one oversized memo can't overshoot its own minimum into another
+   layer's (recent turns can't be starved by memos and vice versa);
+2. greedy by value/token ratio across all layers for what is left.
+
+Layer caps (the existing per-layer context budgets) bound each layer from
+above. Recent items form a chain from the newest turn backwards and are
+only taken in that order, so the working window never has gaps. The
+newest turn is always kept: when it does not fit on its own it is passed
+to `truncate` and the shortened item is taken instead.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+LAYERS = ("core", "long", "recent")
+
+
+@dataclass
+class PackItem:
+    layer: str
+    tokens: int
+    value: float
+    payload: Any = None
+    # recent only: 0 = newest turn; taken strictly in increasing order
+    chain: int | None = None
+
+    @property
+    def ratio(self) -> float:
+        return self.value / max(1, self.tokens)
+
+
+@dataclass
+class PackResult:
+    selected: Dict[str, List[PackItem]] = field(
+        default_factory=lambda: {layer: [] for layer in LAYERS}
+    )
+    tokens: int = 0
+    dropped: int = 0
+
+    def layer_tokens(self, layer: str) -> int:
+        return sum(item.tokens for item in self.selected[layer])
+
+
+def pack_context(
+    items: Iterable[PackItem],
+    total_budget: int,
+    minimums: Mapping[str, int] | None = None,
+    maximums: Mapping[str, int] | None = None,
+    truncate: Callable[[PackItem, int], Optional[PackItem]] | None = None,
+) -> PackResult:
+    minimums = minimums or {}
+    maximums = maximums or {}
+    by_layer: Dict[str, List[PackItem]] = {layer: [] for layer in LAYERS}
+    for item in items:
+        by_layer[item.layer].append(item)
+    for layer in ("core", "long"):
+        by_layer[layer].sort(key=lambda item: item.value, reverse=True)
+    by_layer["recent"].sort(key=lambda item: item.chain or 0)
+
+    result = PackResult()
+    used = {layer: 0 for layer in LAYERS}
+    left = {layer: sum(item.tokens for item in by_layer[layer]) for layer in LAYERS}
+    taken: set[int] = set()
+    recent_next = 0
+    recent_closed = False
+
+    def room(layer: str) -> int:
+        space = total_budget - result.tokens
+        cap = maximums.get(layer)
+        if cap is not None:
+            space = min(space, cap - used[layer])
+        return space
+
+    def reserved(layer: str) -> int:
+        # unmet minimums of the other layers, bounded by what they can use
+        total = 0
+        for other in LAYERS:
+            if other == layer:
+                continue
+            minimum = max(0, int(minimums.get(other, 0)))
+            cap = maximums.get(other)
+            if cap is not None:
+                minimum = min(minimum, cap)
+            total += min(max(0, minimum - used[other]), left[other])
+        return total
+
+    def fits(item: PackItem, reserve: int = 0) -> bool:
+        return item.tokens <= room(item.layer) - reserve
+
+    def take(item: PackItem):
+        taken.add(id(item))
+        used[item.layer] += item.tokens
+        left[item.layer] -= item.tokens
+        result.tokens += item.tokens
+        result.selected[item.layer].append(item)
+
+    # Phase 0: the newest turn, shortened if it can't fit as it is.
+    recent = by_layer["recent"]
+    if recent:
+        newest = recent[0]
+        if not fits(newest) and truncate is not None and room("recent") > 0:
+            shortened = truncate(newest, room("recent"))
+            if shortened is not None and fits(shortened):
+                left["recent"] += shortened.tokens - newest.tokens
+                recent[0] = newest = shortened
+        if fits(newest):
+            take(newest)
+            recent_next = 1
+        else:
+            recent_closed = True
+
+    # Phase 1: per-layer minimums, each layer in its own priority order.
+    for layer in LAYERS:
+        minimum = max(0, int(minimums.get(layer, 0)))
+        for item in by_layer[layer]:
+            if used[layer] >= minimum:
+                break
+            if id(item) in taken:
+                continue
+            if fits(item, reserved(layer)):
+                take(item)
+                if layer == "recent":
+                    recent_next += 1
+            elif layer == "recent":
+                # phase 2 decides whether the chain is closed for good
+                break
+
+    # Phase 2: best value per token across layers; recent stays a chain.
+    pool = sorted(
+        (
+            item
+            for layer in ("core", "long")
+            for item in by_layer[layer]
+            if id(item) not in taken
+        ),
+        key=lambda item: item.ratio,
+        reverse=True,
+    )
+    index = 0
+    while True:
+        frontier = (
+            recent[recent_next]
+            if not recent_closed and recent_next < len(recent)
+            else None
+        )
+        head = pool[index] if index < len(pool) else None
+        if frontier is None and head is None:
+            break
+        if head is None or (frontier is not None and frontier.ratio >= head.ratio):
+            if fits(frontier):
+                take(frontier)
+                recent_next += 1
+            else:
+                recent_closed = True
+            continue
+        if fits(head):
+            take(head)
+        index += 1
+
+    total_items = sum(len(items) for items in by_layer.values())
+    result.dropped = total_items - len(taken)
+    return result
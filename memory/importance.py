@@ -7,10 +7,11 @@ import re
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
-from agent.llm import chat_once
 from core.prompts import IMPORTANCE_EVAL_SYSTEM_PROMPT, IMPORTANCE_EVAL_USER_TEMPLATE
 from core.tokens import count_tokens_text
 
+from .llm import memory_chat_once
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -62,7 +63,7 @@ async def evaluate_importance(
             core_context=core_context or "(порожньо)",
             entries_json=json.dumps(entries_for_llm, ensure_ascii=False, indent=2),
         )
-        resp = chat_once(
+        resp = await memory_chat_once(
             [
                 {"role": "system", "content": IMPORTANCE_EVAL_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt_user},
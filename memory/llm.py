@@ -0,0 +1,95 @@
+"""Rate-aware LLM entry point for background memory work.
+
+`chat_once` is blocking, so memory calls run in a worker thread; otherwise
+concurrent consolidation would still be serialised on the event loop.
+Every call first passes the budget of the provider behind its capability:
+at most MEMORY_LLM_MAX_CONCURRENT calls in flight and
+MEMORY_LLM_CALLS_PER_MINUTE calls per rolling minute. Both can be set per
+provider with a `_<PROVIDER>` suffix (e.g. MEMORY_LLM_CALLS_PER_MINUTE_GEMINI).
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict
+
+from agent.llm import chat_once
+from core.env import capability_provider, env_int, env_slot
+
+
+class ProviderCallBudget:
+    """Concurrency cap plus a token bucket refilled at `calls_per_minute`."""
+
+    def __init__(self, provider: str, max_concurrent: int, calls_per_minute: int):
+        self.provider = provider
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.calls_per_minute = max(0, int(calls_per_minute))
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._bucket_lock = asyncio.Lock()
+        self._tokens = float(self.calls_per_minute or 1)
+        self._updated = time.monotonic()
+        self.stats = {"calls": 0, "throttled_ms": 0.0}
+
+    async def _take_token(self):
+        if self.calls_per_minute <= 0:
+            return
+        rate = self.calls_per_minute / 60.0
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    float(self.calls_per_minute),
+                    self._tokens + (now - self._updated) * rate,
+                )
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / rate
+                self.stats["throttled_ms"] += wait * 1000
+                await asyncio.sleep(wait)
+
+    async def run(self, func, *args, **kwargs):
+        async with self._slots:
+            await self._take_token()
+            self.stats["calls"] += 1
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+
+_BUDGETS: Dict[str, ProviderCallBudget] = {}
+
+
+def provider_budget(provider: str) -> ProviderCallBudget:
+    budget = _BUDGETS.get(provider)
+    if budget is None:
+        slot = env_slot(provider)
+        budget = _BUDGETS[provider] = ProviderCallBudget(
+            provider,
+            max_concurrent=env_int(
+                f"MEMORY_LLM_MAX_CONCURRENT_{slot}",
+                "MEMORY_LLM_MAX_CONCURRENT",
+                default=4,
+            ),
+            calls_per_minute=env_int(
+                f"MEMORY_LLM_CALLS_PER_MINUTE_{slot}",
+                "MEMORY_LLM_CALLS_PER_MINUTE",
+                default=120,
+            ),
+        )
+    return budget
+
+
+def budget_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        name: {
+            "calls": budget.stats["calls"],
+            "throttled_ms": round(budget.stats["throttled_ms"], 1),
+        }
+        for name, budget in _BUDGETS.items()
+    }
+
+
+async def memory_chat_once(messages, *, capability: str = "memory_summary", **kwargs):
+    """`chat_once` for memory capabilities, under the provider's call budget."""
+    budget = provider_budget(capability_provider(capability))
+    return await budget.run(chat_once, messages, capability=capability, **kwargs)
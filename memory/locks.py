@@ -0,0 +1,180 @@
+"""Per-chat locks for memory consolidation.
+
+`local` serialises consolidation inside one process (shared by every
+MemoryManager instance, including the scheduler's). `mysql` adds a
+server-side GET_LOCK on top, so several bot processes or nodes pointed at
+the same database never consolidate one chat at the same time.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from db.connection import get_conn_cursor
+
+logger = logging.getLogger(__name__)
+
+_SLOW_WAIT_MS = 100.0
+
+
+def _lock_timeout_sec() -> float:
+    try:
+        return float(os.getenv("MEMORY_LOCK_TIMEOUT_SEC", "30"))
+    except Exception:
+        return 30.0
+
+
+class InProcessChatLocks:
+    backend = "local"
+
+    def __init__(self, timeout_sec: float | None = None):
+        self.timeout_sec = _lock_timeout_sec() if timeout_sec is None else timeout_sec
+        # chat_id -> [lock, holders + waiters]; dropped when nobody uses it,
+        # so the map only ever holds chats with consolidation in flight.
+        self._locks: Dict[int, list] = {}
+        self.stats = {
+            "acquired": 0,
+            "timeouts": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    def _lock(self, chat_id: int) -> asyncio.Lock:
+        entry = self._locks.get(chat_id)
+        if entry is None:
+            entry = self._locks[chat_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _unref(self, chat_id: int):
+        entry = self._locks.get(chat_id)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._locks[chat_id]
+
+    async def _acquire_local(
+        self, chat_id: int, timeout: float
+    ) -> asyncio.Lock | None:
+        lock = self._lock(chat_id)
+        try:
+            await asyncio.wait_for(lock.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._unref(chat_id)
+            return None
+        except BaseException:
+            # cancelled while waiting
+            self._unref(chat_id)
+            raise
+        return lock
+
+    def _release_local(self, chat_id: int, lock: asyncio.Lock):
+        lock.release()
+        self._unref(chat_id)
+
+    def _record(self, chat_id: int, started: float, acquired: bool):
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.stats["wait_ms_total"] += wait_ms
+        self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], wait_ms)
+        if not acquired:
+            self.stats["timeouts"] += 1
+            logger.warning(
+                "memory.lock_timeout chat=%s backend=%s wait_ms=%d",
+                chat_id,
+                self.backend,
+                wait_ms,
+            )
+            return
+        self.stats["acquired"] += 1
+        log = logger.info if wait_ms >= _SLOW_WAIT_MS else logger.debug
+        log(
+            "memory.lock_acquired chat=%s backend=%s wait_ms=%d",
+            chat_id,
+            self.backend,
+            wait_ms,
+        )
+
+    @asynccontextmanager
+    async def hold(
+        self, chat_id: int, timeout: float | None = None
+    ) -> AsyncIterator[bool]:
+        """Yield True while the chat lock is held, False if it timed out."""
+        wait = self.timeout_sec if timeout is None else timeout
+        started = time.perf_counter()
+        lock = await self._acquire_local(chat_id, wait)
+        self._record(chat_id, started, lock is not None)
+        try:
+            yield lock is not None
+        finally:
+            if lock is not None:
+                self._release_local(chat_id, lock)
+
+
+class MySqlChatLocks(InProcessChatLocks):
+    backend = "mysql"
+
+    def _lock_name(self, chat_id: int) -> str:
+        db_name = os.getenv("DB_NAME", "aisus")
+        # GET_LOCK names are server-wide and capped at 64 characters.
+        return f"{db_name}.memory.{chat_id}"[-64:]
+
+    @asynccontextmanager
+    async def hold(
+        self, chat_id: int, timeout: float | None = None
+    ) -> AsyncIterator[bool]:
+        wait = self.timeout_sec if timeout is None else timeout
+        started = time.perf_counter()
+        # Local lock first: waiting coroutines must not pin pooled connections.
+        local = await self._acquire_local(chat_id, wait)
+        if local is None:
+            self._record(chat_id, started, False)
+            yield False
+            return
+        try:
+            name = self._lock_name(chat_id)
+            remaining = max(0.0, wait - (time.perf_counter() - started))
+            # GET_LOCK is bound to the session, so the same connection must
+            # stay checked out until RELEASE_LOCK.
+            async with get_conn_cursor() as (_, cur):
+                await cur.execute("SELECT GET_LOCK(%s, %s)", (name, remaining))
+                row = await cur.fetchone()
+                acquired = bool(row and row[0] == 1)
+                self._record(chat_id, started, acquired)
+                try:
+                    yield acquired
+                finally:
+                    if acquired:
+                        await cur.execute("SELECT RELEASE_LOCK(%s)", (name,))
+                        await cur.fetchone()
+        finally:
+            self._release_local(chat_id, local)
+
+
+_CHAT_LOCKS: InProcessChatLocks | None = None
+
+
+def get_chat_locks() -> InProcessChatLocks:
+    """Process-wide lock provider selected by MEMORY_LOCK_BACKEND (local|mysql)."""
+    global _CHAT_LOCKS
+    if _CHAT_LOCKS is None:
+        backend = (os.getenv("MEMORY_LOCK_BACKEND") or "local").strip().lower()
+        _CHAT_LOCKS = MySqlChatLocks() if backend == "mysql" else InProcessChatLocks()
+    return _CHAT_LOCKS
+
+
+def lock_stats() -> dict:
+    locks = get_chat_locks()
+    acquired = locks.stats["acquired"]
+    attempts = acquired + locks.stats["timeouts"]
+    return {
+        "backend": locks.backend,
+        **locks.stats,
+        "wait_ms_avg": round(locks.stats["wait_ms_total"] / attempts, 2)
+        if attempts
+        else 0.0,
+    }
@@ -4,37 +4,53 @@ import asyncio
 import logging
 import os
 import re
-from datetime import datetime, timezone
-from typing import Dict, List, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple
 
-from core.tokens import budget_trim_messages, count_tokens_messages, count_tokens_text
+from core.tokens import count_tokens_messages, count_tokens_text
+from core.ttl_cache import TtlCache
 from db.memory_repository import (
     bump_long_usage,
-    core_total_tokens,
     delete_core_all,
     delete_core_facts,
     delete_long_all,
     delete_long_by_ids,
+    delete_long_chat,
     delete_recent_all,
     delete_recent_chat,
     delete_recent_upto_pos,
     fetch_core_all,
-    fetch_core_fact,
     fetch_long_all,
+    fetch_long_missing_simhashes,
     fetch_long_oldest,
     fetch_recent,
+    find_long_near_duplicate,
     insert_long_summary,
     insert_recent,
+    long_summary_hash,
     long_total_tokens,
+    merge_long_duplicate,
     recent_total_tokens,
     update_long_entry,
-    upsert_core_fact,
+    update_long_importance_scores,
+    update_long_simhashes,
+    upsert_core_facts,
 )
 from db.repositories import upsert_chat
 from db.settings_repository import is_memory_persist_enabled
 
+from .budget_controller import get_budget_controller
+from .context_compactor import compact_service_blocks
+from .context_packer import PackItem, pack_context
 from .importance import evaluate_importance
-from .summarizer import compress_entry, extract_profile_facts, summarize_block
+from .locks import get_chat_locks
+from .similarity import simhash
+from .summarizer import (
+    compress_entry,
+    consolidate_block,
+    extract_profile_facts,
+    summarize_block,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +64,13 @@ _EMPTY_CHAT_CONTEXT_NOTICE = (
 # Min confidence delta to overwrite an existing core fact (8% of max 320 = 25.6)
 _CONFIDENCE_DELTA = 25.6
 _CASCADE_BATCH_TOKENS = 500
+# Long entries given a SimHash per insert; older rows catch up on later ones.
+_SIMHASH_BACKFILL_BATCH = 200
+# Packing value of a recent message, per turn of age (newest = 1.0).
+_RECENT_VALUE_DECAY = 0.97
+# "[LONG-MEMO] " prefix plus per-message overhead.
+_LONG_MEMO_OVERHEAD = 8
+_TRUNCATED_MARK = " …[truncated]"
 _CONSOLIDATION_COOLDOWN_SEC = 600  # 10 minutes
 _SOURCE_PRIORITY = {
     "explicit": 4,
@@ -96,6 +119,72 @@ def _core_context_budget() -> int:
     return _env_int("MEMORY_CORE_CONTEXT_BUDGET", _core_budget())
 
 
+def _importance_ttl_days() -> int:
+    return max(1, _env_int("MEMORY_IMPORTANCE_TTL_DAYS", 30))
+
+
+def _cached_importance(row: dict, now: datetime, ttl_days: int) -> int | None:
+    """Importance-agent score cached on the row, if it is fresh and for this text."""
+    score = row.get("importance_score")
+    evaluated_at = row.get("importance_evaluated_at")
+    if score is None or not evaluated_at or not hasattr(evaluated_at, "timestamp"):
+        return None
+    if row.get("importance_hash") != long_summary_hash(row.get("summary") or ""):
+        return None
+    if now - evaluated_at.replace(tzinfo=timezone.utc) > timedelta(days=ttl_days):
+        return None
+    return int(score)
+
+
+# Compressions by (entry id, summary hash). A compression that did not save
+# tokens leaves the row and its cached score untouched, so without this the
+# same entry would be sent to the LLM again on every cascade pass.
+_COMPRESSED_TEXTS: TtlCache[tuple[int, str], str] = TtlCache(
+    "memory.compressed_texts",
+    ttl_sec=_importance_ttl_days() * 86400,
+    max_items=_env_int("MEMORY_COMPRESSED_CACHE_ITEMS", 4096),
+)
+
+
+async def _compressed_text(row: dict, evaluation: dict, core_ctx: str) -> str:
+    ready = evaluation.get("compressed_text")
+    if ready:
+        return ready
+    key = (row["id"], long_summary_hash(row["summary"]))
+    cached = _COMPRESSED_TEXTS.get(key)
+    if cached is not None:
+        return cached
+    compressed = await compress_entry(row["summary"], core_ctx)
+    _COMPRESSED_TEXTS.set(key, compressed)
+    return compressed
+
+
+def _dedupe_distance() -> int:
+    """Max SimHash Hamming distance for a near-duplicate; negative disables.
+
+    Tuned on hand-made summary pairs: reworded paraphrases land at 0-11
+    bits, same-topic summaries with different facts at 14 and up, and
+    unrelated ones at 21 and up.
+    """
+    return _env_int("MEMORY_LONG_DEDUPE_DISTANCE", 12)
+
+
+_DEDUPE_STATS = {"inserted": 0, "merged": 0}
+
+
+def dedupe_stats() -> dict:
+    total = _DEDUPE_STATS["inserted"] + _DEDUPE_STATS["merged"]
+    return {
+        **_DEDUPE_STATS,
+        "merge_rate": round(_DEDUPE_STATS["merged"] / total, 4) if total else 0.0,
+    }
+
+
+def _consolidation_mode() -> str:
+    mode = (os.getenv("MEMORY_CONSOLIDATION_MODE") or "fused").strip().lower()
+    return mode if mode in {"fused", "split"} else "fused"
+
+
 def _compress_portion() -> float:
     return float(os.getenv("MEMORY_COMPRESS_PORTION", "0.35"))
 
@@ -221,36 +310,18 @@ def _messages_tokens(messages: List[Dict[str, str]]) -> int:
     return count_tokens_messages(messages, _dialog_model())
 
 
-def _trim_messages_to_budget(
-    messages: List[Dict[str, str]],
-    budget: int,
-) -> List[Dict[str, str]]:
-    if budget <= 0 or not messages:
-        return []
-    if _messages_tokens(messages) <= budget:
-        return messages
-    return budget_trim_messages(messages, budget, _dialog_model())
-
-
-def _fit_lines_to_budget(prefix: str, lines: List[str], budget: int) -> str:
-    if budget <= 0 or not lines:
-        return ""
-    selected: List[str] = []
-    for line in lines:
-        candidate_lines = [*selected, line]
-        text = f"{prefix}\n" + "\n".join(candidate_lines)
-        if count_tokens_text(text, _dialog_model()) > budget:
-            break
-        selected.append(line)
-    if selected:
-        return "\n".join(selected)
-    clipped = lines[0].strip()
-    while clipped:
-        text = f"{prefix}\n{clipped}"
-        if count_tokens_text(text, _dialog_model()) <= budget:
-            return clipped
-        clipped = clipped[: max(0, len(clipped) * 3 // 4)].strip()
-    return ""
+def _truncate_turn(item: PackItem, max_tokens: int) -> PackItem | None:
+    """Shorten a recent message (keeping its head) to at most `max_tokens`."""
+    msg = item.payload
+    content = msg.get("content") or ""
+    text = content
+    while text:
+        shortened = {**msg, "content": text.rstrip() + _TRUNCATED_MARK}
+        tokens = _messages_tokens([shortened])
+        if tokens <= max_tokens:
+            return PackItem(item.layer, tokens, item.value, shortened, chain=item.chain)
+        text = text[: int(len(text) * max_tokens / tokens * 0.9)]
+    return None
 
 
 def _source_priority(source: str | None) -> int:
@@ -315,16 +386,71 @@ def _should_replace_core_fact(
     return confidence - old_confidence >= _CONFIDENCE_DELTA
 
 
+async def apply_core_facts(
+    chat_id: int,
+    candidates: List[Dict],
+    *,
+    should_replace: Callable[..., bool] = _should_replace_core_fact,
+) -> List[str]:
+    """Write CORE fact candidates with one bulk upsert; returns accepted keys.
+
+    Candidates are {"key", "value", "source", "confidence", "tokens"}. The
+    chat's facts are loaded once: existing keys must pass `should_replace`,
+    new keys must fit MEMORY_CORE_BUDGET, and budget accounting (including
+    earlier candidates of the same call) happens in memory.
+    """
+    if not candidates:
+        return []
+    known = {row["fact_key"]: row for row in await fetch_core_all(chat_id)}
+    core_budget = _core_budget()
+    current_tokens = sum(int(row.get("tokens") or 0) for row in known.values())
+    accepted: Dict[str, Dict] = {}
+
+    for fact in candidates:
+        key = fact["key"]
+        tokens = int(fact["tokens"])
+        existing = known.get(key)
+        if existing:
+            # Check if fact already exists — enforce confidence delta
+            if not should_replace(
+                existing,
+                source=fact["source"],
+                confidence=fact["confidence"],
+                value=fact["value"],
+            ):
+                continue
+            current_tokens += tokens - int(existing.get("tokens") or 0)
+        else:
+            # New fact: check budget
+            if current_tokens + tokens > core_budget:
+                logger.debug(
+                    "core.budget_exceeded chat=%s key=%s, skipping", chat_id, key
+                )
+                continue
+            current_tokens += tokens
+        known[key] = {
+            "fact_key": key,
+            "fact_value": fact["value"],
+            "source": fact["source"],
+            "confidence": fact["confidence"],
+            "tokens": tokens,
+        }
+        accepted[key] = fact
+
+    if accepted:
+        await upsert_core_facts(chat_id, list(accepted.values()))
+    return list(accepted)
+
+
 class MemoryManager:
 
     def __init__(self):
-        self._locks: Dict[int, asyncio.Lock] = {}
-        self._last_consolidation: Dict[int, float] = {}
-
-    def _lock_for(self, chat_id: int) -> asyncio.Lock:
-        if chat_id not in self._locks:
-            self._locks[chat_id] = asyncio.Lock()
-        return self._locks[chat_id]
+        self._locks = get_chat_locks()
+        self._last_consolidation: TtlCache[int, float] = TtlCache(
+            "memory.consolidation_cooldown",
+            ttl_sec=_CONSOLIDATION_COOLDOWN_SEC,
+            max_items=_env_int("MEMORY_COOLDOWN_MAX_CHATS", 10000),
+        )
 
     async def _ensure_chat(self, chat_id: int):
         await upsert_chat(chat_id, title=None, lang=None)
@@ -347,35 +473,28 @@ class MemoryManager:
         lines = [f"{f['fact_key']}: {f['fact_value']}" for f in facts]
         return "\n".join(lines)
 
-    async def _core_context_message(
-        self, chat_id: int, budget: int
-    ) -> tuple[dict[str, str] | None, int]:
-        """Format CORE for prompt context, capped by the core context budget."""
-        facts = await fetch_core_all(chat_id)
-        if not facts or budget <= 0:
-            return None, 0
-        lines = [f"{f['fact_key']}: {f['fact_value']}" for f in facts]
-        text = _fit_lines_to_budget("[CORE]", lines, budget)
-        if not text:
-            return None, 0
-        msg = {"role": "system", "content": f"[CORE]\n{text}"}
-        return msg, _messages_tokens([msg])
-
     # ------------------------------------------------------------------
     # Profile fact extraction & storage
     # ------------------------------------------------------------------
 
     async def _save_profile_facts(
-        self, chat_id: int, block_text: str, core_context: str
+        self,
+        chat_id: int,
+        block_text: str,
+        core_context: str,
+        facts: List[Dict] | None = None,
     ):
-        """Extract and upsert profile facts from a conversation block."""
-        facts = await extract_profile_facts(block_text, core_context)
+        """Upsert profile facts from a conversation block.
+
+        `facts` come from the fused consolidation call; without them they
+        are extracted from `block_text` with a separate call.
+        """
+        if facts is None:
+            facts = await extract_profile_facts(block_text, core_context)
         if not facts:
             return
 
-        core_budget = _core_budget()
-        current_tokens = await core_total_tokens(chat_id)
-
+        candidates = []
         for fact in facts:
             key = fact.get("key", "").strip()
             value = fact.get("value", "").strip()
@@ -388,36 +507,70 @@ class MemoryManager:
                     key,
                 )
                 continue
-
-            source = fact.get("source", "unknown")
-            confidence = float(fact.get("confidence", 100))
-            tokens = count_tokens_text(f"{key}: {value}", _dialog_model())
-
-            # Check if fact already exists — enforce confidence delta
-            existing = await fetch_core_fact(chat_id, key)
-            if existing:
-                if not _should_replace_core_fact(
-                    existing,
-                    source=source,
-                    confidence=confidence,
-                    value=value,
-                ):
-                    continue
-                # Replacing: tokens don't increase net usage
-            else:
-                # New fact: check budget
-                if current_tokens + tokens > core_budget:
-                    logger.debug(
-                        "core.budget_exceeded chat=%s key=%s, skipping", chat_id, key
-                    )
-                    continue
-                current_tokens += tokens
-
             # Reject empty/placeholder values
             if value.lower() in {"null", "unknown", "?", "–", "-", "none", ""}:
                 continue
+            candidates.append({
+                "key": key,
+                "value": value,
+                "source": fact.get("source", "unknown"),
+                "confidence": float(fact.get("confidence", 100)),
+                "tokens": count_tokens_text(f"{key}: {value}", _dialog_model()),
+            })
+
+        await apply_core_facts(chat_id, candidates)
+
+    # ------------------------------------------------------------------
+    # Long-term insert with near-duplicate merge
+    # ------------------------------------------------------------------
 
-            await upsert_core_fact(chat_id, key, value, source, confidence, tokens)
+    async def _find_near_duplicate(
+        self, chat_id: int, fingerprint: int, max_distance: int
+    ) -> Tuple[int, int] | None:
+        """(id, distance) of the closest long entry within max_distance."""
+        missing = await fetch_long_missing_simhashes(chat_id, _SIMHASH_BACKFILL_BATCH)
+        backfill = []
+        for row in missing:
+            value = simhash(row.get("summary") or "")
+            if value is not None:
+                backfill.append((int(row["id"]), value))
+        if backfill:
+            await update_long_simhashes(chat_id, backfill)
+        match = await find_long_near_duplicate(chat_id, fingerprint, max_distance)
+        if match is None:
+            return None
+        return int(match["id"]), int(match["distance"])
+
+    async def _store_long_summary(self, chat_id: int, summary_rec: dict):
+        fingerprint = simhash(summary_rec["summary"])
+        max_distance = _dedupe_distance()
+        if fingerprint is not None and max_distance >= 0:
+            duplicate = await self._find_near_duplicate(
+                chat_id, fingerprint, max_distance
+            )
+            if duplicate is not None:
+                entry_id, distance = duplicate
+                await merge_long_duplicate(
+                    chat_id, entry_id, summary_rec["importance"]
+                )
+                _DEDUPE_STATS["merged"] += 1
+                logger.info(
+                    "memory.long_dedupe chat=%s merged_into=%s distance=%d "
+                    "merge_rate=%s",
+                    chat_id,
+                    entry_id,
+                    distance,
+                    dedupe_stats()["merge_rate"],
+                )
+                return
+        await insert_long_summary(
+            chat_id,
+            summary_rec["summary"],
+            summary_rec["importance"],
+            summary_rec["tokens"],
+            simhash=fingerprint,
+        )
+        _DEDUPE_STATS["inserted"] += 1
 
     # ------------------------------------------------------------------
     # Cascading recompression
@@ -429,8 +582,11 @@ class MemoryManager:
         core_ctx = await self._core_context_text(chat_id)
         max_passes = 6  # safety limit
 
+        ttl_days = _importance_ttl_days()
         for pass_num in range(max_passes):
-            batch = await fetch_long_oldest(chat_id, _CASCADE_BATCH_TOKENS)
+            batch = await fetch_long_oldest(
+                chat_id, _CASCADE_BATCH_TOKENS, skip_kept_days=ttl_days
+            )
             if not batch:
                 break
 
@@ -439,9 +595,16 @@ class MemoryManager:
             if not compressible:
                 break
 
+            # Reuse cached verdicts for unchanged entries; only new or
+            # rewritten ones go to the importance agent.
             now = datetime.now(timezone.utc)
+            eval_map: Dict[int, Dict] = {}
             entries_for_eval = []
             for r in compressible:
+                cached = _cached_importance(r, now, ttl_days)
+                if cached is not None:
+                    eval_map[r["id"]] = {"id": r["id"], "importance": cached}
+                    continue
                 created = r.get("created_at")
                 if created and hasattr(created, "timestamp"):
                     age_days = (now - created.replace(tzinfo=timezone.utc)).days
@@ -454,34 +617,61 @@ class MemoryManager:
                     "is_core_memory": False,
                 })
 
-            evaluations = await evaluate_importance(entries_for_eval, core_ctx)
-            eval_map = {e["id"]: e for e in evaluations}
+            if entries_for_eval:
+                evaluations = await evaluate_importance(entries_for_eval, core_ctx)
+                summaries = {r["id"]: r["summary"] for r in compressible}
+                fresh = []
+                for ev in evaluations:
+                    if ev["id"] not in summaries:
+                        continue
+                    eval_map[ev["id"]] = ev
+                    if ev.get("reason") != "heuristic":
+                        fresh.append((
+                            ev["id"],
+                            ev["importance"],
+                            long_summary_hash(summaries[ev["id"]]),
+                        ))
+                if fresh:
+                    await update_long_importance_scores(chat_id, fresh)
+            logger.debug(
+                "cascade.importance chat=%s pass=%d cached=%d evaluated=%d",
+                chat_id,
+                pass_num,
+                len(compressible) - len(entries_for_eval),
+                len(entries_for_eval),
+            )
 
             ids_to_delete = []
+            to_compress = []
             for r in compressible:
                 ev = eval_map.get(r["id"])
                 if not ev:
                     continue
                 imp = ev["importance"]
-                old_tokens = int(r.get("tokens") or 0)
 
                 if imp <= 3:
                     ids_to_delete.append(r["id"])
-                    freed += old_tokens
+                    freed += int(r.get("tokens") or 0)
                 elif imp <= 6:
-                    compressed = ev.get("compressed_text")
-                    if not compressed:
-                        compressed = await compress_entry(r["summary"], core_ctx)
-                    new_tokens = count_tokens_text(compressed, _dialog_model())
-                    if new_tokens < old_tokens:
-                        await update_long_entry(
-                            r["id"], compressed, ev["importance"] / 10.0, new_tokens
-                        )
-                        freed += old_tokens - new_tokens
+                    to_compress.append((r, ev))
                 # importance 7+: keep as-is
 
+            # Entries without a ready compressed_text are compressed
+            # concurrently; memory.llm bounds the provider load.
+            compressed_texts = await asyncio.gather(*(
+                _compressed_text(r, ev, core_ctx) for r, ev in to_compress
+            ))
+            for (r, ev), compressed in zip(to_compress, compressed_texts):
+                old_tokens = int(r.get("tokens") or 0)
+                new_tokens = count_tokens_text(compressed, _dialog_model())
+                if new_tokens < old_tokens:
+                    await update_long_entry(
+                        r["id"], compressed, ev["importance"] / 10.0, new_tokens
+                    )
+                    freed += old_tokens - new_tokens
+
             if ids_to_delete:
-                await delete_long_by_ids(ids_to_delete)
+                await delete_long_by_ids(ids_to_delete, chat_id)
 
             if freed >= needed_space:
                 break
@@ -504,7 +694,7 @@ class MemoryManager:
                 if fifo_freed >= remaining:
                     break
             if ids_fifo:
-                await delete_long_by_ids(ids_fifo)
+                await delete_long_by_ids(ids_fifo, chat_id)
 
     # ------------------------------------------------------------------
     # Budget enforcement
@@ -520,7 +710,13 @@ class MemoryManager:
             # Still trim recent if needed (without LLM calls)
             return
 
-        async with self._lock_for(chat_id):
+        async with self._locks.hold(chat_id) as acquired:
+            if not acquired:
+                # Another process/task is consolidating this chat right now.
+                logger.info(
+                    "memory.consolidation_skipped chat=%s reason=lock_busy", chat_id
+                )
+                return
             persist = await is_memory_persist_enabled(chat_id)
             recent_budget = _recent_budget()
             total = await recent_total_tokens(chat_id)
@@ -546,23 +742,34 @@ class MemoryManager:
             if not acc or upto_pos is None:
                 return
 
-            summary_rec = await summarize_block(acc)
+            # Fused mode: one call returns both the summary and CORE facts;
+            # anything unparseable falls back to the two-call path.
+            fused = None
+            core_ctx = ""
+            if persist:
+                core_ctx = await self._core_context_text(chat_id)
+                if _consolidation_mode() == "fused":
+                    fused = await consolidate_block(acc, core_ctx)
+                    if fused is None:
+                        logger.info(
+                            "memory.consolidation_fallback chat=%s mode=split", chat_id
+                        )
+            summary_rec = fused or await summarize_block(acc)
 
             if persist:
-                # Save to long-term
-                await insert_long_summary(
-                    chat_id,
-                    summary_rec["summary"],
-                    summary_rec["importance"],
-                    summary_rec["tokens"],
-                )
+                # Save to long-term (or fold into a near-identical entry)
+                await self._store_long_summary(chat_id, summary_rec)
 
                 # Extract and save profile facts to CORE
                 block_text = "\n".join(
                     f"{m['role']}: {m['content']}" for m in acc
                 )
-                core_ctx = await self._core_context_text(chat_id)
-                await self._save_profile_facts(chat_id, block_text, core_ctx)
+                await self._save_profile_facts(
+                    chat_id,
+                    block_text,
+                    core_ctx,
+                    facts=fused["profile_facts"] if fused else None,
+                )
 
                 # Check if long-term needs cascade recompression
                 lt_total = await long_total_tokens(chat_id)
@@ -573,7 +780,7 @@ class MemoryManager:
 
             # Always delete compressed recent messages
             await delete_recent_upto_pos(chat_id, upto_pos)
-            self._last_consolidation[chat_id] = now_ts
+            self._last_consolidation.set(chat_id, now_ts)
 
     # ------------------------------------------------------------------
     # Relevance scoring for Long-term retrieval
@@ -593,39 +800,27 @@ class MemoryManager:
             score += lower_text.count(term)
         return score / (len(text) / 1000 + 1)
 
-    async def _select_long_relevant(
-        self, chat_id: int, user_query: str, budget: int | None = None
-    ) -> Tuple[List[Dict[str, str]], List[int]]:
+    async def _long_candidates(self, chat_id: int, user_query: str) -> List[PackItem]:
         await self._ensure_chat(chat_id)
         longs = await fetch_long_all(chat_id)
         if not longs:
-            return [], []
+            return []
 
-        scored = []
-        for row in longs:
-            summary = row["summary"] or ""
-            relevance = self._score(summary, user_query)
-            final = relevance * 0.7 + float(row["importance"] or 0.5) * 0.3
-            scored.append((final, row))
-
-        scored.sort(key=lambda item: item[0], reverse=True)
-
-        selected: List[Dict[str, str]] = []
-        selected_ids: List[int] = []
-        budget_left = _long_context_budget() if budget is None else max(0, budget)
-        for _, row in scored:
+        relevances = [self._score(row["summary"] or "", user_query) for row in longs]
+        # Normalised so LONG values are comparable with the other layers.
+        top_relevance = max(relevances) or 1.0
+        items = []
+        for row, relevance in zip(longs, relevances):
             text = row["summary"] or ""
             tokens = int(row["tokens"] or 0)
             if tokens == 0:
                 tokens = count_tokens_text(text, _dialog_model())
-            if tokens > budget_left:
-                continue
-            selected.append({"role": "system", "content": f"[LONG-MEMO] {text}"})
-            selected_ids.append(int(row["id"]))
-            budget_left -= tokens
-            if budget_left <= 0:
-                break
-        return selected, selected_ids
+            value = (
+                relevance / top_relevance * 0.7
+                + float(row["importance"] or 0.5) * 0.3
+            )
+            items.append(PackItem("long", tokens + _LONG_MEMO_OVERHEAD, value, row))
+        return items
 
     # ------------------------------------------------------------------
     # Context assembly
@@ -634,50 +829,113 @@ class MemoryManager:
     async def select_context(
         self, chat_id: int, user_query: str, system_prompt: str | None = None
     ) -> List[Dict[str, str]]:
+        """Pack CORE, LONG and recent under MEMORY_CONTEXT_BUDGET.
+
+        Per-layer context budgets act as caps and MEMORY_CONTEXT_MIN_*
+        as floors; see memory.context_packer. The total and the LONG/recent
+        caps follow the latency controller in memory.budget_controller.
+        Bulky service blocks in the recent window are compacted first
+        (memory.context_compactor).
+        """
         messages: List[Dict[str, str]] = []
-        has_memory = False
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt.strip()})
 
         persist = await is_memory_persist_enabled(chat_id)
-        total_budget = max(0, _memory_context_budget())
-        reserved_tokens = _messages_tokens(messages)
-        memory_budget_left = max(0, total_budget - reserved_tokens)
-        core_tokens = 0
+        recent_rows = await fetch_recent(chat_id)
+        scale = await get_budget_controller().scale_for_chat(recent_rows)
+        total_budget = max(0, int(_memory_context_budget() * scale))
+        memory_budget = max(0, total_budget - _messages_tokens(messages))
+        items: List[PackItem] = []
+        core_header_tokens = 0
 
         if persist:
-            # CORE layer — always included fully
-            core_msg, core_tokens = await self._core_context_message(
-                chat_id,
-                min(_core_context_budget(), memory_budget_left),
-            )
-            if core_msg:
-                has_memory = True
-                messages.append(core_msg)
-                memory_budget_left = max(0, memory_budget_left - core_tokens)
-
-            # Long-term — relevance-scored selection
-            long_msgs, long_ids = await self._select_long_relevant(chat_id, user_query)
-            if long_msgs:
-                has_memory = True
-            messages.extend(long_msgs)
-        else:
-            long_ids = []
-
-        # Recent / Working layer — always included.
+            # CORE — one item per fact line, kept in stored order
+            facts = await fetch_core_all(chat_id)
+            if facts:
+                core_header_tokens = _messages_tokens([{"content": "[CORE]"}])
+            for position, fact in enumerate(facts):
+                line = f"{fact['fact_key']}: {fact['fact_value']}"
+                tokens = int(fact.get("tokens") or 0)
+                if tokens == 0:
+                    tokens = count_tokens_text(line, _dialog_model())
+                items.append(PackItem("core", tokens + 1, 1.0, (position, line)))
+
+            # Long-term — relevance-scored
+            items.extend(await self._long_candidates(chat_id, user_query))
+
+        # Recent / Working layer.
         # Each user turn is prefixed with [Speaker: ...] so the model knows
         # who exactly said what (critical in groups), while the raw
         # [CHAT-TURN] technical block is dropped from the prompt.
-        recent_rows = await fetch_recent(chat_id)
         recent_msgs = _annotate_recent_rows(recent_rows)
-        recent_budget = _working_context_budget()
-        if _messages_tokens(recent_msgs) > recent_budget:
-            recent_msgs = _trim_messages_to_budget(recent_msgs, recent_budget)
-        if recent_msgs:
-            has_memory = True
-        messages.extend(recent_msgs)
-
-        if not has_memory:
+        compacted, rewritten = compact_service_blocks(recent_msgs)
+        if rewritten:
+            saved = _messages_tokens(recent_msgs) - _messages_tokens(compacted)
+            logger.info(
+                "memory.context_compacted chat=%s blocks=%d tokens_saved=%d",
+                chat_id,
+                rewritten,
+                saved,
+            )
+            recent_msgs = compacted
+        for age, msg in enumerate(reversed(recent_msgs)):
+            items.append(
+                PackItem(
+                    "recent",
+                    _messages_tokens([msg]),
+                    _RECENT_VALUE_DECAY ** age,
+                    msg,
+                    chain=age,
+                )
+            )
+
+        packed = pack_context(
+            items,
+            max(0, memory_budget - core_header_tokens),
+            minimums={
+                "core": _env_int("MEMORY_CONTEXT_MIN_CORE", 200),
+                "long": _env_int("MEMORY_CONTEXT_MIN_LONG", 500),
+                "recent": _env_int("MEMORY_CONTEXT_MIN_RECENT", 1500),
+            },
+            maximums={
+                "core": max(0, _core_context_budget() - core_header_tokens),
+                "long": int(_long_context_budget() * scale),
+                "recent": int(_working_context_budget() * scale),
+            },
+            truncate=_truncate_turn,
+        )
+
+        core_lines = sorted(item.payload for item in packed.selected["core"])
+        if core_lines:
+            text = "\n".join(line for _, line in core_lines)
+            messages.append({"role": "system", "content": f"[CORE]\n{text}"})
+        long_items = sorted(
+            packed.selected["long"], key=lambda item: item.value, reverse=True
+        )
+        for item in long_items:
+            messages.append(
+                {"role": "system", "content": f"[LONG-MEMO] {item.payload['summary'] or ''}"}
+            )
+        recent_items = sorted(
+            packed.selected["recent"], key=lambda item: item.chain, reverse=True
+        )
+        messages.extend(item.payload for item in recent_items)
+
+        logger.debug(
+            "memory.context_packed chat=%s budget=%d scale=%.3f tokens=%d core=%d "
+            "long=%d recent=%d dropped=%d",
+            chat_id,
+            memory_budget,
+            scale,
+            packed.tokens + (core_header_tokens if core_lines else 0),
+            packed.layer_tokens("core"),
+            packed.layer_tokens("long"),
+            packed.layer_tokens("recent"),
+            packed.dropped,
+        )
+
+        if not (core_lines or long_items or recent_items):
             messages.append(
                 {
                     "role": "system",
@@ -685,6 +943,7 @@ class MemoryManager:
                 }
             )
 
+        long_ids = [int(item.payload["id"]) for item in long_items]
         if long_ids:
             await bump_long_usage(long_ids)
         return messages
@@ -697,9 +956,7 @@ class MemoryManager:
         """Clear all memory layers for a chat, including working/recent context."""
         await delete_recent_chat(chat_id)
         await delete_core_facts(chat_id)
-        all_long = await fetch_long_all(chat_id)
-        if all_long:
-            await delete_long_by_ids([int(r["id"]) for r in all_long])
+        await delete_long_chat(chat_id)
         self._last_consolidation.pop(chat_id, None)
 
     async def clear_global(self):
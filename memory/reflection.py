@@ -3,27 +3,38 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 import re
 from collections import defaultdict
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
-from agent.llm import chat_once
-from core.prompts import REFLECTION_SYSTEM_PROMPT, REFLECTION_USER_TEMPLATE
-from core.tokens import count_tokens_text
-from db.memory_repository import (
-    core_total_tokens,
-    fetch_core_fact,
-    fetch_long_all,
-    upsert_core_fact,
+from core.prompts import (
+    REFLECTION_BATCH_SYSTEM_PROMPT,
+    REFLECTION_BATCH_USER_TEMPLATE,
+    REFLECTION_SYSTEM_PROMPT,
+    REFLECTION_USER_TEMPLATE,
 )
+from core.tokens import count_tokens_text
+from db.memory_repository import fetch_long_all, update_long_minhashes
 from db.settings_repository import get_last_reflection, is_memory_persist_enabled, set_last_reflection
 
+from .llm import memory_chat_once
+from .manager import apply_core_facts
+from .similarity import (
+    LshIndex,
+    decode_signature,
+    encode_signature,
+    minhash_signature,
+)
+
 logger = logging.getLogger(__name__)
 
 _REFLECTION_INTERVAL_DAYS = 3
 _MIN_GROUP_SIZE = 3
 _MIN_AVG_IMPORTANCE = 0.6  # importance in DB is 0.0-1.0 scale
+# Below this many entries the all-pairs comparison is cheaper than LSH.
+_LSH_MIN_ENTRIES = 200
 
 
 def _extract_keywords(text: str) -> set[str]:
@@ -32,13 +43,27 @@ def _extract_keywords(text: str) -> set[str]:
     return {w for w in words if len(w) > 3}
 
 
+def _entry_signature(entry: Dict, keywords: set[str]):
+    cached = decode_signature(entry.get("minhash"))
+    return cached if cached is not None else minhash_signature(keywords)
+
+
 def _group_by_keywords(entries: List[Dict]) -> List[List[Dict]]:
-    """Group entries that share significant keyword overlap."""
+    """Group entries that share significant keyword overlap.
+
+    Greedy: each ungrouped entry seeds a group with every later-unused entry
+    whose keyword Jaccard against the seed is >= 0.3. Small chats compare
+    all pairs; from _LSH_MIN_ENTRIES on, MinHash/LSH picks the candidates
+    and exact Jaccard still decides membership.
+    """
     if not entries:
         return []
 
     # Build keyword sets
     entry_kws = [(e, _extract_keywords(e.get("summary", ""))) for e in entries]
+    index = None
+    if len(entries) >= _LSH_MIN_ENTRIES:
+        index = LshIndex([_entry_signature(e, kws) for e, kws in entry_kws])
     used = set()
     groups = []
 
@@ -48,7 +73,9 @@ def _group_by_keywords(entries: List[Dict]) -> List[List[Dict]]:
         group = [entry_i]
         used.add(i)
 
-        for j, (entry_j, kw_j) in enumerate(entry_kws):
+        others = range(len(entry_kws)) if index is None else index.candidates(i)
+        for j in others:
+            entry_j, kw_j = entry_kws[j]
             if j in used or not kw_j:
                 continue
             overlap = len(kw_i & kw_j)
@@ -63,62 +90,193 @@ def _group_by_keywords(entries: List[Dict]) -> List[List[Dict]]:
     return groups
 
 
-async def reflect(chat_id: int):
-    """Analyze long-term memories and synthesize core beliefs."""
-    entries = await fetch_long_all(chat_id)
-    if not entries:
-        return
+async def _cache_signatures(chat_id: int, entries: List[Dict]):
+    """Compute and persist MinHash signatures missing on long-term rows."""
+    missing = []
+    for entry in entries:
+        if decode_signature(entry.get("minhash")) is not None:
+            continue
+        signature = minhash_signature(_extract_keywords(entry.get("summary", "")))
+        blob = encode_signature(signature)
+        if blob is None:
+            continue
+        entry["minhash"] = blob
+        missing.append((int(entry["id"]), blob))
+    if missing:
+        await update_long_minhashes(chat_id, missing)
+
+
+def _reflection_mode() -> str:
+    mode = (os.getenv("MEMORY_REFLECTION_MODE") or "batch").strip().lower()
+    return mode if mode in {"batch", "per_group"} else "batch"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _parse_json_object(raw: str) -> dict | None:
+    json_match = re.search(r"\{[\s\S]*\}", raw or "")
+    if not json_match:
+        return None
+    try:
+        data = json.loads(json_match.group())
+    except Exception:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _belief_from(data: dict) -> Tuple[str, str] | None:
+    key = str(data.get("belief_key") or "").strip()
+    value = str(data.get("belief_value") or "").strip()
+    if not key or not value:
+        return None
+    return key, value
+
+
+def _group_text(group: List[Dict]) -> str:
+    return "\n---\n".join(e.get("summary", "") for e in group)
 
-    groups = _group_by_keywords(entries)
 
+async def _synthesize_group(chat_id: int, group: List[Dict]) -> Tuple[str, str] | None:
+    """One LLM call per group (MEMORY_REFLECTION_MODE=per_group)."""
+    try:
+        prompt_user = REFLECTION_USER_TEMPLATE.format(memories_text=_group_text(group))
+        resp = await memory_chat_once(
+            [
+                {"role": "system", "content": REFLECTION_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt_user},
+            ],
+            tools=None,
+            use_reasoning=False,
+            temperature=0.2,
+            capability="memory_summary",
+            max_tokens=200,
+        )
+        data = _parse_json_object(resp.choices[0].message.content.strip())
+        return _belief_from(data) if data else None
+    except Exception as exc:
+        logger.warning("reflection.synthesize_failed chat=%s: %s", chat_id, exc)
+        return None
+
+
+async def _synthesize_each(
+    chat_id: int, groups: List[List[Dict]]
+) -> List[Tuple[str, str]]:
+    beliefs = []
     for group in groups:
-        avg_imp = sum(float(e.get("importance", 0)) for e in group) / len(group)
-        if avg_imp < _MIN_AVG_IMPORTANCE:
-            continue
+        belief = await _synthesize_group(chat_id, group)
+        if belief:
+            beliefs.append(belief)
+    return beliefs
 
-        memories_text = "\n---\n".join(e.get("summary", "") for e in group)
 
-        try:
-            prompt_user = REFLECTION_USER_TEMPLATE.format(memories_text=memories_text)
-            resp = chat_once(
-                [
-                    {"role": "system", "content": REFLECTION_SYSTEM_PROMPT},
-                    {"role": "user", "content": prompt_user},
-                ],
-                tools=None,
-                use_reasoning=False,
-                temperature=0.2,
-                capability="memory_summary",
-                max_tokens=200,
-            )
-            raw = resp.choices[0].message.content.strip()
-            json_match = re.search(r"\{[\s\S]*\}", raw)
-            if not json_match:
-                continue
-            data = json.loads(json_match.group())
-            key = data.get("belief_key", "").strip()
-            value = data.get("belief_value", "").strip()
-            if not key or not value:
-                continue
+async def _synthesize_batch(
+    chat_id: int, groups: List[List[Dict]]
+) -> List[Tuple[str, str]] | None:
+    """All groups in one structured call; None when the reply is unusable."""
+    groups_text = "\n\n".join(
+        f"### Група {number}\n{_group_text(group)}"
+        for number, group in enumerate(groups, start=1)
+    )
+    try:
+        resp = await memory_chat_once(
+            [
+                {"role": "system", "content": REFLECTION_BATCH_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": REFLECTION_BATCH_USER_TEMPLATE.format(
+                        groups_text=groups_text
+                    ),
+                },
+            ],
+            tools=None,
+            use_reasoning=False,
+            temperature=0.2,
+            capability="memory_summary",
+            max_tokens=min(2000, 200 * len(groups)),
+        )
+        data = _parse_json_object(resp.choices[0].message.content.strip())
+    except Exception as exc:
+        logger.warning("reflection.batch_failed chat=%s: %s", chat_id, exc)
+        return None
+    if data is None or not isinstance(data.get("beliefs"), list):
+        logger.warning(
+            "reflection.batch_unparsed chat=%s groups=%d", chat_id, len(groups)
+        )
+        return None
+    beliefs = []
+    for item in data["beliefs"]:
+        belief = _belief_from(item) if isinstance(item, dict) else None
+        if belief:
+            beliefs.append(belief)
+    return beliefs
 
-            tokens = count_tokens_text(f"{key}: {value}")
-            from os import getenv
-            core_budget = int(getenv("MEMORY_CORE_BUDGET", "1000"))
-            current = await core_total_tokens(chat_id)
-            if current + tokens > core_budget:
-                # Check if this key already exists (replacement)
-                existing = await fetch_core_fact(chat_id, key)
-                if not existing:
-                    continue  # No room
-
-            await upsert_core_fact(
-                chat_id, key, value,
-                source="inferred", confidence=200.0, tokens=tokens,
-            )
-            logger.info("reflection.belief_created chat=%s key=%s", chat_id, key)
 
-        except Exception as exc:
-            logger.warning("reflection.synthesize_failed chat=%s: %s", chat_id, exc)
+def _always_replace(existing: dict, **_fact) -> bool:
+    return True
+
+
+async def _apply_beliefs(chat_id: int, beliefs: List[Tuple[str, str]]):
+    """Write beliefs through the shared bulk CORE path.
+
+    Replacing an existing key is always allowed; new keys must fit
+    MEMORY_CORE_BUDGET.
+    """
+    candidates = [
+        {
+            "key": key,
+            "value": value,
+            "source": "inferred",
+            "confidence": 200.0,
+            "tokens": count_tokens_text(f"{key}: {value}"),
+        }
+        for key, value in beliefs
+    ]
+    for key in await apply_core_facts(
+        chat_id, candidates, should_replace=_always_replace
+    ):
+        logger.info("reflection.belief_created chat=%s key=%s", chat_id, key)
+
+
+async def reflect(chat_id: int):
+    """Analyze long-term memories and synthesize core beliefs.
+
+    In `batch` mode (default) qualifying groups go to the model
+    MEMORY_REFLECTION_BATCH_GROUPS at a time; a chunk whose reply cannot
+    be parsed falls back to one call per group.
+    """
+    entries = await fetch_long_all(chat_id)
+    if not entries:
+        return
+
+    if len(entries) >= _LSH_MIN_ENTRIES:
+        await _cache_signatures(chat_id, entries)
+    groups = [
+        group
+        for group in _group_by_keywords(entries)
+        if sum(float(e.get("importance", 0)) for e in group) / len(group)
+        >= _MIN_AVG_IMPORTANCE
+    ]
+    if not groups:
+        return
+
+    beliefs: List[Tuple[str, str]] = []
+    if _reflection_mode() == "batch":
+        size = max(1, _env_int("MEMORY_REFLECTION_BATCH_GROUPS", 12))
+        for start in range(0, len(groups), size):
+            chunk = groups[start:start + size]
+            batch = await _synthesize_batch(chat_id, chunk)
+            if batch is None:
+                batch = await _synthesize_each(chat_id, chunk)
+            beliefs.extend(batch)
+    else:
+        beliefs = await _synthesize_each(chat_id, groups)
+
+    await _apply_beliefs(chat_id, beliefs)
 
 
 async def maybe_reflect_all(chat_ids: List[int]):
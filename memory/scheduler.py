@@ -1,43 +1,197 @@
 """Nightly memory consolidation scheduler using APScheduler."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
+import random
 from datetime import datetime, timezone
+from typing import Awaitable, Callable, List
 
 logger = logging.getLogger(__name__)
 
 _scheduler = None
 
 
-async def nightly_consolidation():
-    """Run ensure_budget for all chats that have recent memory."""
+_NIGHTLY_JOB = "nightly_consolidation"
+_nightly_lock = asyncio.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _consolidation_parallelism() -> int:
+    return max(1, _env_int("MEMORY_CONSOLIDATION_PARALLELISM", 4))
+
+
+def _consolidation_window_sec() -> float:
+    return max(0, _env_int("MEMORY_CONSOLIDATION_WINDOW_MIN", 60)) * 60.0
+
+
+def _consolidation_max_attempts() -> int:
+    return max(1, _env_int("MEMORY_CONSOLIDATION_MAX_ATTEMPTS", 3))
+
+
+def _nightly_run_key() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+async def _run_paced(
+    items: List[int],
+    handler: Callable[[int], Awaitable[None]],
+    parallelism: int,
+    window_sec: float,
+):
+    """Run `handler` over `items` with at most `parallelism` in flight.
+
+    With a window, item i is not started before a random point inside its
+    slot [i, i+1) * window/len(items), so provider load is spread over the
+    window instead of bursting at its start. Slow handlers never wait
+    for their slot: pacing only delays, it does not reserve time.
+    """
+    if not items:
+        return
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    slot = window_sec / len(items) if window_sec > 0 else 0.0
+    pending = iter(enumerate(items))
+
+    async def worker():
+        for index, item in pending:
+            if slot:
+                due = started + (index + random.random()) * slot
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await handler(item)
+
+    await asyncio.gather(*(worker() for _ in range(min(parallelism, len(items)))))
+
+
+async def nightly_consolidation(run_key: str | None = None):
+    """Run ensure_budget and reflection for all chats that have recent memory.
+
+    Chats are processed by a bounded worker pool
+    (MEMORY_CONSOLIDATION_PARALLELISM) paced with jitter across
+    MEMORY_CONSOLIDATION_WINDOW_MIN; LLM calls are additionally capped per
+    provider by memory.llm. Each chat that finished without errors is
+    recorded under the run key, so a run interrupted by a restart resumes
+    with the remaining and failed chats. The run is only marked finished
+    once every chat is done or it has been started
+    MEMORY_CONSOLIDATION_MAX_ATTEMPTS times; until then the resume job
+    retries the failed chats.
+    """
+    async with _nightly_lock:
+        await _nightly_consolidation(run_key)
+
+
+async def _nightly_consolidation(run_key: str | None):
+    from db.maintenance_repository import (
+        fetch_done_chats,
+        finish_run,
+        mark_chat_done,
+        prune_runs,
+        start_run,
+    )
     from db.memory_repository import fetch_chats_with_recent
     from db.settings_repository import is_memory_persist_enabled
-    from memory.manager import MemoryManager
+    from memory.llm import budget_stats
+    from memory.locks import lock_stats
+    from memory.manager import MemoryManager, dedupe_stats
+    from memory.reflection import maybe_reflect_all
 
-    logger.info("scheduler.nightly_consolidation started")
+    run_key = run_key or _nightly_run_key()
+    attempt = await start_run(_NIGHTLY_JOB, run_key)
+    await prune_runs(_NIGHTLY_JOB, run_key)
+    done = await fetch_done_chats(_NIGHTLY_JOB, run_key)
+    chat_ids = [c for c in await fetch_chats_with_recent() if c not in done]
+    parallelism = _consolidation_parallelism()
+    logger.info(
+        "scheduler.nightly_consolidation started run=%s attempt=%d chats=%d "
+        "resumed_done=%d parallelism=%d",
+        run_key,
+        attempt,
+        len(chat_ids),
+        len(done),
+        parallelism,
+    )
     mgr = MemoryManager()
-    chat_ids = await fetch_chats_with_recent()
+    failed = 0
 
-    for chat_id in chat_ids:
+    async def consolidate_chat(chat_id: int):
+        nonlocal failed
+        ok = True
         try:
-            persist = await is_memory_persist_enabled(chat_id)
-            if not persist:
-                continue
-            await mgr.ensure_budget(chat_id)
+            if await is_memory_persist_enabled(chat_id):
+                await mgr.ensure_budget(chat_id)
         except Exception as exc:
+            ok = False
             logger.error(
                 "scheduler.consolidation_error chat=%s: %s", chat_id, exc, exc_info=True
             )
+        # Reflection every 3 days (interval is checked inside).
+        try:
+            await maybe_reflect_all([chat_id])
+        except Exception as exc:
+            ok = False
+            logger.error(
+                "scheduler.reflection_error chat=%s: %s", chat_id, exc, exc_info=True
+            )
+        # Failed chats stay pending, so a resumed run retries them.
+        if ok:
+            await mark_chat_done(_NIGHTLY_JOB, run_key, chat_id)
+        else:
+            failed += 1
 
-    # Reflection every 3 days
+    await _run_paced(
+        chat_ids, consolidate_chat, parallelism, _consolidation_window_sec()
+    )
+    max_attempts = _consolidation_max_attempts()
+    if not failed or attempt >= max_attempts:
+        await finish_run(_NIGHTLY_JOB, run_key)
+    if failed and attempt >= max_attempts:
+        logger.warning(
+            "scheduler.nightly_consolidation giving_up run=%s failed=%d attempts=%d",
+            run_key,
+            failed,
+            attempt,
+        )
+
+    stats = lock_stats()
+    logger.info(
+        "scheduler.nightly_consolidation finished run=%s chats=%d failed=%d "
+        "lock_backend=%s lock_timeouts=%s lock_wait_ms_avg=%s lock_wait_ms_max=%d "
+        "long_dedupe=%s llm_budgets=%s",
+        run_key,
+        len(chat_ids),
+        failed,
+        stats["backend"],
+        stats["timeouts"],
+        stats["wait_ms_avg"],
+        stats["wait_ms_max"],
+        dedupe_stats(),
+        budget_stats(),
+    )
+
+
+async def resume_nightly_consolidation():
+    """Finish a nightly run that a restart interrupted or that left failed chats."""
+    if _nightly_lock.locked():
+        return
     try:
-        from memory.reflection import maybe_reflect_all
-        await maybe_reflect_all(chat_ids)
-    except Exception as exc:
-        logger.error("scheduler.reflection_error: %s", exc, exc_info=True)
+        from db.maintenance_repository import fetch_unfinished_run
 
-    logger.info("scheduler.nightly_consolidation finished chats=%d", len(chat_ids))
+        run = await fetch_unfinished_run(_NIGHTLY_JOB)
+        if not run:
+            return
+        logger.info("scheduler.nightly_consolidation resuming run=%s", run["run_key"])
+        await nightly_consolidation(run["run_key"])
+    except Exception as exc:
+        logger.error("scheduler.nightly_resume_failed: %s", exc, exc_info=True)
 
 
 async def periodic_media_tmp_purge():
@@ -57,10 +211,54 @@ async def periodic_media_tmp_purge():
         logger.error("scheduler.media_tmp_purge_failed: %s", exc, exc_info=True)
 
 
+async def periodic_cache_purge():
+    """Delete expired search_cache/page_cache rows in bounded batches.
+
+    Upserts keep one row per key, but keys that are never queried again
+    would otherwise stay in the tables forever. Expiry uses the same TTLs
+    as the readers: the longest profile TTL plus its stale window for search
+    rows, FETCH_TTL_MIN for pages. Each run also
+    re-encodes one batch of legacy plain-text rows into compact blobs.
+    """
+    try:
+        from agent.tools.fetch_page import TTL_MIN as PAGE_TTL_MIN
+        from agent.tools.web_search import search_cache_retention_min
+        from db.search_repository import (
+            cache_stats,
+            compact_legacy_cache_rows,
+            purge_expired_page_cache,
+            purge_expired_search_cache,
+        )
+
+        search_removed = await purge_expired_search_cache(search_cache_retention_min())
+        page_removed = await purge_expired_page_cache(PAGE_TTL_MIN)
+        compacted = await compact_legacy_cache_rows()
+        stats = cache_stats()
+        logger.info(
+            "scheduler.cache_purged search=%s page=%s "
+            "compacted_search=%s compacted_page=%s "
+            "search_memory_hit_ratio=%s search_db_hit_ratio=%s "
+            "page_memory_hit_ratio=%s page_db_hit_ratio=%s",
+            search_removed,
+            page_removed,
+            compacted["search"],
+            compacted["page"],
+            stats["search"]["memory_hit_ratio"],
+            stats["search"]["db_hit_ratio"],
+            stats["page"]["memory_hit_ratio"],
+            stats["page"]["db_hit_ratio"],
+        )
+    except Exception as exc:
+        logger.error("scheduler.cache_purge_failed: %s", exc, exc_info=True)
+
+
 def start_scheduler():
     """Start the APScheduler:
-    - nightly_consolidation at 02:00 UTC (memory budget rollover)
+    - nightly_consolidation at 02:00 UTC (memory budget rollover), plus a
+      resume at startup and every hour that retries an unfinished run
+      (interrupted, or with failed chats)
     - periodic_media_tmp_purge every 6 hours (orphan tmp cleanup)
+    - periodic_cache_purge every hour (expired search/page cache rows)
     """
     global _scheduler
     try:
@@ -78,15 +276,29 @@ def start_scheduler():
         id="nightly_consolidation",
         replace_existing=True,
     )
+    _scheduler.add_job(
+        resume_nightly_consolidation,
+        IntervalTrigger(hours=1),
+        next_run_time=datetime.now(timezone.utc),
+        id="nightly_consolidation_resume",
+        replace_existing=True,
+    )
     _scheduler.add_job(
         periodic_media_tmp_purge,
         IntervalTrigger(hours=6),
         id="media_tmp_purge",
         replace_existing=True,
     )
+    _scheduler.add_job(
+        periodic_cache_purge,
+        IntervalTrigger(hours=1),
+        id="cache_purge",
+        replace_existing=True,
+    )
     _scheduler.start()
     logger.info(
-        "scheduler.started jobs=nightly_consolidation@02:00,media_tmp_purge@6h"
+        "scheduler.started jobs=nightly_consolidation@02:00,"
+        "nightly_consolidation_resume@1h,media_tmp_purge@6h,cache_purge@1h"
     )
 
 
@@ -0,0 +1,128 @@
+"""Set-similarity sketches for long-term memory entries.
+
+MinHash signatures estimate the Jaccard similarity of two keyword sets;
+banded LSH buckets turn them into candidate pairs without comparing every
+entry with every other. Candidates are still verified with exact Jaccard
+by the caller, so LSH only decides which pairs are looked at.
+
+SimHash fingerprints (64 bits over stemmed content words, the same terms
+as search query signatures) flag near-duplicate summaries. Stemming and
+dropping function words let reworded paraphrases ("цікавився рецептом" /
+"питав рецепт") land a few bits apart; word bigrams only matched
+near-verbatim repeats.
+
+With 128 permutations in 64 bands of 2 rows, a pair at Jaccard 0.3 lands
+in at least one shared bucket with probability 1 - (1 - 0.3**2)**64 ≈ 0.998
+(≈ 0.99999 at 0.4).
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+import struct
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from agent.tools.query_similarity import query_signature
+
+NUM_PERM = 128
+LSH_ROWS = 2
+
+_SIG_VERSION = 0x01
+_PRIME = (1 << 61) - 1
+_MASK32 = (1 << 32) - 1
+# Fixed seed: stored signatures must stay comparable across processes.
+_rng = random.Random(0x5EED_0031)
+_PERMS: List[Tuple[int, int]] = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)
+]
+_SIG_STRUCT = struct.Struct(f"<{NUM_PERM}I")
+
+Signature = Tuple[int, ...]
+
+
+def _token_hash(token: str) -> int:
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def minhash_signature(tokens: Iterable[str]) -> Signature:
+    """NUM_PERM-long MinHash of a token set; empty tuple for an empty set."""
+    hashes = [_token_hash(t) for t in set(tokens)]
+    if not hashes:
+        return ()
+    return tuple(
+        min((a * h + b) % _PRIME for h in hashes) & _MASK32 for a, b in _PERMS
+    )
+
+
+def encode_signature(signature: Signature) -> bytes | None:
+    if len(signature) != NUM_PERM:
+        return None
+    return bytes([_SIG_VERSION]) + _SIG_STRUCT.pack(*signature)
+
+
+def decode_signature(blob: bytes | bytearray | memoryview | None) -> Optional[Signature]:
+    """Signature stored by `encode_signature`, or None if absent/stale."""
+    if not blob:
+        return None
+    data = bytes(blob)
+    if data[0] != _SIG_VERSION or len(data) != 1 + _SIG_STRUCT.size:
+        return None
+    return _SIG_STRUCT.unpack(data[1:])
+
+
+def estimated_jaccard(left: Signature, right: Signature) -> float:
+    if not left or len(left) != len(right):
+        return 0.0
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+class LshIndex:
+    """Banded LSH over MinHash signatures (positions in `signatures`)."""
+
+    def __init__(self, signatures: Sequence[Signature], rows: int = LSH_ROWS):
+        self.rows = rows
+        self._keys = [self._band_keys(signature) for signature in signatures]
+        self._bands: List[Dict[Tuple[int, ...], List[int]]] = [
+            {} for _ in range(NUM_PERM // rows)
+        ]
+        for index, keys in enumerate(self._keys):
+            for bucket, key in zip(self._bands, keys):
+                bucket.setdefault(key, []).append(index)
+
+    def _band_keys(self, signature: Signature) -> List[Tuple[int, ...]]:
+        return list(zip(*(signature[r::self.rows] for r in range(self.rows))))
+
+    def candidates(self, index: int) -> List[int]:
+        """Positions sharing at least one band with `index`, ascending."""
+        found = set()
+        for bucket, key in zip(self._bands, self._keys[index]):
+            found.update(bucket[key])
+        found.discard(index)
+        return sorted(found)
+
+
+SIMHASH_BITS = 64
+
+
+# Every summary is about "the user"; the word carries no signal.
+_SIMHASH_STOPWORDS = frozenset(
+    {"user", "users", "користувач", "користувача", "користувачу", "користувачем"}
+)
+
+
+def simhash(text: str) -> int | None:
+    """64-bit SimHash of the text's stemmed content words."""
+    terms = query_signature(text or "", _SIMHASH_STOPWORDS)
+    if not terms:
+        return None
+    weights = [0] * SIMHASH_BITS
+    for term in terms:
+        value = _token_hash(term)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return (left ^ right).bit_count()
@@ -8,15 +8,18 @@ from typing import Dict, List
 
 logger = logging.getLogger(__name__)
 
-from agent.llm import chat_once
 from core.prompts import (
     FACT_EXTRACTION_SYSTEM_PROMPT,
     FACT_EXTRACTION_USER_TEMPLATE,
+    MEMORY_CONSOLIDATION_SYSTEM_PROMPT,
+    MEMORY_CONSOLIDATION_USER_TEMPLATE,
     MEMORY_SUMMARY_SYSTEM_PROMPT,
     MEMORY_SUMMARY_USER_TEMPLATE,
 )
 from core.tokens import count_tokens_text
 
+from .llm import memory_chat_once
+
 _SUM_MODEL = os.getenv("OPENAI_SUMMARIZER_MODEL", "gpt-4o-mini")
 
 
@@ -31,8 +34,8 @@ def _format_block(messages: List[Dict[str, str]]) -> str:
     return "\n".join(lines)
 
 
-def _run_summary_model(prompt_user: str):
-    return chat_once(
+async def _run_summary_model(prompt_user: str):
+    return await memory_chat_once(
         [
             {"role": "system", "content": MEMORY_SUMMARY_SYSTEM_PROMPT},
             {"role": "user", "content": prompt_user},
@@ -53,7 +56,7 @@ async def summarize_block(messages: List[Dict[str, str]]) -> dict:
     block = _format_block(messages)
     prompt_user = MEMORY_SUMMARY_USER_TEMPLATE.format(block=block)
     try:
-        resp = _run_summary_model(prompt_user)
+        resp = await _run_summary_model(prompt_user)
     except RuntimeError:
         resp = None
 
@@ -113,6 +116,67 @@ async def summarize_block(messages: List[Dict[str, str]]) -> dict:
     }
 
 
+async def consolidate_block(
+    messages: List[Dict[str, str]], core_context: str
+) -> dict | None:
+    """
+    Summary and CORE facts for one block in a single structured call.
+    -> { 'summary': str, 'importance': float, 'tokens': int, 'profile_facts': list }
+    or None when the call fails or the reply is not the expected JSON, so the
+    caller can fall back to summarize_block + extract_profile_facts.
+    """
+    block = _format_block(messages)
+    prompt_user = MEMORY_CONSOLIDATION_USER_TEMPLATE.format(
+        core_context=core_context or "(порожньо)",
+        block=block,
+    )
+    try:
+        resp = await memory_chat_once(
+            [
+                {"role": "system", "content": MEMORY_CONSOLIDATION_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt_user},
+            ],
+            tools=None,
+            use_reasoning=False,
+            temperature=0.2,
+            capability="memory_summary",
+            max_tokens=1000,
+        )
+        raw = resp.choices[0].message.content.strip()
+        json_match = re.search(r"\{[\s\S]*\}", raw)
+        data = json.loads(json_match.group()) if json_match else None
+    except Exception as exc:
+        logger.warning("summarizer.consolidate_block failed: %s", exc)
+        return None
+
+    if not isinstance(data, dict):
+        return None
+    summary = str(data.get("memory") or "").strip()
+    facts = data.get("profile_facts", [])
+    if not summary or not isinstance(facts, list):
+        return None
+    quotes = data.get("quotes") or []
+    if isinstance(quotes, str):
+        quotes = [quotes]
+    quotes = [
+        str(q).strip()
+        for q in quotes
+        if str(q).strip() and str(q).strip().lower() not in {"none", "no", "немає"}
+    ]
+    if quotes:
+        summary = f"{summary}\nQuotes: {' | '.join(quotes[:2])}"
+    try:
+        importance = float(data.get("importance", 0.5))
+    except Exception:
+        importance = 0.5
+    return {
+        "summary": summary,
+        "importance": max(0.0, min(1.0, importance)),
+        "tokens": count_tokens_text(summary, _SUM_MODEL),
+        "profile_facts": [f for f in facts if isinstance(f, dict)],
+    }
+
+
 async def extract_profile_facts(
     block_text: str, core_context: str
 ) -> List[Dict]:
@@ -125,7 +189,7 @@ async def extract_profile_facts(
         block=block_text[:4000],
     )
     try:
-        resp = chat_once(
+        resp = await memory_chat_once(
             [
                 {"role": "system", "content": FACT_EXTRACTION_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt_user},
@@ -156,7 +220,7 @@ async def compress_entry(text: str, core_context: str) -> str:
         "Поверни тільки стиснений текст, без пояснень."
     )
     try:
-        resp = chat_once(
+        resp = await memory_chat_once(
             [{"role": "user", "content": prompt}],
             tools=None,
             use_reasoning=False,
@@ -162,6 +162,11 @@ async def main():
             await a.stop()
         except Exception:
             pass
+    from agent.tools.http_client import close_http_clients
+    from agent.tools.provider_scoreboard import save_provider_scoreboard
+
+    await close_http_clients()
+    save_provider_scoreboard()
     logger.info("runtime.stopped")
 
 
@@ -0,0 +1,114 @@
+"""Benchmark: page text extraction, BeautifulSoup html.parser vs page_text.
+
+Run from the repo root:
+    python -m tests.benchmarks.bench_page_extraction [saved_pages_dir]
+
+With a directory, every *.html / *.htm file in it is used as the corpus
+(e.g. pages saved with `curl -o`). Without one, synthetic article pages of
+30 KB to 2 MB are generated: inline scripts and styles, navigation, and
+long runs of paragraphs, roughly like news and docs pages.
+Reports throughput and tracemalloc peak memory per engine, and the share
+of page text kept by main-content extraction.
+"""
+from __future__ import annotations
+
+import pathlib
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+from agent.tools import page_text
+
+
+def _legacy_clean_text(html: str) -> str:
+    """`_clean_text` as it was before streaming extraction."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+    txt = soup.get_text(" ")
+    txt = re.sub(r"\s+", " ", txt).strip()
+    return txt[:20000]
+
+
+def _synthetic_page(size: int, rng: random.Random) -> str:
+    words = [f"word{i}" for i in range(3000)]
+    head = (
+        "<html><head><title>Article</title>"
+        "<style>" + "body{margin:0}" * 200 + "</style>"
+        "<script>" + "var a = {'k': [1,2,3]};" * 300 + "</script></head><body>"
+        "<nav>" + "".join(f"<a href='/s{i}'>Section {i}</a>" for i in range(80)) + "</nav>"
+    )
+    parts = [head]
+    total = len(head)
+    while total < size:
+        paragraph = "<p>" + " ".join(rng.choices(words, k=60)) + "</p>\n"
+        if rng.random() < 0.05:
+            paragraph += "<script>track(" + "1," * 200 + "0);</script>"
+        parts.append(paragraph)
+        total += len(paragraph)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def _corpus(directory: str | None) -> list[str]:
+    if directory:
+        paths = sorted(
+            p for p in pathlib.Path(directory).iterdir() if p.suffix in (".html", ".htm")
+        )
+        return [p.read_text(encoding="utf-8", errors="replace") for p in paths]
+    rng = random.Random(11)
+    sizes = [30_000, 120_000, 400_000, 2_000_000]
+    return [_synthetic_page(size, rng) for size in sizes for _ in range(3)]
+
+
+def _measure(name: str, extract, pages: list[str]) -> None:
+    total_bytes = sum(len(page.encode("utf-8")) for page in pages)
+    started = time.perf_counter()
+    for page in pages:
+        extract(page)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    peak = 0
+    for page in pages:
+        tracemalloc.reset_peak()
+        extract(page)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    print(
+        f"  {name:<24} {len(pages) / elapsed:8.1f} pages/s "
+        f"{total_bytes / elapsed / 1e6:8.2f} MB/s  peak {peak / 1e6:8.2f} MB"
+    )
+
+
+def run(directory: str | None = None):
+    pages = _corpus(directory)
+    total_mb = sum(len(page) for page in pages) / 1e6
+    print(f"{len(pages)} pages, {total_mb:.1f} MB of HTML")
+    _measure("bs4 html.parser (old)", _legacy_clean_text, pages)
+    engines = [("stdlib", None)]
+    if page_text.lxml_etree is not None:
+        engines.insert(0, ("lxml", page_text.lxml_etree))
+    else:
+        print("  lxml                     not installed")
+    for name, module in engines:
+        saved = page_text.lxml_etree
+        page_text.lxml_etree = module
+        try:
+            _measure(f"page_text ({name})", lambda html: page_text.extract_page_text(html, 20000), pages)
+        finally:
+            page_text.lxml_etree = saved
+
+    results = [page_text.extract_page_text(page, 20000) for page in pages]
+    kept = sum(result.kept_chars for result in results)
+    dropped = sum(result.dropped_chars for result in results)
+    print(f"main content kept {kept / max(kept + dropped, 1):.0%} of parsed text")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,115 @@
+"""Benchmark: result match counting, per-call term parsing vs QueryMatcher.
+
+Run from the repo root:
+    python -m tests.benchmarks.bench_query_matcher [results ...]
+
+Before QueryMatcher, `_filter_and_rank_results` re-parsed the query and
+rebuilt the lowercased haystack for every count of every result; the legacy
+helpers below are copies of that code. Synthetic results mix Ukrainian and
+English titles, snippets and page text of a few KB, like extracted pages.
+"""
+from __future__ import annotations
+
+import random
+import re
+import sys
+import time
+import urllib.parse
+
+from agent.search_task import NormalizedResult
+from agent.tools import web_search
+
+QUERIES = (
+    "графік роботи метро Київ 2026-05-05 нічні поїзди",
+    "latest news Apollo program NASA budget moon landing",
+    "python asyncio cancel task timeout example",
+)
+
+
+def _legacy_query_terms(query: str) -> list[str]:
+    terms = []
+    for term in re.findall(r"[\w-]+", urllib.parse.unquote_plus(query or "").lower()):
+        cleaned = "".join(ch for ch in term if ch.isalnum() or ch in {"-", "_"})
+        if len(cleaned) < 3 or cleaned in web_search._QUERY_STOPWORDS:
+            continue
+        terms.append(cleaned)
+    return terms
+
+
+def _legacy_required_query_terms(query: str) -> list[str]:
+    required: list[str] = []
+    for term in _legacy_query_terms(query):
+        if term in web_search.LOW_VALUE_QUERY_TERMS or term.isdigit():
+            continue
+        if re.fullmatch(r"\d{4}[-_]\d{2}[-_]\d{2}", term):
+            continue
+        if term not in required:
+            required.append(term)
+    return required[:8]
+
+
+def _legacy_term_in_haystack(term: str, haystack: str) -> bool:
+    aliases = web_search.QUERY_TERM_ALIASES.get(term, (term,))
+    return any(alias in haystack for alias in aliases)
+
+
+def _legacy_counts(query: str, item: NormalizedResult) -> tuple[int, int]:
+    haystack = web_search._item_search_haystack(item)
+    matches = sum(
+        1 for term in _legacy_query_terms(query) if _legacy_term_in_haystack(term, haystack)
+    )
+    haystack = web_search._item_search_haystack(item)
+    required = sum(
+        1
+        for term in _legacy_required_query_terms(query)
+        if _legacy_term_in_haystack(term, haystack)
+    )
+    return matches, required
+
+
+def _make_results(count: int, seed: int = 5) -> list[NormalizedResult]:
+    rng = random.Random(seed)
+    words = " ".join(QUERIES).lower().split() + [f"слово{i}" for i in range(400)]
+    results = []
+    for index in range(count):
+        text = " ".join(rng.choices(words, k=600))
+        results.append(
+            NormalizedResult(
+                url=f"https://site{index % 40}.example/page/{index}",
+                title=" ".join(rng.choices(words, k=8)),
+                snippet=" ".join(rng.choices(words, k=40)),
+                relevance_score=rng.random(),
+                source_provider="bench",
+                domain=f"site{index % 40}.example",
+                full_content=text.title() if index % 2 else text,
+            )
+        )
+    return results
+
+
+def run(count: int):
+    results = _make_results(count)
+    for query in QUERIES:
+        started = time.perf_counter()
+        legacy = [_legacy_counts(query, item) for item in results]
+        legacy_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        matcher = web_search._query_matcher(query)
+        current = [matcher.scan(web_search._item_search_haystack(item)) for item in results]
+        matcher_s = time.perf_counter() - started
+        assert legacy == current, "QueryMatcher counts diverge from the legacy helpers"
+
+        started = time.perf_counter()
+        web_search._filter_and_rank_results(query, results, 10)
+        rank_s = time.perf_counter() - started
+        print(
+            f"{count:6d} results  {query[:32]:<32}  legacy {legacy_s * 1000:8.1f} ms  "
+            f"matcher {matcher_s * 1000:8.1f} ms  ({legacy_s / matcher_s:4.1f}x)  "
+            f"full rank {rank_s * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    for size in [int(arg) for arg in sys.argv[1:]] or [50, 500, 5000]:
+        run(size)
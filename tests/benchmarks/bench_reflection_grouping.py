@@ -0,0 +1,75 @@
+"""Benchmark: reflection grouping, all-pairs Jaccard vs MinHash/LSH.
+
+Run from the repo root:
+    python -m tests.benchmarks.bench_reflection_grouping [entries ...]
+
+Synthetic chats mix topic clusters (summaries drawn from a shared topic
+vocabulary) with unrelated noise, roughly like a busy chat's memory_long.
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from memory import reflection
+from memory.similarity import encode_signature, minhash_signature
+
+
+def _make_entries(count: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    vocabulary = [f"слово{i:05d}" for i in range(20000)]
+    topics = [rng.sample(vocabulary, 25) for _ in range(max(1, count // 20))]
+    entries = []
+    for entry_id in range(count):
+        if rng.random() < 0.7:
+            topic = rng.choice(topics)
+            words = rng.sample(topic, 14) + rng.sample(vocabulary, 4)
+        else:
+            words = rng.sample(vocabulary, 18)
+        entries.append({"id": entry_id, "summary": " ".join(words), "importance": 0.7})
+    return entries
+
+
+def _timed(entries: list[dict], lsh_min_entries: int) -> tuple[float, list]:
+    saved = reflection._LSH_MIN_ENTRIES
+    reflection._LSH_MIN_ENTRIES = lsh_min_entries
+    try:
+        started = time.perf_counter()
+        groups = reflection._group_by_keywords(entries)
+        return time.perf_counter() - started, groups
+    finally:
+        reflection._LSH_MIN_ENTRIES = saved
+
+
+def _group_ids(groups: list) -> set:
+    return {tuple(e["id"] for e in group) for group in groups}
+
+
+def run(count: int):
+    entries = _make_entries(count)
+    exact_s, exact = _timed(entries, lsh_min_entries=sys.maxsize)
+    cold_s, cold = _timed(entries, lsh_min_entries=0)
+
+    started = time.perf_counter()
+    for entry in entries:
+        kws = reflection._extract_keywords(entry["summary"])
+        entry["minhash"] = encode_signature(minhash_signature(kws))
+    signing_s = time.perf_counter() - started
+    cached_s, cached = _timed(entries, lsh_min_entries=0)
+
+    same = _group_ids(exact) == _group_ids(cached) == _group_ids(cold)
+    print(
+        f"entries={count:>5} groups={len(exact):>4} "
+        f"exact={exact_s * 1000:>9.1f}ms "
+        f"lsh_cold={cold_s * 1000:>8.1f}ms "
+        f"lsh_cached={cached_s * 1000:>8.1f}ms "
+        f"signing={signing_s * 1000:>8.1f}ms "
+        f"identical_groups={same}"
+    )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [200, 1000, 3000]
+    for size in sizes:
+        run(size)
@@ -118,6 +118,15 @@ def patch_http(monkeypatch):
     yield
 
 
+@pytest.fixture(autouse=True)
+def isolated_provider_scoreboard(monkeypatch, tmp_path):
+    import agent.tools.provider_scoreboard as scoreboard
+
+    monkeypatch.setenv("SEARCH_PROVIDER_STATS_PATH", str(tmp_path / "provider_stats.json"))
+    monkeypatch.setattr(scoreboard, "_SCOREBOARD", None)
+    yield
+
+
 skip_no_ffmpeg = pytest.mark.skipif(
     shutil.which("ffmpeg") is None, reason="ffmpeg not installed"
 )
@@ -4,6 +4,7 @@ from db.connection import fetchone, fetchall
 @pytest.mark.asyncio
 async def test_tables_exist():
     for t in ["chats","participants","glossary","threads","messages",
-              "memory_recent","memory_long","settings","migrations_log","search_cache","page_cache"]:
+              "memory_recent","memory_long","settings","migrations_log","search_cache","page_cache",
+              "maintenance_runs","maintenance_progress"]:
         row = await fetchone(f"SHOW TABLES LIKE '{t}'")
         assert row is not None, f"table {t} missing"
@@ -119,19 +119,17 @@ async def test_save_profile_facts_does_not_mix_people_without_stable_identity(mo
             },
         ]
 
-    async def fake_core_total_tokens(chat_id):
-        return 0
-
-    async def fake_fetch_core_fact(chat_id, key):
-        return None
+    async def fake_fetch_core_all(chat_id):
+        return []
 
-    async def fake_upsert_core_fact(chat_id, key, value, source, confidence, tokens):
-        saved.append((key, value, source, confidence))
+    async def fake_upsert_core_facts(chat_id, facts):
+        saved.extend(
+            (f["key"], f["value"], f["source"], f["confidence"]) for f in facts
+        )
 
     monkeypatch.setattr("memory.manager.extract_profile_facts", fake_extract_profile_facts)
-    monkeypatch.setattr("memory.manager.core_total_tokens", fake_core_total_tokens)
-    monkeypatch.setattr("memory.manager.fetch_core_fact", fake_fetch_core_fact)
-    monkeypatch.setattr("memory.manager.upsert_core_fact", fake_upsert_core_fact)
+    monkeypatch.setattr("memory.manager.fetch_core_all", fake_fetch_core_all)
+    monkeypatch.setattr("memory.manager.upsert_core_facts", fake_upsert_core_facts)
     monkeypatch.setattr("memory.manager.count_tokens_text", lambda text, model: 1)
 
     block = """
@@ -147,3 +145,692 @@ current_user_text: I am not a medic, I work in communications.
     assert "participant.user_111.profession" in keys
     assert "chat.recurring_topics" in keys
     assert "participant.user_222.profession" not in keys
+
+
+@pytest.mark.asyncio
+async def test_clear_all_uses_chat_scoped_chunked_deletes(monkeypatch):
+    import db.connection as connection
+
+    statements = []
+    remaining = {"memory_recent": 5, "memory_long": 3, "memory_core": 0}
+
+    async def fake_execute(sql, args=None):
+        statements.append((sql, tuple(args or ())))
+        for table, left in remaining.items():
+            if f"FROM {table}" in sql:
+                if "LIMIT" not in sql:
+                    remaining[table] = 0
+                    return left
+                batch = args[-1]
+                removed = min(batch, left)
+                remaining[table] = left - removed
+                return removed
+        return 0
+
+    monkeypatch.setattr(connection, "execute", fake_execute)
+    monkeypatch.setattr("db.memory_repository.execute", fake_execute)
+    monkeypatch.setenv("MEMORY_DELETE_CHUNK", "2")
+
+    async def fail_fetch_long_all(chat_id):
+        raise AssertionError("clear_all must not load long rows")
+
+    monkeypatch.setattr(memory_manager_module, "fetch_long_all", fail_fetch_long_all)
+
+    await memory_manager_module.MemoryManager().clear_all(4242)
+
+    assert all("chat_id=%s" in sql and args[0] == 4242 for sql, args in statements)
+    recent = [s for s in statements if "memory_recent" in s[0]]
+    long = [s for s in statements if "memory_long" in s[0]]
+    assert len(recent) == 3
+    assert len(long) == 2
+    assert all(args[-1] == 2 for _sql, args in recent + long)
+
+
+@pytest.mark.asyncio
+async def test_memory_managers_share_process_chat_locks():
+    from memory.locks import InProcessChatLocks
+
+    first = memory_manager_module.MemoryManager()
+    second = memory_manager_module.MemoryManager()
+    assert first._locks is second._locks
+
+    locks = InProcessChatLocks(timeout_sec=0.05)
+    async with locks.hold(1) as outer:
+        async with locks.hold(1) as inner:
+            assert outer is True
+            assert inner is False
+    assert locks.stats["acquired"] == 1
+    assert locks.stats["timeouts"] == 1
+    # idle chats do not keep a lock entry around
+    assert locks._locks == {}
+
+
+@pytest.mark.asyncio
+async def test_mysql_chat_locks_use_get_lock_on_one_session(monkeypatch):
+    from contextlib import asynccontextmanager
+
+    import memory.locks as locks_module
+
+    executed = []
+
+    class FakeCursor:
+        async def execute(self, sql, args=None):
+            executed.append((sql, args))
+
+        async def fetchone(self):
+            return (1,)
+
+    @asynccontextmanager
+    async def fake_conn_cursor(dict_cursor=False):
+        yield object(), FakeCursor()
+
+    monkeypatch.setattr(locks_module, "get_conn_cursor", fake_conn_cursor)
+    monkeypatch.setenv("DB_NAME", "aisus_test")
+    locks = locks_module.MySqlChatLocks(timeout_sec=5)
+
+    async with locks.hold(-100123) as acquired:
+        assert acquired is True
+        assert executed[0][0] == "SELECT GET_LOCK(%s, %s)"
+        assert executed[0][1][0] == "aisus_test.memory.-100123"
+
+    assert executed[-1] == ("SELECT RELEASE_LOCK(%s)", ("aisus_test.memory.-100123",))
+    assert locks.stats["acquired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_nightly_consolidation_resumes_and_bounds_parallelism(monkeypatch):
+    import asyncio
+
+    import db.maintenance_repository as maintenance
+    import db.memory_repository as memory_repository
+    import db.settings_repository as settings_repository
+    import memory.reflection as reflection
+    from memory import scheduler
+
+    marked = []
+    running = {"now": 0, "max": 0}
+
+    async def fake_ensure_budget(self, chat_id):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+
+    async def noop(*_args, **_kwargs):
+        return None
+
+    async def fake_done(job, run_key):
+        assert run_key == "2026-01-02"
+        return {1, 2}
+
+    async def fake_start(job, run_key):
+        return 1
+
+    async def fake_mark(job, run_key, chat_id):
+        marked.append(chat_id)
+
+    async def fake_chats():
+        return list(range(1, 11))
+
+    async def persist_enabled(chat_id):
+        return True
+
+    monkeypatch.setattr(maintenance, "start_run", fake_start)
+    monkeypatch.setattr(maintenance, "finish_run", noop)
+    monkeypatch.setattr(maintenance, "prune_runs", noop)
+    monkeypatch.setattr(maintenance, "fetch_done_chats", fake_done)
+    monkeypatch.setattr(maintenance, "mark_chat_done", fake_mark)
+    monkeypatch.setattr(memory_repository, "fetch_chats_with_recent", fake_chats)
+    monkeypatch.setattr(settings_repository, "is_memory_persist_enabled", persist_enabled)
+    monkeypatch.setattr(reflection, "maybe_reflect_all", noop)
+    monkeypatch.setattr(
+        memory_manager_module.MemoryManager, "ensure_budget", fake_ensure_budget
+    )
+    monkeypatch.setenv("MEMORY_CONSOLIDATION_PARALLELISM", "3")
+    monkeypatch.setenv("MEMORY_CONSOLIDATION_WINDOW_MIN", "0")
+
+    await scheduler.nightly_consolidation("2026-01-02")
+
+    assert sorted(marked) == list(range(3, 11))
+    assert running["max"] == 3
+
+
+@pytest.mark.asyncio
+async def test_nightly_consolidation_leaves_failed_chats_pending(monkeypatch):
+    import db.maintenance_repository as maintenance
+    import db.memory_repository as memory_repository
+    import db.settings_repository as settings_repository
+    import memory.reflection as reflection
+    from memory import scheduler
+
+    runs = {}
+    done = set()
+    processed = []
+    broken = {2}
+
+    async def fake_ensure_budget(self, chat_id):
+        processed.append(chat_id)
+
+    async def fake_reflect(chat_ids):
+        if chat_ids[0] in broken:
+            raise RuntimeError("provider unavailable")
+
+    async def noop(*_args, **_kwargs):
+        return None
+
+    async def fake_start(job, run_key):
+        run = runs.setdefault(run_key, {"attempts": 0, "finished": False})
+        run["attempts"] += 1
+        run["finished"] = False
+        return run["attempts"]
+
+    async def fake_finish(job, run_key):
+        runs[run_key]["finished"] = True
+
+    async def fake_unfinished(job):
+        for run_key, run in runs.items():
+            if not run["finished"]:
+                return {"run_key": run_key}
+        return None
+
+    async def fake_done(job, run_key):
+        return set(done)
+
+    async def fake_mark(job, run_key, chat_id):
+        done.add(chat_id)
+
+    async def fake_chats():
+        return [1, 2, 3]
+
+    async def persist_enabled(chat_id):
+        return True
+
+    monkeypatch.setattr(maintenance, "start_run", fake_start)
+    monkeypatch.setattr(maintenance, "finish_run", fake_finish)
+    monkeypatch.setattr(maintenance, "fetch_unfinished_run", fake_unfinished)
+    monkeypatch.setattr(maintenance, "prune_runs", noop)
+    monkeypatch.setattr(maintenance, "fetch_done_chats", fake_done)
+    monkeypatch.setattr(maintenance, "mark_chat_done", fake_mark)
+    monkeypatch.setattr(memory_repository, "fetch_chats_with_recent", fake_chats)
+    monkeypatch.setattr(settings_repository, "is_memory_persist_enabled", persist_enabled)
+    monkeypatch.setattr(reflection, "maybe_reflect_all", fake_reflect)
+    monkeypatch.setattr(
+        memory_manager_module.MemoryManager, "ensure_budget", fake_ensure_budget
+    )
+    monkeypatch.setenv("MEMORY_CONSOLIDATION_WINDOW_MIN", "0")
+
+    await scheduler.nightly_consolidation("2026-01-03")
+
+    assert done == {1, 3}
+    assert runs["2026-01-03"]["finished"] is False
+
+    broken.clear()
+    processed.clear()
+    await scheduler.resume_nightly_consolidation()
+
+    assert processed == [2]
+    assert done == {1, 2, 3}
+    assert runs["2026-01-03"]["finished"] is True
+
+
+@pytest.mark.asyncio
+async def test_nightly_consolidation_finishes_after_max_attempts(monkeypatch):
+    import db.maintenance_repository as maintenance
+    import db.memory_repository as memory_repository
+    import db.settings_repository as settings_repository
+    import memory.reflection as reflection
+    from memory import scheduler
+
+    finished = []
+
+    async def failing_ensure_budget(self, chat_id):
+        raise RuntimeError("provider unavailable")
+
+    async def noop(*_args, **_kwargs):
+        return None
+
+    async def fake_start(job, run_key):
+        return 3
+
+    async def fake_finish(job, run_key):
+        finished.append(run_key)
+
+    async def fake_done(job, run_key):
+        return set()
+
+    async def fake_chats():
+        return [1]
+
+    async def persist_enabled(chat_id):
+        return True
+
+    monkeypatch.setattr(maintenance, "start_run", fake_start)
+    monkeypatch.setattr(maintenance, "finish_run", fake_finish)
+    monkeypatch.setattr(maintenance, "prune_runs", noop)
+    monkeypatch.setattr(maintenance, "fetch_done_chats", fake_done)
+    monkeypatch.setattr(maintenance, "mark_chat_done", noop)
+    monkeypatch.setattr(memory_repository, "fetch_chats_with_recent", fake_chats)
+    monkeypatch.setattr(settings_repository, "is_memory_persist_enabled", persist_enabled)
+    monkeypatch.setattr(reflection, "maybe_reflect_all", noop)
+    monkeypatch.setattr(
+        memory_manager_module.MemoryManager, "ensure_budget", failing_ensure_budget
+    )
+    monkeypatch.setenv("MEMORY_CONSOLIDATION_WINDOW_MIN", "0")
+    monkeypatch.setenv("MEMORY_CONSOLIDATION_MAX_ATTEMPTS", "3")
+
+    await scheduler.nightly_consolidation("2026-01-04")
+
+    assert finished == ["2026-01-04"]
+
+
+@pytest.mark.asyncio
+async def test_memory_llm_budget_caps_concurrent_calls_per_provider(monkeypatch):
+    import asyncio
+    import threading
+    import time
+
+    import memory.llm as memory_llm
+
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def fake_chat_once(messages, **kwargs):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+        return kwargs["capability"]
+
+    monkeypatch.setattr(memory_llm, "chat_once", fake_chat_once)
+    monkeypatch.setattr(memory_llm, "_BUDGETS", {})
+    monkeypatch.setenv("CAPABILITY_MEMORY_SUMMARY_PROVIDER", "gemini")
+    monkeypatch.setenv("MEMORY_LLM_MAX_CONCURRENT_GEMINI", "2")
+    monkeypatch.setenv("MEMORY_LLM_CALLS_PER_MINUTE", "0")
+
+    results = await asyncio.gather(
+        *(memory_llm.memory_chat_once([]) for _ in range(6))
+    )
+
+    assert results == ["memory_summary"] * 6
+    assert running["max"] == 2
+    assert memory_llm.budget_stats()["gemini"]["calls"] == 6
+
+
+def _patch_consolidation_io(monkeypatch, inserted, deleted):
+    async def noop(*_args, **_kwargs):
+        return None
+
+    async def enabled(chat_id):
+        return True
+
+    async def recent_total(chat_id):
+        return 10_000
+
+    async def fetch_recent(chat_id):
+        return [
+            {"role": "user", "content": f"message {pos}", "tokens": 400, "pos": pos}
+            for pos in range(1, 11)
+        ]
+
+    async def insert_long(chat_id, summary, importance, tokens, simhash=None):
+        inserted.append((summary, importance))
+
+    async def no_simhashes(chat_id, limit):
+        return []
+
+    async def no_duplicate(chat_id, fingerprint, max_distance):
+        return None
+
+    async def long_total(chat_id):
+        return 0
+
+    async def delete_upto(chat_id, pos):
+        deleted.append(pos)
+
+    async def core_text(self, chat_id):
+        return "chat.topic: memory"
+
+    monkeypatch.setattr(memory_manager_module, "upsert_chat", noop)
+    monkeypatch.setattr(memory_manager_module, "is_memory_persist_enabled", enabled)
+    monkeypatch.setattr(memory_manager_module, "recent_total_tokens", recent_total)
+    monkeypatch.setattr(memory_manager_module, "fetch_recent", fetch_recent)
+    monkeypatch.setattr(memory_manager_module, "insert_long_summary", insert_long)
+    monkeypatch.setattr(
+        memory_manager_module, "fetch_long_missing_simhashes", no_simhashes
+    )
+    monkeypatch.setattr(
+        memory_manager_module, "find_long_near_duplicate", no_duplicate
+    )
+    monkeypatch.setattr(memory_manager_module, "long_total_tokens", long_total)
+    monkeypatch.setattr(memory_manager_module, "delete_recent_upto_pos", delete_upto)
+    monkeypatch.setattr(
+        memory_manager_module.MemoryManager, "_core_context_text", core_text
+    )
+    monkeypatch.setenv("MEMORY_RECENT_BUDGET", "4000")
+
+
+@pytest.mark.asyncio
+async def test_ensure_budget_fused_consolidation_uses_single_call(monkeypatch):
+    inserted, deleted, saved = [], [], []
+    _patch_consolidation_io(monkeypatch, inserted, deleted)
+
+    async def fake_consolidate(messages, core_context):
+        assert core_context == "chat.topic: memory"
+        return {
+            "summary": "fused memory",
+            "importance": 0.8,
+            "tokens": 3,
+            "profile_facts": [{"key": "chat.mood", "value": "calm"}],
+        }
+
+    async def must_not_run(*_args, **_kwargs):
+        raise AssertionError("split path must not run in fused mode")
+
+    async def fake_save(self, chat_id, block_text, core_context, facts=None):
+        saved.append(facts)
+
+    monkeypatch.setattr(memory_manager_module, "consolidate_block", fake_consolidate)
+    monkeypatch.setattr(memory_manager_module, "summarize_block", must_not_run)
+    monkeypatch.setattr(memory_manager_module, "extract_profile_facts", must_not_run)
+    monkeypatch.setattr(
+        memory_manager_module.MemoryManager, "_save_profile_facts", fake_save
+    )
+    monkeypatch.delenv("MEMORY_CONSOLIDATION_MODE", raising=False)
+
+    await memory_manager_module.MemoryManager().ensure_budget(9001)
+
+    assert inserted == [("fused memory", 0.8)]
+    assert saved == [[{"key": "chat.mood", "value": "calm"}]]
+    assert deleted == [4]
+
+
+@pytest.mark.asyncio
+async def test_ensure_budget_falls_back_to_two_calls_on_bad_fused_reply(monkeypatch):
+    inserted, deleted, extracted = [], [], []
+    _patch_consolidation_io(monkeypatch, inserted, deleted)
+
+    async def failed_consolidate(messages, core_context):
+        return None
+
+    async def fake_summarize(messages):
+        return {"summary": "split memory", "importance": 0.5, "tokens": 2}
+
+    async def fake_extract(block_text, core_context):
+        extracted.append(block_text)
+        return []
+
+    monkeypatch.setattr(memory_manager_module, "consolidate_block", failed_consolidate)
+    monkeypatch.setattr(memory_manager_module, "summarize_block", fake_summarize)
+    monkeypatch.setattr(memory_manager_module, "extract_profile_facts", fake_extract)
+
+    await memory_manager_module.MemoryManager().ensure_budget(9002)
+
+    assert inserted == [("split memory", 0.5)]
+    assert len(extracted) == 1 and "user: message 1" in extracted[0]
+
+
+@pytest.mark.asyncio
+async def test_consolidate_block_parses_structured_reply(monkeypatch):
+    import json
+
+    import memory.summarizer as summarizer
+
+    class Resp:
+        def __init__(self, text):
+            message = type("Message", (), {"content": text})()
+            self.choices = [type("Choice", (), {"message": message})()]
+
+    replies = [
+        "```json\n"
+        + json.dumps(
+            {
+                "memory": "They planned the release.",
+                "quotes": ["ship it friday", "none"],
+                "terms": ["release"],
+                "importance": 1.7,
+                "profile_facts": [{"key": "chat.topic", "value": "releases"}],
+            }
+        )
+        + "\n```",
+        "MEMORY: plain sections instead of JSON",
+    ]
+
+    async def fake_chat(messages, **kwargs):
+        return Resp(replies.pop(0))
+
+    monkeypatch.setattr(summarizer, "memory_chat_once", fake_chat)
+    messages = [{"role": "user", "content": "let's ship it friday"}]
+
+    result = await summarizer.consolidate_block(messages, "")
+    assert result["summary"] == "They planned the release.\nQuotes: ship it friday"
+    assert result["importance"] == 1.0
+    assert result["profile_facts"] == [{"key": "chat.topic", "value": "releases"}]
+
+    assert await summarizer.consolidate_block(messages, "") is None
+
+
+@pytest.mark.asyncio
+async def test_cascade_reuses_cached_scores_and_compresses_concurrently(monkeypatch):
+    import asyncio
+    from datetime import datetime, timezone
+
+    from db.memory_repository import long_summary_hash
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    batch = [
+        {"id": 1, "summary": "kept forever", "tokens": 50, "importance_score": 8,
+         "importance_hash": long_summary_hash("kept forever"),
+         "importance_evaluated_at": now},
+        {"id": 2, "summary": "cached middle", "tokens": 50, "importance_score": 5,
+         "importance_hash": long_summary_hash("cached middle"),
+         "importance_evaluated_at": now},
+        {"id": 3, "summary": "stale text", "tokens": 50, "importance_score": 9,
+         "importance_hash": long_summary_hash("older text"),
+         "importance_evaluated_at": now},
+        {"id": 4, "summary": "brand new", "tokens": 50},
+    ]
+    fetches = []
+    evaluated = []
+    cached_scores = []
+    updated = []
+    deleted = []
+    running = {"now": 0, "max": 0}
+
+    async def fake_fetch_oldest(chat_id, token_limit, skip_kept_days=None):
+        fetches.append(skip_kept_days)
+        return [dict(row) for row in batch] if len(fetches) == 1 else []
+
+    async def fake_evaluate(entries, core_ctx):
+        evaluated.extend(e["id"] for e in entries)
+        return [
+            {"id": 3, "importance": 2, "compressed_text": None, "reason": "old"},
+            {"id": 4, "importance": 6, "compressed_text": None, "reason": "meh"},
+        ]
+
+    async def fake_scores(chat_id, rows):
+        cached_scores.extend(rows)
+
+    async def fake_compress(text, core_ctx):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        return "short"
+
+    async def fake_update(entry_id, summary, importance, tokens):
+        updated.append((entry_id, summary, importance))
+
+    async def fake_delete(ids, chat_id=None):
+        deleted.extend(ids)
+
+    async def core_text(self, chat_id):
+        return ""
+
+    monkeypatch.setattr(memory_manager_module, "fetch_long_oldest", fake_fetch_oldest)
+    monkeypatch.setattr(memory_manager_module, "evaluate_importance", fake_evaluate)
+    monkeypatch.setattr(
+        memory_manager_module, "update_long_importance_scores", fake_scores
+    )
+    monkeypatch.setattr(memory_manager_module, "compress_entry", fake_compress)
+    monkeypatch.setattr(memory_manager_module, "update_long_entry", fake_update)
+    monkeypatch.setattr(memory_manager_module, "delete_long_by_ids", fake_delete)
+    monkeypatch.setattr(
+        memory_manager_module.MemoryManager, "_core_context_text", core_text
+    )
+
+    await memory_manager_module.MemoryManager()._cascade_recompress(1, 120)
+
+    assert fetches[0] == 30
+    assert evaluated == [3, 4]
+    assert cached_scores == [
+        (3, 2, long_summary_hash("stale text")),
+        (4, 6, long_summary_hash("brand new")),
+    ]
+    assert deleted == [3]
+    assert sorted(entry_id for entry_id, _, _ in updated) == [2, 4]
+    assert running["max"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cascade_compresses_cached_mid_score_entry_once(monkeypatch):
+    from datetime import datetime, timezone
+
+    from db.memory_repository import long_summary_hash
+
+    memory_manager_module._COMPRESSED_TEXTS.clear()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    row = {"id": 7, "summary": "already tight", "tokens": 3, "importance_score": 5,
+           "importance_hash": long_summary_hash("already tight"),
+           "importance_evaluated_at": now}
+    compressed = []
+
+    async def fake_fetch_oldest(chat_id, token_limit, skip_kept_days=None):
+        return [dict(row)]
+
+    async def fake_compress(text, core_ctx):
+        compressed.append(text)
+        return "a compression that is no shorter than the entry"
+
+    async def noop(*_args, **_kwargs):
+        return None
+
+    async def core_text(self, chat_id):
+        return ""
+
+    monkeypatch.setattr(memory_manager_module, "fetch_long_oldest", fake_fetch_oldest)
+    monkeypatch.setattr(memory_manager_module, "compress_entry", fake_compress)
+    monkeypatch.setattr(memory_manager_module, "update_long_entry", noop)
+    monkeypatch.setattr(memory_manager_module, "delete_long_by_ids", noop)
+    monkeypatch.setattr(
+        memory_manager_module.MemoryManager, "_core_context_text", core_text
+    )
+
+    await memory_manager_module.MemoryManager()._cascade_recompress(1, 120)
+
+    assert compressed == ["already tight"]
+
+
+@pytest.mark.asyncio
+async def test_store_long_summary_merges_near_duplicates(monkeypatch):
+    from memory.similarity import hamming_distance, simhash
+
+    existing = "The user asked about Python asyncio timeouts and how to cancel tasks."
+    paraphrase = "User asked how to cancel tasks and handle timeouts in Python asyncio."
+    different = "The user asked about Python threading locks and how to avoid deadlocks."
+    stored = {7: None, 8: simhash("рецепт борщу і поради для городу")}
+    summaries = {7: existing}
+    inserted, merged, backfilled = [], [], []
+
+    async def fake_missing(chat_id, limit):
+        return [
+            {"id": entry_id, "summary": summaries[entry_id]}
+            for entry_id, value in stored.items()
+            if value is None
+        ][:limit]
+
+    async def fake_backfill(chat_id, rows):
+        backfilled.extend(rows)
+        stored.update(rows)
+
+    async def fake_find(chat_id, fingerprint, max_distance):
+        matches = [
+            {"id": entry_id, "distance": hamming_distance(fingerprint, value)}
+            for entry_id, value in stored.items()
+            if value is not None
+        ]
+        matches = [m for m in matches if m["distance"] <= max_distance]
+        return min(matches, key=lambda m: m["distance"]) if matches else None
+
+    async def fake_merge(chat_id, entry_id, importance):
+        merged.append((entry_id, importance))
+
+    async def fake_insert(chat_id, summary, importance, tokens, simhash=None):
+        inserted.append((summary, simhash))
+
+    monkeypatch.setattr(memory_manager_module, "fetch_long_missing_simhashes", fake_missing)
+    monkeypatch.setattr(memory_manager_module, "update_long_simhashes", fake_backfill)
+    monkeypatch.setattr(memory_manager_module, "find_long_near_duplicate", fake_find)
+    monkeypatch.setattr(memory_manager_module, "merge_long_duplicate", fake_merge)
+    monkeypatch.setattr(memory_manager_module, "insert_long_summary", fake_insert)
+    monkeypatch.setattr(
+        memory_manager_module, "_DEDUPE_STATS", {"inserted": 0, "merged": 0}
+    )
+    monkeypatch.delenv("MEMORY_LONG_DEDUPE_DISTANCE", raising=False)
+
+    manager = memory_manager_module.MemoryManager()
+    # a reworded paraphrase of entry 7 (word order and wording differ)
+    await manager._store_long_summary(
+        1, {"summary": paraphrase, "importance": 0.9, "tokens": 20}
+    )
+    # same topic, different facts: must stay a separate entry
+    await manager._store_long_summary(
+        1, {"summary": different, "importance": 0.4, "tokens": 8}
+    )
+
+    assert merged == [(7, 0.9)]
+    assert backfilled == [(7, simhash(existing))]
+    assert inserted == [(different, simhash(different))]
+    assert memory_manager_module.dedupe_stats()["merge_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_save_profile_facts_writes_accepted_facts_in_one_bulk_upsert(monkeypatch):
+    fetches, writes = [], []
+
+    async def fake_fetch_core_all(chat_id):
+        fetches.append(chat_id)
+        return [
+            {"fact_key": "chat.topic", "fact_value": "memory", "source": "explicit",
+             "confidence": 320, "tokens": 5},
+            {"fact_key": "chat.mood", "fact_value": "calm", "source": "inferred",
+             "confidence": 200, "tokens": 5},
+        ]
+
+    async def fake_upsert_core_facts(chat_id, facts):
+        writes.append([f["key"] for f in facts])
+
+    monkeypatch.setattr("memory.manager.fetch_core_all", fake_fetch_core_all)
+    monkeypatch.setattr("memory.manager.upsert_core_facts", fake_upsert_core_facts)
+    monkeypatch.setattr("memory.manager.count_tokens_text", lambda text, model: 4)
+    monkeypatch.setenv("MEMORY_CORE_BUDGET", "20")
+
+    facts = [
+        # weaker source than the stored explicit fact: kept as is
+        {"key": "chat.topic", "value": "cats", "source": "inferred", "confidence": 200},
+        # stronger source: replaced (4 tokens instead of 5)
+        {"key": "chat.mood", "value": "tense", "source": "explicit", "confidence": 320},
+        {"key": "chat.norms", "value": "no spam", "source": "llm_extracted",
+         "confidence": 230},
+        {"key": "chat.language", "value": "uk", "source": "llm_extracted",
+         "confidence": 230},
+        # 9 + 4 + 4 + 4 > 20: over budget
+        {"key": "chat.extra", "value": "x", "source": "llm_extracted", "confidence": 230},
+        {"key": "chat.empty", "value": "none", "source": "explicit", "confidence": 320},
+    ]
+
+    await memory_manager.__class__()._save_profile_facts(5, "", "", facts=facts)
+
+    assert fetches == [5]
+    assert writes == [["chat.mood", "chat.norms", "chat.language"]]
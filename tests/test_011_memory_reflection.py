@@ -0,0 +1,149 @@
+import random
+
+import pytest
+
+from memory import reflection
+from memory.similarity import (
+    decode_signature,
+    encode_signature,
+    estimated_jaccard,
+    minhash_signature,
+)
+
+
+def _entries(count, seed=3):
+    rng = random.Random(seed)
+    vocabulary = [f"тема{i:04d}" for i in range(3000)]
+    topics = [rng.sample(vocabulary, 20) for _ in range(count // 15)]
+    entries = []
+    for entry_id in range(count):
+        if rng.random() < 0.7:
+            words = rng.sample(rng.choice(topics), 12) + rng.sample(vocabulary, 3)
+        else:
+            words = rng.sample(vocabulary, 15)
+        entries.append({"id": entry_id, "summary": " ".join(words)})
+    return entries
+
+
+def _ids(groups):
+    return [[entry["id"] for entry in group] for group in groups]
+
+
+def test_minhash_signature_roundtrip_and_estimate():
+    left = {f"word{i}" for i in range(40)}
+    right = {f"word{i}" for i in range(20, 60)}  # Jaccard = 1/3
+    sig_left = minhash_signature(left)
+    sig_right = minhash_signature(right)
+
+    assert decode_signature(encode_signature(sig_left)) == sig_left
+    assert decode_signature(b"\x09" + encode_signature(sig_left)[1:]) is None
+    assert minhash_signature(set()) == ()
+    assert encode_signature(()) is None
+    assert abs(estimated_jaccard(sig_left, sig_right) - 1 / 3) < 0.15
+
+
+def test_lsh_grouping_matches_all_pairs_grouping(monkeypatch):
+    entries = _entries(400)
+    monkeypatch.setattr(reflection, "_LSH_MIN_ENTRIES", 10**9)
+    exact = reflection._group_by_keywords(entries)
+
+    for entry in entries[::2]:
+        keywords = reflection._extract_keywords(entry["summary"])
+        entry["minhash"] = encode_signature(minhash_signature(keywords))
+    monkeypatch.setattr(reflection, "_LSH_MIN_ENTRIES", 1)
+    approx = reflection._group_by_keywords(entries)
+
+    assert exact
+    assert _ids(approx) == _ids(exact)
+    assert all(len(group) >= reflection._MIN_GROUP_SIZE for group in approx)
+
+
+class _Resp:
+    def __init__(self, text):
+        message = type("Message", (), {"content": text})()
+        self.choices = [type("Choice", (), {"message": message})()]
+
+
+def _group_rows(count):
+    rows = []
+    for topic in range(count):
+        words = " ".join(f"topic{topic}word{i}" for i in range(8))
+        rows.extend(
+            {"id": topic * 10 + n, "summary": words, "importance": 0.9}
+            for n in range(3)
+        )
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_batched_reflection_uses_one_call_and_bulk_upsert(monkeypatch):
+    import json
+
+    calls = []
+    upserts = []
+
+    async def fake_chat(messages, **kwargs):
+        calls.append(messages)
+        beliefs = [
+            {"group": 1, "belief_key": "existing", "belief_value": "updated value"},
+            {"group": 2, "belief_key": "fits", "belief_value": "short"},
+            {"group": 3, "belief_key": "too_big", "belief_value": "word " * 60},
+        ]
+        return _Resp(json.dumps({"beliefs": beliefs}))
+
+    async def fake_fetch_long_all(chat_id):
+        return _group_rows(3)
+
+    async def fake_fetch_core_all(chat_id):
+        return [{"fact_key": "existing", "source": "explicit", "tokens": 45}]
+
+    async def fake_upsert(chat_id, facts):
+        upserts.append(facts)
+
+    monkeypatch.setattr(reflection, "memory_chat_once", fake_chat)
+    monkeypatch.setattr(reflection, "fetch_long_all", fake_fetch_long_all)
+    monkeypatch.setattr("memory.manager.fetch_core_all", fake_fetch_core_all)
+    monkeypatch.setattr("memory.manager.upsert_core_facts", fake_upsert)
+    monkeypatch.setenv("MEMORY_CORE_BUDGET", "50")
+    monkeypatch.delenv("MEMORY_REFLECTION_MODE", raising=False)
+
+    await reflection.reflect(1)
+
+    assert len(calls) == 1
+    assert "### Група 3" in calls[0][1]["content"]
+    assert len(upserts) == 1
+    assert [fact["key"] for fact in upserts[0]] == ["existing", "fits"]
+    assert all(fact["source"] == "inferred" for fact in upserts[0])
+
+
+@pytest.mark.asyncio
+async def test_batched_reflection_falls_back_to_per_group_calls(monkeypatch):
+    calls = []
+    upserts = []
+
+    async def fake_chat(messages, **kwargs):
+        calls.append(messages[0]["content"])
+        if len(calls) == 1:
+            return _Resp("not json at all")
+        return _Resp('{"belief_key": "k%d", "belief_value": "v"}' % len(calls))
+
+    async def fake_fetch_long_all(chat_id):
+        return _group_rows(2)
+
+    async def fake_fetch_core_all(chat_id):
+        return []
+
+    async def fake_upsert(chat_id, facts):
+        upserts.append(facts)
+
+    monkeypatch.setattr(reflection, "memory_chat_once", fake_chat)
+    monkeypatch.setattr(reflection, "fetch_long_all", fake_fetch_long_all)
+    monkeypatch.setattr("memory.manager.fetch_core_all", fake_fetch_core_all)
+    monkeypatch.setattr("memory.manager.upsert_core_facts", fake_upsert)
+
+    await reflection.reflect(1)
+
+    assert len(calls) == 3
+    assert calls[0] == reflection.REFLECTION_BATCH_SYSTEM_PROMPT
+    assert calls[1] == reflection.REFLECTION_SYSTEM_PROMPT
+    assert [fact["key"] for fact in upserts[0]] == ["k2", "k3"]
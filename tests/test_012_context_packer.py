@@ -0,0 +1,256 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import memory.manager as memory_manager_module
+from memory.budget_controller import LatencyBudgetController, is_busy_chat
+from memory.context_compactor import compact_service_blocks
+from memory.context_packer import PackItem, pack_context
+from memory.manager import MemoryManager
+
+
+def _recent(count, tokens=10):
+    return [
+        PackItem("recent", tokens, 0.97**age, f"turn-{age}", chain=age)
+        for age in range(count)
+    ]
+
+
+def test_pack_context_honours_minimums_before_ratio():
+    items = [
+        PackItem("long", 10, 0.9, "dense"),
+        PackItem("long", 40, 0.9, "wide"),
+        *_recent(10),
+    ]
+    packed = pack_context(items, 70, minimums={"long": 40, "recent": 20})
+
+    # "dense" alone does not meet the LONG minimum, so "wide" is taken too
+    assert [item.payload for item in packed.selected["long"]] == ["dense", "wide"]
+    assert packed.layer_tokens("recent") == 20
+    assert packed.tokens <= 70
+
+
+def test_pack_context_reserves_other_layers_minimums():
+    items = [
+        PackItem("long", 600, 1.0, "huge"),
+        PackItem("long", 300, 0.5, "memo"),
+        *_recent(20, tokens=50),
+    ]
+    packed = pack_context(items, 1000, minimums={"long": 500, "recent": 500})
+
+    # "huge" would overshoot the LONG minimum into the recent one
+    assert [item.payload for item in packed.selected["long"]] == ["memo"]
+    assert packed.layer_tokens("recent") >= 500
+    assert packed.tokens <= 1000
+
+
+def test_pack_context_truncates_newest_turn_that_does_not_fit():
+    items = [
+        PackItem("recent", 100, 1.0, "newest " * 50, chain=0),
+        PackItem("recent", 10, 0.97, "older", chain=1),
+        PackItem("core", 5, 1.0, "fact"),
+    ]
+
+    def truncate(item, limit):
+        return PackItem(item.layer, limit, item.value, "newest (cut)", chain=item.chain)
+
+    packed = pack_context(items, 40, maximums={"recent": 30}, truncate=truncate)
+
+    assert [item.payload for item in packed.selected["recent"]] == ["newest (cut)"]
+    assert [item.payload for item in packed.selected["core"]] == ["fact"]
+    assert packed.tokens == 35
+
+    # without a truncate hook an oversized newest turn still closes the chain
+    assert pack_context(items, 40).selected["recent"] == []
+
+
+def test_pack_context_keeps_recent_chain_contiguous():
+    items = [
+        PackItem("recent", 5, 1.0, "newest", chain=0),
+        PackItem("recent", 50, 0.97, "long turn", chain=1),
+        PackItem("recent", 5, 0.94, "oldest", chain=2),
+        PackItem("core", 5, 1.0, "fact"),
+    ]
+    packed = pack_context(items, 30)
+
+    # the oversized turn closes the chain; the older one must not skip it
+    assert [item.payload for item in packed.selected["recent"]] == ["newest"]
+    assert [item.payload for item in packed.selected["core"]] == ["fact"]
+    assert packed.dropped == 2
+
+
+def test_pack_context_respects_layer_caps():
+    items = [PackItem("long", 10, 1.0, f"memo-{i}") for i in range(5)]
+    packed = pack_context(items, 100, maximums={"long": 25})
+
+    assert len(packed.selected["long"]) == 2
+    assert packed.tokens == 20
+
+
+@pytest.mark.asyncio
+async def test_select_context_packs_all_layers_under_one_budget(monkeypatch):
+    monkeypatch.setenv("MEMORY_CONTEXT_BUDGET", "400")
+    monkeypatch.setenv("MEMORY_CONTEXT_MIN_CORE", "0")
+    monkeypatch.setenv("MEMORY_CONTEXT_MIN_LONG", "0")
+    monkeypatch.setenv("MEMORY_CONTEXT_MIN_RECENT", "50")
+
+    async def persist_enabled(_chat_id):
+        return True
+
+    async def noop(*_args, **_kwargs):
+        return None
+
+    async def fetch_core_all(_chat_id):
+        return [
+            {"fact_key": "name", "fact_value": "Oksana", "tokens": 4},
+            {"fact_key": "city", "fact_value": "Lviv", "tokens": 4},
+        ]
+
+    async def fetch_long_all(_chat_id):
+        return [
+            {"id": 1, "summary": "coffee preferences espresso", "tokens": 8, "importance": 0.9},
+            {"id": 2, "summary": "unrelated " * 200, "tokens": 400, "importance": 0.1},
+        ]
+
+    async def fetch_recent(_chat_id):
+        return [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " * 5}
+            for i in range(30)
+        ]
+
+    bumped = []
+
+    async def bump_long_usage(ids):
+        bumped.extend(ids)
+
+    monkeypatch.setattr(memory_manager_module, "is_memory_persist_enabled", persist_enabled)
+    monkeypatch.setattr(memory_manager_module, "upsert_chat", noop)
+    monkeypatch.setattr(memory_manager_module, "fetch_core_all", fetch_core_all)
+    monkeypatch.setattr(memory_manager_module, "fetch_long_all", fetch_long_all)
+    monkeypatch.setattr(memory_manager_module, "fetch_recent", fetch_recent)
+    monkeypatch.setattr(memory_manager_module, "bump_long_usage", bump_long_usage)
+
+    ctx = await MemoryManager().select_context(7, user_query="espresso coffee", system_prompt="SYS")
+
+    assert ctx[0] == {"role": "system", "content": "SYS"}
+    assert ctx[1]["content"] == "[CORE]\nname: Oksana\ncity: Lviv"
+    assert ctx[2]["content"] == "[LONG-MEMO] coffee preferences espresso"
+    assert bumped == [1]
+    recent = ctx[3:]
+    assert recent and recent[-1]["content"].startswith("message 29")
+    assert memory_manager_module._messages_tokens(ctx) <= 400
+
+
+def test_budget_controller_shrinks_and_recovers_within_bounds(monkeypatch):
+    monkeypatch.setenv("MEMORY_ADAPTIVE_MIN_SCALE", "0.5")
+    monkeypatch.setenv("MEMORY_ADAPTIVE_MAX_SCALE", "1.0")
+    controller = LatencyBudgetController()
+
+    assert controller.update(20000, 5, slo_ms=8000) == 1.0  # too few samples
+    assert controller.update(9000, 50, slo_ms=8000) == pytest.approx(0.889, abs=1e-3)
+    for _ in range(10):
+        controller.update(30000, 50, slo_ms=8000)
+    assert controller.scale == 0.5
+    controller.update(7000, 50, slo_ms=8000)  # inside the dead band
+    assert controller.scale == 0.5
+    for _ in range(10):
+        controller.update(1000, 50, slo_ms=8000)
+    assert controller.scale == 1.0
+
+
+def test_budget_controller_falls_back_to_all_models_after_a_switch(tmp_path, monkeypatch):
+    import json
+
+    import memory.budget_controller as budget_controller
+
+    log_path = tmp_path / "token_usage.jsonl"
+    log_path.write_text(
+        "".join(
+            json.dumps(
+                {
+                    "capability": "chat_final",
+                    "model": "old-model" if n < 40 else "new-model",
+                    "status": "success",
+                    "latency_ms": 1000 + n,
+                }
+            )
+            + "\n"
+            for n in range(45)
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("TOKEN_USAGE_LOG_PATH", str(log_path))
+    monkeypatch.setattr(budget_controller, "capability_model", lambda _cap: "new-model")
+
+    p95_ms, samples = LatencyBudgetController()._measure()
+
+    # five samples of the new model are too few; all 45 are used instead
+    assert samples == 45
+    assert p95_ms == 1042
+
+
+def test_busy_chat_detection_counts_recent_user_turns(monkeypatch):
+    monkeypatch.setenv("MEMORY_BUSY_CHAT_TURNS", "3")
+    now = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    rows = [
+        {"role": "user", "created_at": datetime(2026, 1, 1, 11, 58)},
+        {"role": "assistant", "created_at": datetime(2026, 1, 1, 11, 58)},
+        {"role": "user", "created_at": datetime(2026, 1, 1, 11, 59)},
+        {"role": "user", "created_at": datetime(2026, 1, 1, 11, 30)},
+    ]
+    assert not is_busy_chat(rows, now=now)
+    rows.append({"role": "user", "created_at": datetime(2026, 1, 1, 11, 59, 30)})
+    assert is_busy_chat(rows, now=now)
+
+
+def _search_block(request, summary):
+    return (
+        "[SEARCH]\n"
+        f"request: {request}\n"
+        "queries:\n- q\n"
+        "status: ok\n"
+        f"answer_summary: {summary}\n"
+        "top_results:\n- Title — example.com\n  snippet text"
+    )
+
+
+def test_compact_service_blocks_collapses_superseded_and_old_blocks(monkeypatch):
+    monkeypatch.setenv("MEMORY_COMPACT_KEEP_TURNS", "2")
+    monkeypatch.setenv("MEMORY_COMPACT_FIELD_CHARS", "20")
+    media = "[MEDIA] target_media_type: photo\nmedia_analysis: " + "red car " * 150
+    messages = [
+        {"role": "user", "content": "find weather"},
+        {"role": "system", "content": _search_block("Weather Kyiv", "old " * 40)},
+        {"role": "assistant", "content": "It was sunny."},
+        {"role": "user", "content": "what is on the photo"},
+        {"role": "system", "content": media},
+        {"role": "assistant", "content": "A red car."},
+        {"role": "user", "content": "and the weather now?"},
+        {"role": "system", "content": _search_block("weather  kyiv", "rain " * 40)},
+    ]
+
+    compacted, rewritten = compact_service_blocks(messages)
+
+    assert rewritten == 2
+    assert compacted[1]["content"] == "[SEARCH]\nrequest: Weather Kyiv\nstatus: superseded"
+    media_lines = compacted[4]["content"].split("\n")
+    assert media_lines[0] == "[MEDIA] target_media_type: photo"
+    # answered one turn ago: capped at MEMORY_COMPACT_ANSWERED_CHARS
+    assert len(media_lines[1]) == len("media_analysis: ") + 800
+    # the current, still unanswered search stays verbatim
+    assert compacted[7] == messages[7]
+    assert messages[1]["content"].startswith("[SEARCH]\nrequest: Weather Kyiv\nqueries")
+
+
+def test_compact_service_blocks_drops_answered_search_summary():
+    messages = [
+        {"role": "user", "content": "news?"},
+        {"role": "system", "content": _search_block("news", "long summary")},
+        {"role": "assistant", "content": "Here is the news."},
+    ]
+
+    compacted, rewritten = compact_service_blocks(messages)
+
+    assert rewritten == 1
+    assert "answer_summary" not in compacted[1]["content"]
+    assert "snippet text" in compacted[1]["content"]
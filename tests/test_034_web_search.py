@@ -151,7 +151,7 @@ async def test_search_web_auto_uses_first_available_provider(monkeypatch):
 
     calls = []
 
-    def fake_search_with_provider(
+    async def fake_search_with_provider(
         provider,
         query,
         limit,
@@ -194,14 +194,14 @@ async def test_search_web_auto_uses_first_available_provider(monkeypatch):
             ]
         return []
 
-    async def fake_get_search_cache(*_args, **_kwargs):
+    async def fake_get_search_cache_entry(*_args, **_kwargs):
         return None
 
     async def fake_put_search_cache(*_args, **_kwargs):
         return None
 
     monkeypatch.setattr(module, "_search_with_provider", fake_search_with_provider)
-    monkeypatch.setattr(module, "get_search_cache", fake_get_search_cache)
+    monkeypatch.setattr(module, "get_search_cache_entry", fake_get_search_cache_entry)
     monkeypatch.setattr(module, "put_search_cache", fake_put_search_cache)
 
     items = await module.search_web(
@@ -265,6 +265,80 @@ def test_provider_order_prefers_provider_hint(monkeypatch):
     ]
 
 
+def test_provider_order_adapts_to_scoreboard_and_persists(monkeypatch):
+    from agent.tools import provider_scoreboard
+
+    monkeypatch.setenv("SEARCH_PROVIDER", "auto")
+    monkeypatch.setenv("SEARCH_PROFILE_NEWS_ORDER", "brave_search,serper,tavily,bing_html")
+    board = provider_scoreboard.get_provider_scoreboard()
+    for _ in range(5):
+        board.record("brave_search", "news", ok=True, results=1, acceptable=False, latency_ms=900)
+        board.record("serper", "news", ok=True, results=5, acceptable=True, latency_ms=400)
+        board.record("bing_html", "news", ok=True, results=5, acceptable=True, latency_ms=300)
+    board.record("tavily", "news", ok=True, results=5, acceptable=True, latency_ms=10)
+
+    # tavily has too few calls and keeps its slot; the rest sort by expected time
+    assert web_search._provider_order("news", "news") == [
+        "bing_html",
+        "serper",
+        "tavily",
+        "brave_search",
+    ]
+    assert web_search._provider_order("news", "news", provider_hint="brave")[0] == "brave_search"
+    monkeypatch.setenv("SEARCH_ADAPTIVE_ORDER", "0")
+    assert web_search._provider_order("news", "news")[0] == "brave_search"
+
+    board.save()
+    reloaded = provider_scoreboard.ProviderScoreboard()
+    assert reloaded.stats("serper", "news").calls == 5
+    assert reloaded.stats("serper", "news").percentile(95) == 400
+
+
+def test_demoted_provider_regains_its_slot_when_stats_go_stale(monkeypatch):
+    from agent.tools import provider_scoreboard
+
+    monkeypatch.setenv("SEARCH_PROVIDER", "auto")
+    monkeypatch.setenv("SEARCH_PROFILE_NEWS_ORDER", "brave_search,serper")
+    monkeypatch.setenv("SEARCH_SCOREBOARD_MAX_AGE_MIN", "60")
+    board = provider_scoreboard.get_provider_scoreboard()
+    for _ in range(5):
+        board.record("brave_search", "news", ok=False, results=0, acceptable=False, latency_ms=900)
+        board.record("serper", "news", ok=True, results=5, acceptable=True, latency_ms=400)
+    assert web_search._provider_order("news", "news") == ["serper", "brave_search"]
+
+    # Demoted, brave is never called again; its stats age out instead.
+    board.stats("brave_search", "news").updated_at -= 2 * 3600
+    assert web_search._provider_order("news", "news") == ["brave_search", "serper"]
+
+    board.record("brave_search", "news", ok=True, results=5, acceptable=True, latency_ms=300)
+    brave = board.stats("brave_search", "news")
+    assert (brave.calls, brave.accept_rate, brave.latencies_ms) == (1, 1.0, [300])
+    assert web_search._provider_order("news", "news") == ["brave_search", "serper"]
+
+
+@pytest.mark.asyncio
+async def test_scoreboard_writes_stats_off_the_event_loop(monkeypatch):
+    import threading
+
+    from agent.tools import provider_scoreboard
+
+    monkeypatch.setenv("SEARCH_SCOREBOARD_SAVE_SEC", "0")
+    board = provider_scoreboard.get_provider_scoreboard()
+    writers = []
+    write = board._write
+
+    def spy_write(payload):
+        writers.append(threading.get_ident())
+        write(payload)
+
+    monkeypatch.setattr(board, "_write", spy_write)
+    board.record("serper", "news", ok=True, results=5, acceptable=True, latency_ms=400)
+    await board._save_task
+
+    assert writers and writers[0] != threading.get_ident()
+    assert provider_scoreboard.ProviderScoreboard().stats("serper", "news").calls == 1
+
+
 @pytest.mark.asyncio
 async def test_search_web_skips_unavailable_providers_and_continues(monkeypatch):
     module = importlib.reload(web_search)
@@ -278,7 +352,7 @@ async def test_search_web_skips_unavailable_providers_and_continues(monkeypatch)
 
     calls = []
 
-    def fake_search_with_provider(
+    async def fake_search_with_provider(
         provider,
         query,
         limit,
@@ -306,14 +380,14 @@ async def test_search_web_skips_unavailable_providers_and_continues(monkeypatch)
             ),
         ]
 
-    async def fake_get_search_cache(*_args, **_kwargs):
+    async def fake_get_search_cache_entry(*_args, **_kwargs):
         return None
 
     async def fake_put_search_cache(*_args, **_kwargs):
         return None
 
     monkeypatch.setattr(module, "_search_with_provider", fake_search_with_provider)
-    monkeypatch.setattr(module, "get_search_cache", fake_get_search_cache)
+    monkeypatch.setattr(module, "get_search_cache_entry", fake_get_search_cache_entry)
     monkeypatch.setattr(module, "put_search_cache", fake_put_search_cache)
 
     items = await module.search_web(
@@ -328,6 +402,158 @@ async def test_search_web_skips_unavailable_providers_and_continues(monkeypatch)
     assert len(items) == 2
 
 
+@pytest.mark.asyncio
+async def test_attempt_provider_serves_stale_entries_and_caches_failures(monkeypatch):
+    import asyncio
+    import datetime as dt
+
+    from db import search_repository
+
+    module = importlib.reload(web_search)
+    search_repository.reset_cache_tiers()
+    monkeypatch.setenv("SEARCH_PROFILE_NEWS_CACHE_TTL_MIN", "10")
+    calls = []
+
+    async def fake_search_with_provider(provider, *_args):
+        calls.append(provider)
+        if provider == "tavily":
+            raise RuntimeError("quota exceeded")
+        return [_result("Fresh", "https://example.com/fresh", "Moon landing news", provider)]
+
+    async def fake_fetchone(*_args, **_kwargs):
+        return None
+
+    async def fake_execute(*_args, **_kwargs):
+        return 1
+
+    monkeypatch.setattr(module, "_search_with_provider", fake_search_with_provider)
+    monkeypatch.setattr(search_repository, "fetchone", fake_fetchone)
+    monkeypatch.setattr(search_repository, "execute", fake_execute)
+    kwargs = dict(
+        mode="news",
+        profile="news",
+        preferred_domains=(),
+        preferred_domains_deny=(),
+        country=None,
+        languages=(),
+        provider_hint=None,
+    )
+    cache_query = module._search_cache_query("moon landing", "news", "news", None, (), (), None, ())
+    search_repository._SEARCH_LRU.put(
+        f"serper:v4|{search_repository._h(cache_query.lower())}",
+        [_result("Old", "https://example.com/old", "Moon landing", "serper").to_dict()],
+        dt.datetime.now(dt.timezone.utc) - dt.timedelta(minutes=15),
+    )
+
+    stale = await module._attempt_provider("serper", "moon landing", 5, None, **kwargs)
+    assert [item.title for item in stale] == ["Old"]
+    await asyncio.gather(*module._CACHE_REFRESHES.values())
+    refreshed = await module._attempt_provider("serper", "moon landing", 5, None, **kwargs)
+    assert [item.title for item in refreshed] == ["Fresh"]
+    assert calls == ["serper"]
+
+    assert await module._attempt_provider("tavily", "moon landing", 5, None, **kwargs) is None
+    assert await module._attempt_provider("tavily", "moon landing", 5, None, **kwargs) == []
+    assert calls == ["serper", "tavily"]
+    stats = search_repository.cache_stats()["search"]
+    assert stats["stale_hits"] == 1
+    assert stats["negative_hits"] == 1
+
+
+def test_query_signature_matches_paraphrases_but_not_other_numbers():
+    from agent.tools.query_similarity import query_signature, signature_similarity
+
+    base = query_signature("погода київ завтра")
+    paraphrase = query_signature("прогноз погоди Київ на завтра")
+
+    assert base == {"погод", "київ", "завтр"}
+    assert signature_similarity(base, paraphrase) == 0.75
+    assert signature_similarity(base, query_signature("погода Львів завтра")) == 0.5
+    assert (
+        signature_similarity(
+            query_signature("iphone 15 release date price reviews"),
+            query_signature("iphone 16 release date price reviews"),
+        )
+        == 0.0
+    )
+
+
+@pytest.mark.asyncio
+async def test_attempt_provider_reuses_cached_paraphrase_in_same_scope(monkeypatch, caplog):
+    import logging
+
+    from db import search_repository
+
+    module = importlib.reload(web_search)
+    search_repository.reset_cache_tiers()
+    calls = []
+
+    async def fake_search_with_provider(provider, query, *_args):
+        calls.append(query)
+        if "курс" in query:
+            return [_result("Курс долара НБУ", "https://bank.gov.ua/usd", "Офіційний курс долара", provider)]
+        return [_result("Погода", "https://sinoptik.ua/kyiv", "Прогноз погоди Київ завтра", provider)]
+
+    async def fake_fetchone(*_args, **_kwargs):
+        return None
+
+    async def fake_execute(*_args, **_kwargs):
+        return 1
+
+    monkeypatch.setattr(module, "_search_with_provider", fake_search_with_provider)
+    monkeypatch.setattr(search_repository, "fetchone", fake_fetchone)
+    monkeypatch.setattr(search_repository, "execute", fake_execute)
+
+    async def attempt(query, recency_days=None):
+        return await module._attempt_provider(
+            "serper",
+            query,
+            5,
+            recency_days,
+            mode="general",
+            profile="general",
+            preferred_domains=(),
+            preferred_domains_deny=(),
+            country=None,
+            languages=(),
+            provider_hint=None,
+        )
+
+    await attempt("погода київ завтра")
+    with caplog.at_level(logging.INFO, logger="smartest.search.cost"):
+        reused = await attempt("прогноз погоди Київ на завтра")
+    await attempt("прогноз погоди Київ на завтра", recency_days=1)
+    await attempt("погода Львів завтра")
+
+    assert [item.url for item in reused] == ["https://sinoptik.ua/kyiv"]
+    assert "source=similar similarity=0.75" in caplog.text
+    assert calls == [
+        "погода київ завтра",
+        "прогноз погоди Київ на завтра",
+        "погода Львів завтра",
+    ]
+
+    # One extra term scores 0.75 too, but the cached results say nothing of it.
+    await attempt("курс долара нбу")
+    await attempt("курс долара нбу євро")
+    assert calls[-2:] == ["курс долара нбу", "курс долара нбу євро"]
+
+    monkeypatch.setenv("SEARCH_SIMILAR_CACHE", "0")
+    await attempt("прогноз погоди на завтра Київ")
+    assert len(calls) == 6
+
+
+def test_cache_ttl_follows_profile(monkeypatch):
+    monkeypatch.delenv("SEARCH_PROFILE_DOCS_CACHE_TTL_MIN", raising=False)
+    monkeypatch.setenv("SEARCH_CACHE_STALE_FACTOR", "0.5")
+
+    assert web_search._cache_ttl_min("news") == 15
+    assert web_search._cache_ttl_min("docs") == 3 * 24 * 60
+    assert web_search._cache_ttl_min("general") == web_search.TTL_MIN
+    assert web_search._cache_stale_min(60) == 30
+    assert web_search.search_cache_retention_min() == 7 * 24 * 60 * 3 // 2
+
+
 def test_gemini_grounding_items_extracts_web_chunks():
     payload = {
         "candidates": [
@@ -396,3 +622,189 @@ def test_openai_output_text_collects_message_parts():
     }
 
     assert web_search._openai_output_text(payload) == "Line one.\nLine two."
+
+
+@pytest.mark.asyncio
+async def test_provider_calls_share_pooled_async_client(monkeypatch):
+    import asyncio
+    import time
+
+    import httpx
+
+    from agent.tools import http_client
+
+    monkeypatch.setenv("PROVIDER_BRAVE_API_KEY", "brave-key")
+    created = []
+
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        assert request.headers["X-Subscription-Token"] == "brave-key"
+        return httpx.Response(
+            200,
+            json={
+                "web": {
+                    "results": [
+                        {
+                            "title": "NASA Apollo 11",
+                            "url": "https://www.nasa.gov/mission/apollo-11/",
+                            "description": "NASA archive about the Apollo 11 Moon landing.",
+                        }
+                    ]
+                }
+            },
+        )
+
+    def new_client():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(http_client, "_new_client", new_client)
+
+    started = time.perf_counter()
+    first, second = await asyncio.gather(
+        web_search._search_brave("Apollo 11 NASA", 5, None),
+        web_search._search_brave("Apollo 11 Moon landing", 5, None),
+    )
+    elapsed = time.perf_counter() - started
+    await http_client.close_http_clients()
+
+    assert first[0].domain == "nasa.gov"
+    assert second[0].source_provider == "brave_search"
+    assert len(created) == 1
+    assert elapsed < 0.35  # both requests were in flight together
+
+
+@pytest.mark.asyncio
+async def test_fetch_page_download_skips_non_html_and_caps_bytes(monkeypatch):
+    import httpx
+
+    import agent.tools.fetch_page as fetch_page_module
+    from agent.tools import http_client
+
+    streamed = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/report.pdf":
+            return httpx.Response(
+                200, headers={"Content-Type": "application/pdf"}, content=b"%PDF" * 1000
+            )
+        if request.url.path == "/huge":
+            return httpx.Response(
+                200,
+                headers={"Content-Type": "text/html", "Content-Length": "99999999"},
+                content=b"<p>x</p>",
+            )
+
+        async def body():
+            for _ in range(50):
+                streamed.append(1)
+                yield b"<p>" + b"a" * 1000 + b"</p>"
+
+        return httpx.Response(
+            200, headers={"Content-Type": "text/html; charset=utf-8"}, content=body()
+        )
+
+    monkeypatch.setattr(
+        http_client,
+        "_new_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    monkeypatch.setattr(fetch_page_module, "MAX_BYTES", 4096)
+
+    assert await fetch_page_module._download("https://docs.test/report.pdf") is None
+    assert await fetch_page_module._download("https://docs.test/huge") is None
+    body, media_type = await fetch_page_module._download("https://docs.test/page")
+    await http_client.close_http_clients()
+
+    assert media_type == "text/html"
+    assert len(body) == 4096
+    assert len(streamed) < 50  # reading stopped at the byte budget
+
+
+def test_extract_page_text_keeps_article_and_drops_boilerplate():
+    from agent.tools.page_text import extract_page_text
+
+    sentence = "The Apollo 11 crew landed the lunar module on the Sea of Tranquility. "
+    html = (
+        "<html><head><title>Doc</title><style>p{color:red}</style></head><body>"
+        "<header><a href='/'>Home</a> <a href='/news'>News</a></header>"
+        "<nav><ul><li><a href='/a'>Science</a></li><li><a href='/b'>Space</a></li></ul></nav>"
+        "<div class='cookie-banner'><p>We use cookies to improve your experience on this site, "
+        "please accept them all.</p></div>"
+        "<article><h1>Apollo 11</h1><script>var x = '<p>no</p>';</script>"
+        f"<p>{sentence * 3}</p><p>Share this <a href='/tw'>Twitter</a> <a href='/fb'>Facebook</a></p>"
+        f"<h2>Return</h2><p>{sentence * 2}<br>The crew &amp; the capsule were recovered.</p>"
+        "<h2>Gallery</h2></article>"
+        "<footer><p>Copyright 2026 Example Media, all rights reserved worldwide.</p></footer>"
+        "</body></html>"
+    )
+
+    page = extract_page_text(html, 20000)
+
+    lines = page.text.split("\n")
+    assert lines[0] == "## Apollo 11"
+    assert lines[1].startswith("The Apollo 11 crew landed")
+    assert lines[2] == "## Return"
+    assert lines[3].endswith("The crew & the capsule were recovered.")
+    assert len(lines) == 4  # trailing heading without text is dropped
+    for noise in ("Home", "Science", "cookies", "Twitter", "Copyright", "var x", "color"):
+        assert noise not in page.text
+    assert 0.5 < page.kept_ratio < 1.0
+    assert extract_page_text(html, 30).text == "## Apollo 11\nThe Apollo 11 cre"
+
+
+def test_extract_page_text_falls_back_to_full_text_for_link_pages():
+    from agent.tools.page_text import extract_page_text
+
+    html = "<ul>" + "".join(f"<li><a href='/{i}'>Item {i}</a></li>" for i in range(5)) + "</ul>"
+
+    page = extract_page_text(html, 20000)
+
+    assert page.text.split("\n") == [f"Item {i}" for i in range(5)]
+    assert page.kept_ratio == 1.0
+
+
+def test_extract_page_text_lxml_stops_feeding_at_the_limit(monkeypatch):
+    import types
+
+    from agent.tools import page_text
+
+    lxml_etree = pytest.importorskip("lxml.etree")
+    html = (
+        "<html><body><article>"
+        + "".join(f"<p>Paragraph {i} " + "word " * 30 + "</p>" for i in range(5000))
+        + "</article></body></html>"
+    )
+    fed = []
+
+    class CountingParser:
+        def __init__(self, **kwargs):
+            self._parser = lxml_etree.HTMLParser(**kwargs)
+
+        def feed(self, data):
+            fed.append(len(data))
+            self._parser.feed(data)
+
+        def close(self):
+            return self._parser.close()
+
+    monkeypatch.setattr(page_text, "lxml_etree", types.SimpleNamespace(HTMLParser=CountingParser))
+    with_lxml = page_text.extract_page_text(html, 2000)
+    monkeypatch.setattr(page_text, "lxml_etree", None)
+    with_stdlib = page_text.extract_page_text(html, 2000)
+
+    assert sum(fed) < len(html) // 10
+    assert with_lxml == with_stdlib
+    assert with_lxml.text.startswith("Paragraph 0 word")
+
+
+def test_query_matcher_parses_once_and_scans_aliases():
+    matcher = web_search._query_matcher("Latest news Kyiv metro 2026-05-05 the schedule")
+
+    assert matcher.terms == ("news", "kyiv", "metro", "2026-05-05", "schedule")
+    assert matcher.required == ("kyiv", "metro", "schedule")
+    assert matcher.minimum_required == 3
+    assert web_search._query_matcher(matcher) is matcher
+    assert matcher.scan("нічний графік метро у києві: schedule") == (2, 2)
+    assert matcher.scan("kiev metro schedule news") == (4, 3)
@@ -7,6 +7,7 @@ import pytest
 
 import agent.tools.web_search as web_search
 from agent.search_task import NormalizedResult
+from agent.tools.provider_scoreboard import get_provider_scoreboard
 
 
 def _result(
@@ -36,7 +37,7 @@ async def test_search_web_profile_order_respects_profile(monkeypatch):
 
     calls = []
 
-    def fake_search_with_provider(
+    async def fake_search_with_provider(
         provider,
         query,
         limit,
@@ -58,14 +59,14 @@ async def test_search_web_profile_order_respects_profile(monkeypatch):
             )
         ]
 
-    async def fake_get_search_cache(*_args, **_kwargs):
+    async def fake_get_search_cache_entry(*_args, **_kwargs):
         return None
 
     async def fake_put_search_cache(*_args, **_kwargs):
         return None
 
     monkeypatch.setattr(module, "_search_with_provider", fake_search_with_provider)
-    monkeypatch.setattr(module, "get_search_cache", fake_get_search_cache)
+    monkeypatch.setattr(module, "get_search_cache_entry", fake_get_search_cache_entry)
     monkeypatch.setattr(module, "put_search_cache", fake_put_search_cache)
 
     items = await module.search_web(
@@ -149,7 +150,7 @@ async def test_search_web_logs_provider_call_latency(monkeypatch, caplog):
     monkeypatch.setenv("SEARCH_PROFILE_GENERAL_ORDER", "serper")
     monkeypatch.setenv("PROVIDER_SERPER_API_KEY", "serper-key")
 
-    def fake_search_with_provider(
+    async def fake_search_with_provider(
         provider,
         query,
         limit,
@@ -163,14 +164,14 @@ async def test_search_web_logs_provider_call_latency(monkeypatch, caplog):
     ):
         return [_result("Result", "https://example.com/a", "Snippet", provider)]
 
-    async def fake_get_search_cache(*_args, **_kwargs):
+    async def fake_get_search_cache_entry(*_args, **_kwargs):
         return None
 
     async def fake_put_search_cache(*_args, **_kwargs):
         return None
 
     monkeypatch.setattr(module, "_search_with_provider", fake_search_with_provider)
-    monkeypatch.setattr(module, "get_search_cache", fake_get_search_cache)
+    monkeypatch.setattr(module, "get_search_cache_entry", fake_get_search_cache_entry)
     monkeypatch.setattr(module, "put_search_cache", fake_put_search_cache)
 
     with caplog.at_level(logging.INFO, logger="smartest.search.cost"):
@@ -185,3 +186,241 @@ async def test_search_web_logs_provider_call_latency(monkeypatch, caplog):
         and "latency_ms=" in record.message
         for record in caplog.records
     )
+
+
+@pytest.mark.asyncio
+async def test_search_web_race_takes_first_acceptable_provider(monkeypatch):
+    import asyncio
+
+    module = importlib.reload(web_search)
+    monkeypatch.setenv("SEARCH_PROVIDER", "auto")
+    monkeypatch.setenv("SEARCH_PROVIDER_RACE", "1")
+    monkeypatch.setenv("SEARCH_PROVIDER_RACE_STAGGER_MS", "0")
+    monkeypatch.setenv("SEARCH_PROFILE_GENERAL_ORDER", "tavily,serper")
+    monkeypatch.setenv("PROVIDER_TAVILY_API_KEY", "tavily-key")
+    monkeypatch.setenv("PROVIDER_SERPER_API_KEY", "serper-key")
+
+    cancelled = []
+    cached = []
+
+    async def fake_search_with_provider(provider, query, *_args):
+        try:
+            await asyncio.sleep(1.0 if provider == "tavily" else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(provider)
+            raise
+        return [
+            _result("NASA Apollo", "https://www.nasa.gov/apollo", "Apollo 11 Moon landing", provider),
+            _result("Apollo 11", "https://en.wikipedia.org/wiki/Apollo_11", "Apollo 11 Moon landing", provider),
+        ]
+
+    async def fake_get_search_cache_entry(*_args, **_kwargs):
+        return None
+
+    async def fake_put_search_cache(provider, *_args, **_kwargs):
+        cached.append(provider)
+
+    monkeypatch.setattr(module, "_search_with_provider", fake_search_with_provider)
+    monkeypatch.setattr(module, "get_search_cache_entry", fake_get_search_cache_entry)
+    monkeypatch.setattr(module, "put_search_cache", fake_put_search_cache)
+
+    items = await module.search_web("Apollo 11 Moon landing", 5, None)
+    await asyncio.sleep(0)
+
+    assert [item.source_provider for item in items] == ["serper", "serper"]
+    assert cancelled == ["tavily"]
+    assert cached == ["serper:v4"]
+    # the cancelled loser still counts: a censored, unacceptable sample
+    loser = get_provider_scoreboard().stats("tavily", "general")
+    assert (loser.calls, loser.accept_rate) == (1, 0.0)
+    assert loser.latencies_ms[0] >= 5
+
+
+@pytest.mark.asyncio
+async def test_search_web_race_checks_primary_cache_and_starts_fallback_lazily(monkeypatch):
+    import asyncio
+    import datetime as dt
+    import gc
+    import warnings
+
+    from db.search_repository import SearchCacheEntry
+
+    module = importlib.reload(web_search)
+    monkeypatch.setenv("SEARCH_PROVIDER", "auto")
+    monkeypatch.setenv("SEARCH_PROVIDER_RACE", "1")
+    monkeypatch.setenv("SEARCH_PROVIDER_RACE_STAGGER_MS", "0")
+    monkeypatch.setenv("SEARCH_PROFILE_GENERAL_ORDER", "tavily,serper")
+    monkeypatch.setenv("PROVIDER_TAVILY_API_KEY", "tavily-key")
+    monkeypatch.setenv("PROVIDER_SERPER_API_KEY", "serper-key")
+    live_calls = []
+    results = [
+        _result("NASA Apollo", "https://www.nasa.gov/apollo", "Apollo 11 Moon landing", "tavily"),
+        _result("Apollo 11", "https://en.wikipedia.org/wiki/Apollo_11", "Apollo 11 Moon landing", "tavily"),
+    ]
+
+    async def fake_search_with_provider(provider, query, *_args):
+        live_calls.append(provider)
+        return results
+
+    async def fake_get_search_cache_entry(provider, *_args, **_kwargs):
+        if provider == "tavily:v4" and not live_calls:
+            return SearchCacheEntry(
+                [item.to_dict() for item in results], dt.datetime.now(dt.timezone.utc)
+            )
+        return None
+
+    async def fake_put_search_cache(*_args, **_kwargs):
+        return None
+
+    monkeypatch.setattr(module, "_search_with_provider", fake_search_with_provider)
+    monkeypatch.setattr(module, "get_search_cache_entry", fake_get_search_cache_entry)
+    monkeypatch.setattr(module, "put_search_cache", fake_put_search_cache)
+
+    items = await module.search_web("Apollo 11 Moon landing", 5, None)
+    assert [item.source_provider for item in items] == ["tavily", "tavily"]
+    assert live_calls == []
+
+    # The primary answers live inside the stagger window; the cancelled
+    # fallback must not leave an attempt coroutine that was never awaited.
+    monkeypatch.setenv("SEARCH_PROVIDER_RACE_STAGGER_MS", "300")
+    monkeypatch.setattr(
+        module, "get_search_cache_entry", lambda *_args, **_kwargs: _none()
+    )
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        items = await module.search_web("Apollo 11 Moon landing", 5, None)
+        for _ in range(3):
+            await asyncio.sleep(0)
+        gc.collect()
+
+    assert live_calls == ["tavily"]
+    assert len(items) == 2
+    assert not [w for w in caught if "never awaited" in str(w.message)]
+
+
+async def _none():
+    return None
+
+
+@pytest.mark.asyncio
+async def test_extract_search_pages_fetches_concurrently_until_deadline(monkeypatch):
+    import asyncio
+    import time
+
+    module = importlib.reload(web_search)
+    monkeypatch.delenv("PROVIDER_TAVILY_API_KEY", raising=False)
+    monkeypatch.setenv("SEARCH_EXTRACT_DEADLINE_SEC", "0.5")
+    monkeypatch.setenv("SEARCH_FETCH_PER_HOST", "1")
+    in_flight = {"slow.example": 0}
+    cancelled = []
+
+    async def fake_fetch_page(url):
+        if "slow.example" in url:
+            in_flight["slow.example"] += 1
+            assert in_flight["slow.example"] == 1  # per-host cap
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+            finally:
+                in_flight["slow.example"] -= 1
+        if "broken" in url:
+            raise RuntimeError("boom")
+        await asyncio.sleep(0.05)
+        return f"Fetched {url}"
+
+    monkeypatch.setattr("agent.tools.fetch_page.fetch_page", fake_fetch_page)
+
+    started = time.perf_counter()
+    pages = await module.extract_search_pages(
+        "Moon landing",
+        [
+            _result("Slow 1", "https://slow.example/1", "Moon landing", "brave_search"),
+            _result("Slow 2", "https://slow.example/2", "Moon landing", "brave_search"),
+            _result("Broken", "https://broken.example/", "Moon landing", "brave_search"),
+            _result("Fast", "https://fast.example/", "Moon landing", "brave_search"),
+        ],
+        max_pages=2,
+        max_chars=1000,
+    )
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0)
+
+    assert [page.url for page in pages] == ["https://fast.example/"]
+    assert elapsed < 1.0
+    assert cancelled == ["https://slow.example/1"]
+
+
+@pytest.mark.asyncio
+async def test_extract_search_pages_keeps_rank_over_faster_spares(monkeypatch):
+    import asyncio
+
+    module = importlib.reload(web_search)
+    monkeypatch.delenv("PROVIDER_TAVILY_API_KEY", raising=False)
+    monkeypatch.setenv("SEARCH_EXTRACT_DEADLINE_SEC", "2")
+    cancelled = []
+
+    async def fake_fetch_page(url):
+        delay = 0.2 if "nasa.gov" in url else 0.01
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+        return f"Fetched {url}"
+
+    monkeypatch.setattr("agent.tools.fetch_page.fetch_page", fake_fetch_page)
+
+    pages = await module.extract_search_pages(
+        "Moon landing",
+        [
+            _result("Blog 1", "https://blog-one.example/", "Moon landing", "brave_search"),
+            _result("Blog 2", "https://blog-two.example/", "Moon landing", "brave_search"),
+            _result("NASA", "https://nasa.gov/apollo", "Moon landing", "brave_search"),
+            _result("Blog 3", "https://blog-three.example/", "Moon landing", "brave_search"),
+        ],
+        max_pages=2,
+        max_chars=1000,
+        need_primary_source=True,
+    )
+
+    # the official page is ranked first and outlasts the faster spares
+    assert [page.url for page in pages] == [
+        "https://nasa.gov/apollo",
+        "https://blog-one.example/",
+    ]
+    assert cancelled == []
+
+
+@pytest.mark.asyncio
+async def test_extract_search_pages_bounds_tavily_by_the_deadline(monkeypatch):
+    import asyncio
+    import time
+
+    module = importlib.reload(web_search)
+    monkeypatch.setenv("PROVIDER_TAVILY_API_KEY", "tavily-key")
+    monkeypatch.setenv("SEARCH_EXTRACT_DEADLINE_SEC", "0.2")
+    cancelled = []
+
+    async def slow_tavily(query, urls, max_chars):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(urls)
+            raise
+        return []
+
+    monkeypatch.setattr(module, "_extract_with_tavily", slow_tavily)
+
+    started = time.perf_counter()
+    pages = await module.extract_search_pages(
+        "Moon landing",
+        [_result("Page", "https://example.com/moon", "Moon landing", "brave_search")],
+        max_pages=1,
+        max_chars=1000,
+    )
+
+    assert pages == []
+    assert time.perf_counter() - started < 1.0
+    assert cancelled == [["https://example.com/moon"]]
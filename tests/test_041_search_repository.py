@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import datetime as dt
 
-from db import search_repository
+import pytest
+
+from db import cache_codec, search_repository
 
 
 def test_is_expired_accepts_naive_datetime():
@@ -17,3 +19,160 @@ def test_is_expired_accepts_aware_datetime():
     created_at = dt.datetime.now(dt.timezone.utc) - dt.timedelta(minutes=30)
 
     assert search_repository._is_expired(created_at, 60) is False
+
+
+@pytest.mark.asyncio
+async def test_search_cache_memory_tier_serves_repeat_lookups(monkeypatch):
+    search_repository.reset_cache_tiers()
+    calls = []
+
+    async def fake_fetchone(sql, args=None, dict_cursor=True):
+        calls.append(args)
+        return {
+            "results_json": '[{"url": "https://a.test"}]',
+            "created_at": dt.datetime.now(dt.timezone.utc),
+        }
+
+    monkeypatch.setattr(search_repository, "fetchone", fake_fetchone)
+
+    first = await search_repository.get_search_cache("serper:v4", "Query", 60)
+    second = await search_repository.get_search_cache("serper:v4", "query ", 60)
+
+    assert first == second == [{"url": "https://a.test"}]
+    assert len(calls) == 1
+    stats = search_repository.cache_stats()["search"]
+    assert stats["memory_hits"] == 1
+    assert stats["db_hits"] == 1
+    assert stats["memory_hit_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_put_search_cache_upserts_and_fills_memory_tier(monkeypatch):
+    search_repository.reset_cache_tiers()
+    statements = []
+
+    async def fake_execute(sql, args=None):
+        statements.append(sql)
+        return 1
+
+    async def fail_fetchone(*_args, **_kwargs):
+        raise AssertionError("memory tier should answer")
+
+    monkeypatch.setattr(search_repository, "execute", fake_execute)
+    monkeypatch.setattr(search_repository, "fetchone", fail_fetchone)
+
+    await search_repository.put_search_cache("brave:v4", "q", [{"url": "u"}])
+
+    assert "ON DUPLICATE KEY UPDATE" in statements[0]
+    assert await search_repository.get_search_cache("brave:v4", "q", 60) == [
+        {"url": "u"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_cache_entry_reports_stale_and_negative_rows(monkeypatch):
+    search_repository.reset_cache_tiers()
+    rows = {
+        "fresh": ('[{"url": "u"}]', 30),
+        "stale": ('[{"url": "u"}]', 90),
+        "expired": ('[{"url": "u"}]', 130),
+        "empty": ("[]", 3),
+        "empty-old": ("[]", 10),
+    }
+    hashes = {search_repository._h(name): name for name in rows}
+
+    async def fake_fetchone(sql, args=None, dict_cursor=True):
+        results_json, age = rows[hashes[args[1]]]
+        return {
+            "results_json": results_json,
+            "created_at": dt.datetime.now(dt.timezone.utc) - dt.timedelta(minutes=age),
+        }
+
+    monkeypatch.setattr(search_repository, "fetchone", fake_fetchone)
+
+    async def lookup(name):
+        return await search_repository.get_search_cache_entry(
+            "p", name, 60, stale_min=60, negative_ttl_min=5
+        )
+
+    fresh = await lookup("fresh")
+    stale = await lookup("stale")
+    empty = await lookup("empty")
+    assert (fresh.results, fresh.stale) == ([{"url": "u"}], False)
+    assert (stale.results, stale.stale) == ([{"url": "u"}], True)
+    assert empty.negative and not empty.stale
+    assert await lookup("expired") is None
+    assert await lookup("empty-old") is None
+    assert (await lookup("stale")).stale  # memory tier keeps the DB timestamp
+    stats = search_repository.cache_stats()["search"]
+    assert (stats["stale_hits"], stats["negative_hits"], stats["misses"]) == (2, 1, 2)
+
+
+def test_lru_tier_evicts_oldest_entry():
+    tier = search_repository._LruTier(2)
+    tier.put("a", 1)
+    tier.put("b", 2)
+    assert tier.get("a", 60) == 1
+    tier.put("c", 3)
+
+    assert tier.get("b", 60) is None
+    assert tier.get("a", 60) == 1
+    assert tier.get("c", 60) == 3
+
+
+@pytest.mark.asyncio
+async def test_purge_expired_search_cache_deletes_in_batches(monkeypatch):
+    deleted = iter([3, 3, 1])
+    calls = []
+
+    async def fake_execute(sql, args=None):
+        calls.append((sql, args))
+        return next(deleted)
+
+    monkeypatch.setattr("db.connection.execute", fake_execute)
+
+    removed = await search_repository.purge_expired_search_cache(60, batch_size=3)
+
+    assert removed == 7
+    assert len(calls) == 3
+    assert all("LIMIT %s" in sql and args == (60, 3) for sql, args in calls)
+
+
+def test_cache_codec_round_trips_and_compresses_large_text():
+    text = "Київ погода завтра. " * 200
+
+    blob = cache_codec.encode_text(text)
+
+    assert blob[0] == cache_codec.FORMAT_ZLIB
+    assert len(blob) < len(text.encode("utf-8")) // 4
+    assert cache_codec.decode_text(blob) == text
+    assert cache_codec.decode_text(cache_codec.encode_text("short"))[:5] == "short"
+    assert cache_codec.decode_text(b"\x7fgarbage") is None
+
+
+@pytest.mark.asyncio
+async def test_get_cache_prefers_compact_blob_columns(monkeypatch):
+    search_repository.reset_cache_tiers()
+    now = dt.datetime.now(dt.timezone.utc)
+
+    async def fake_fetchone(sql, args=None, dict_cursor=True):
+        if "page_cache" in sql:
+            return {
+                "text_blob": cache_codec.encode_text("page body " * 100),
+                "text": None,
+                "fetched_at": now,
+            }
+        return {
+            "results_blob": cache_codec.encode_json([{"title": "Новини"}]),
+            "results_json": None,
+            "created_at": now,
+        }
+
+    monkeypatch.setattr(search_repository, "fetchone", fake_fetchone)
+
+    assert await search_repository.get_search_cache("p", "q", 60) == [
+        {"title": "Новини"}
+    ]
+    assert await search_repository.get_page_cache("https://a.test", 60) == (
+        "page body " * 100
+    )
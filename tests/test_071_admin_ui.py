@@ -183,3 +183,28 @@ def test_clear_bot_memory_calls_global_clear(monkeypatch):
     assert ok is True
     assert detail == "ok"
     assert called["ok"] is True
+
+
+def test_render_dashboard_shows_search_provider_scoreboard(tmp_path, monkeypatch):
+    from agent.tools.provider_scoreboard import ProviderScoreboard
+
+    env_path = tmp_path / ".env"
+    env_path.write_text("", encoding="utf-8")
+    stats_path = tmp_path / "provider_stats.json"
+    board = ProviderScoreboard(stats_path)
+    for latency_ms in (400, 500, 900):
+        board.record(
+            "brave_search", "news", ok=True, results=5, acceptable=True, latency_ms=latency_ms
+        )
+    board.save()
+    monkeypatch.setenv("SEARCH_PROVIDER_STATS_PATH", str(stats_path))
+    monkeypatch.setattr(admin_ui, "ENV_PATH", env_path)
+    monkeypatch.setattr(admin_ui, "service_status", lambda _name: "active")
+    monkeypatch.setattr(admin_ui, "token_dashboard_data", lambda **_kwargs: {})
+
+    rendered = admin_ui.render_dashboard({})
+
+    assert "Search providers" in rendered
+    assert "<td>brave_search</td>" in rendered
+    assert "<td>500 ms</td>" in rendered  # p50
+    assert "<td>100%</td>" in rendered
@@ -118,3 +118,30 @@ def test_token_usage_calendar_month_period():
     assert calendar["period_kind"] == "month"
     assert calendar["period_usage"]["calls"] == 2
     assert calendar["period_usage"]["tokens_total"] == 40
+
+
+def test_latency_percentile_uses_recent_successful_calls():
+    events = [
+        {"capability": "chat_final", "model": "m", "status": "success", "latency_ms": ms}
+        for ms in range(1, 101)
+    ]
+    events.append({"capability": "chat_final", "model": "m", "status": "failed", "latency_ms": 99999})
+    events.append({"capability": "planner_reasoning", "model": "m", "latency_ms": 99999})
+
+    assert token_usage.latency_percentile(events, capability="chat_final", model="m") == (95, 100)
+    assert token_usage.latency_percentile(events, capability="chat_final", window=10) == (100, 10)
+    assert token_usage.latency_percentile(events, capability="vision_image") == (None, 0)
+
+
+def test_read_usage_events_tails_the_log(tmp_path, monkeypatch):
+    log_path = tmp_path / "token_usage.jsonl"
+    monkeypatch.setenv("TOKEN_USAGE_LOG_PATH", str(log_path))
+    monkeypatch.setattr(token_usage, "_TAIL_CHUNK", 16)
+    log_path.write_text(
+        "".join(f'{{"n": {n}, "note": "ї"}}\n' for n in range(50)), encoding="utf-8"
+    )
+
+    events = token_usage.read_usage_events(limit=3)
+
+    assert [event["n"] for event in events] == [47, 48, 49]
+    assert len(token_usage.read_usage_events(limit=500)) == 50
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from core.ttl_cache import TtlCache, ttl_cache_stats
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_in_write_order_and_reports_evictions():
+    clock = _Clock()
+    evicted = []
+    cache = TtlCache(
+        "test.ttl",
+        ttl_sec=10,
+        on_evict=lambda key, value, reason: evicted.append((key, reason)),
+        clock=clock,
+    )
+    cache.set("a", 1)
+    clock.now += 5
+    cache.set("b", 2)
+    clock.now += 4
+    cache.set("a", 3)  # rewrite moves "a" behind "b"
+    clock.now += 7
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 3
+    assert evicted == [("b", "expired")]
+    assert ttl_cache_stats()["test.ttl"] == {
+        "hits": 1,
+        "misses": 1,
+        "expired": 1,
+        "evicted": 0,
+        "items": 1,
+    }
+
+
+def test_ttl_cache_size_cap_evicts_least_recently_used():
+    evicted = []
+    cache = TtlCache(
+        max_items=2,
+        touch_on_get=True,
+        on_evict=lambda key, value, reason: evicted.append((key, value, reason)),
+    )
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert "a" in cache  # touch
+    cache.set("c", 3)
+
+    assert evicted == [("b", 2, "capacity")]
+    assert len(cache) == 2
+    assert cache.pop("a") == 1
+    assert cache.setdefault("d", 4) == 4
+    assert evicted == [("b", 2, "capacity")]
+
+
+def test_album_eviction_drops_dependent_entries(monkeypatch):
+    from media import album_registry
+
+    album_key = ("ptb", 1, "g")
+    album_registry._MESSAGE_INDEX.set(("ptb", 1, 7), album_key)
+    album_registry._PROCESSING.set(album_key, 7)
+    album_registry._forget_album(
+        album_key,
+        [album_registry.AlbumItemRef(message_id=7, media_kind="image", raw_message=None)],
+        "capacity",
+    )
+
+    assert ("ptb", 1, 7) not in album_registry._MESSAGE_INDEX
+    assert album_key not in album_registry._PROCESSING
@@ -27,3 +27,56 @@ async def test_run_search_converts_chat_final_bare_citation(monkeypatch):
 
     assert "[sinoptik.ua](https://sinoptik.ua/pohoda/kyiv/2026-05-05)" in out
     assert "[2]" not in out
+
+
+def test_page_evidence_keeps_relevant_passage_deep_in_page(monkeypatch):
+    from agent.search_task import NormalizedResult
+
+    monkeypatch.setenv("SEARCH_PAGE_MAX_CHARS", "600")
+    monkeypatch.setenv("SEARCH_PASSAGE_WORDS", "40")
+    monkeypatch.setenv("SEARCH_PASSAGE_OVERLAP_WORDS", "10")
+    intro = "Місто має довгу історію торгівлі ремесел та культури у регіоні. " * 20
+    answer = "Прогноз погоди у Львові на вівторок: вдень до +18, без опадів. "
+    page_text = "Вступ. " + intro + answer + intro
+    page = NormalizedResult(
+        url="https://example.com/lviv",
+        title="Львів",
+        snippet="",
+        relevance_score=0.8,
+        source_provider="fetch_page",
+        has_full_content=True,
+        full_content=page_text,
+    )
+
+    block = runner._format_page_evidence([page], ["погода у Львові у вівторок"])
+    excerpt = block.split("\n", 2)[2]
+
+    assert "вдень до +18" in excerpt
+    assert len(excerpt) <= 600
+    assert not excerpt.startswith("Вступ")
+
+    monkeypatch.setenv("SEARCH_PASSAGE_RANKING", "0")
+    head = runner._format_page_evidence([page], ["погода у Львові у вівторок"])
+    assert "вдень до +18" not in head
+    assert head.split("\n", 2)[2].startswith("Вступ")
+
+
+def test_passage_ranker_merges_overlapping_windows_in_document_order(monkeypatch):
+    from agent.passage_ranker import PassageRanker, split_passages
+
+    text = " ".join(f"w{i}" for i in range(30))
+    windows = [text[start:end].split() for start, end in split_passages(text, 10, 4)]
+    assert [(words[0], words[-1]) for words in windows] == [
+        ("w0", "w9"), ("w6", "w15"), ("w12", "w21"), ("w18", "w27"), ("w24", "w29")
+    ]
+
+    monkeypatch.setenv("SEARCH_PASSAGE_WORDS", "8")
+    monkeypatch.setenv("SEARCH_PASSAGE_OVERLAP_WORDS", "2")
+    doc = "alpha beta gamma. " * 30 + "rocket launch window today. " + "delta " * 60
+    ranker = PassageRanker(["rocket launch", "beta"], [doc])
+    excerpt = ranker.excerpt(doc, 200)
+
+    assert excerpt is not None and "rocket launch" in excerpt
+    assert len(excerpt) <= 200
+    assert excerpt.index("beta") < excerpt.index("rocket launch")  # document order
+    assert PassageRanker(["nothing here"], [doc]).excerpt(doc, 200) is None